@@ -30,6 +30,35 @@ class Settings(BaseSettings):
     business_days: str = Field(alias="BUSINESS_DAYS", default="Mon,Tue,Wed,Thu,Fri")
     timezone: str = Field(alias="TIMEZONE", default="America/New_York")
 
+    # Shared Jira HTTP client used by every JiraClient
+    jira_http_max_connections: int = Field(alias="JIRA_HTTP_MAX_CONNECTIONS", default=20)
+    jira_http_max_keepalive: int = Field(alias="JIRA_HTTP_MAX_KEEPALIVE", default=20)
+    jira_http_keepalive_expiry: float = Field(alias="JIRA_HTTP_KEEPALIVE_EXPIRY", default=30.0)
+    jira_http_timeout: float = Field(alias="JIRA_HTTP_TIMEOUT", default=60.0)
+    jira_http2: bool = Field(alias="JIRA_HTTP2", default=False)  # needs the h2 package
+
+    # Per-site request budget and retry policy for 429/503 responses
+    jira_rate_limit_rps: float = Field(alias="JIRA_RATE_LIMIT_RPS", default=10.0)  # 0 disables the budget
+    jira_rate_limit_burst: int = Field(alias="JIRA_RATE_LIMIT_BURST", default=20)
+    jira_retry_max: int = Field(alias="JIRA_RETRY_MAX", default=6)
+    jira_retry_base_delay: float = Field(alias="JIRA_RETRY_BASE_DELAY", default=1.0)
+    jira_retry_max_delay: float = Field(alias="JIRA_RETRY_MAX_DELAY", default=120.0)
+
+    # Parse search responses issue by issue as they download instead of buffering whole pages
+    jira_stream_search: bool = Field(alias="JIRA_STREAM_SEARCH", default=True)
+    # SQLite file holding the ingested jira_issues/jira_transitions for source=local reports (empty: SQLITE_PATH)
+    jira_store_path: str = Field(alias="JIRA_STORE_PATH", default="")
+    # Parallel /issue/{key}/changelog requests per report for issues with more than 100 histories
+    jira_changelog_concurrency: int = Field(alias="JIRA_CHANGELOG_CONCURRENCY", default=8)
+
+    # Report runs execute in the background: worker count, queued runs accepted, attempts across restarts
+    report_workers: int = Field(alias="REPORT_WORKERS", default=2)
+    report_queue_max: int = Field(alias="REPORT_QUEUE_MAX", default=100)
+    report_max_attempts: int = Field(alias="REPORT_MAX_ATTEMPTS", default=2)
+    # Finished runs reused for identical requests over unchanged data; size 0 disables the cache
+    report_cache_size: int = Field(alias="REPORT_CACHE_SIZE", default=128)
+    report_cache_ttl_seconds: int = Field(alias="REPORT_CACHE_TTL_SECONDS", default=900)
+
     @field_validator("frontend_origins")
     @classmethod
     def parse_frontend_origins(cls, v):
@@ -52,6 +81,10 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
+def get_settings() -> Settings:
+    # Same accessor as the backend's, so modules shared by both trees read settings one way.
+    return settings
+
 # Startup hint (no secrets)
 if os.getenv("PRINT_SETTINGS_ON_STARTUP", "1") == "1":
     try:
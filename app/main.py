@@ -7,6 +7,7 @@ from .db import init_db, SessionLocal
 from .routers import reports, admin, auth
 from .effective import ensure_settings_row, bootstrap_token_from_env_if_empty
 from .models import User
+from .services import jira_http
 from passlib.hash import bcrypt
 
 app = FastAPI(title="Jira Reporting")
@@ -40,6 +41,7 @@ app.mount("/", StaticFiles(directory="backend/web", html=True), name="web")
 @app.on_event("startup")
 async def _startup():
     init_db()
+    await jira_http.startup()
     ensure_settings_row()
     bootstrap_token_from_env_if_empty()
     # Bootstrap admin user if DB has none
@@ -52,3 +54,9 @@ async def _startup():
             )
             db.add(u)
             db.commit()
+    reports.recover_runs()
+
+@app.on_event("shutdown")
+async def _shutdown():
+    await reports.stop_workers()
+    await jira_http.shutdown()
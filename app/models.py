@@ -21,6 +21,11 @@ class ReportRun(Base):
     csv_transitions_path: Mapped[str] = mapped_column(Text, nullable=True)
     meta: Mapped[str] = mapped_column(Text, nullable=True)
 
+class JiraStatus(Base):
+    __tablename__ = "jira_statuses"
+    name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    category: Mapped[str] = mapped_column(String(64), default="")  # statusCategory name from the last live run
+
 class SettingsRow(Base):
     __tablename__ = "settings"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
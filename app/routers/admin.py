@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from sqlalchemy import text
 from ..config import settings
 from ..services.jira import JiraClient
+from ..services import jira_http
 from ..effective import load_effective_settings, debug_token_status
 from ..db import SessionLocal
 from ..utils.crypto import encrypt
@@ -40,6 +41,10 @@ async def get_debug():
         "token_source": status["source"]
     }
 
+@router.get("/http-pool")
+async def get_http_pool():
+    return {"ok": True, "pool": jira_http.pool_stats(), "transport": jira_http.transport_stats()}
+
 @router.put("/config")
 async def put_config(body: UpdateConfig):
     sets = []
@@ -1,15 +1,19 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from datetime import datetime, timezone
 from pathlib import Path
 from sqlalchemy import text
-import csv, json, pathlib
-from collections import defaultdict, Counter
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import asyncio, json, time
+from collections import Counter
 
+from ..config import settings
 from ..effective import load_effective_settings
 from ..db import SessionLocal
 from ..schemas import RunRequest, RunResponse
 from ..services.jira import JiraClient
+from ..services import buckets, flow_metrics, local_store, report_cache, rollup
+from ..services.csv_sink import FileSink, NullSink, RowSpool, StreamSink
 from ..utils.business_hours import business_seconds_between
 from ..utils.jira_times import parse_jira_ts
 
@@ -36,11 +40,20 @@ async def schema():
         }
     }
 
+@router.get("/cache/stats")
+async def cache_stats():
+    return report_cache.cache.stats()
+
 @router.get("")
 async def list_runs():
     with SessionLocal() as db:
-        rows = db.execute(text("SELECT id, started_at, completed_at, status, projects FROM report_runs ORDER BY id DESC")).all()
-        return [{"id": r[0], "started_at": r[1], "completed_at": r[2], "status": r[3], "projects": r[4]} for r in rows]
+        rows = db.execute(text("SELECT id, started_at, completed_at, status, projects, meta, error FROM report_runs ORDER BY id DESC")).all()
+        out = []
+        for r in rows:
+            meta = json.loads(r[5]) if r[5] else {}
+            out.append({"id": r[0], "started_at": r[1], "completed_at": r[2], "status": r[3], "projects": r[4],
+                        "report": (meta.get("request") or {}).get("report", "status_summary"), "progress": meta.get("progress"), "error": r[6]})
+        return out
 
 @router.get("/{run_id}")
 async def get_run(run_id: int):
@@ -49,84 +62,225 @@ async def get_run(run_id: int):
         if not row:
             raise HTTPException(404, "Run not found")
         meta = json.loads(row["meta"]) if row["meta"] else {}
-        return {"id": row["id"], "status": row["status"], "meta": meta,
+        return {"id": row["id"], "status": row["status"], "meta": meta, "error": row["error"],
                 "csv_issues_path": row["csv_issues_path"], "csv_transitions_path": row["csv_transitions_path"]}
 
 @router.get("/{run_id}/download/{kind}")
 async def download_csv(run_id: int, kind: str):
-    if kind not in {"issues","transitions","rollups"}:
-        raise HTTPException(400, "kind must be issues|transitions|rollups")
+    if kind not in CSV_KINDS:
+        raise HTTPException(400, "kind must be issues|transitions|rollups|metrics")
     with SessionLocal() as db:
         row = db.execute(text("SELECT * FROM report_runs WHERE id = :i"), {"i": run_id}).mappings().first()
         if not row:
             raise HTTPException(404, "Run not found")
-        path = row["csv_issues_path"] if kind == "issues" else (row["csv_transitions_path"] if kind=="transitions" else (json.loads(row["meta"]).get("csv_rollups_path") if row["meta"] else None))
+        meta = json.loads(row["meta"]) if row["meta"] else {}
+        path = row["csv_issues_path"] if kind == "issues" else (row["csv_transitions_path"] if kind=="transitions" else meta.get(f"csv_{kind}_path"))
         if not path or not Path(path).exists():
             raise HTTPException(404, "CSV not found")
         return FileResponse(path, media_type="text/csv", filename=Path(path).name)
 
+@router.post("/export/{kind}")
+async def export_csv(kind: str, req: RunRequest):
+    """Run the report and stream one of its CSVs to the client; nothing is written to disk or recorded."""
+    if kind not in CSV_KINDS:
+        raise HTTPException(400, "kind must be issues|transitions|rollups|metrics")
+    if kind == "metrics" and req.report not in flow_metrics.REPORTS:
+        raise HTTPException(400, "kind=metrics needs report=" + "|".join(flow_metrics.REPORTS))
+    eff = load_effective_settings()
+    _check_request(req, eff)
+    sink = StreamSink()
+    producer = asyncio.create_task(_build_csvs(0, req, eff, {k: (sink if k == kind else NullSink()) for k in CSV_KINDS}))
+    body = sink.body(producer)
+    # Wait for the first chunk so a failing run (bad credentials, no local data) is still an HTTP error.
+    try:
+        first = await body.__anext__()
+    except StopAsyncIteration:
+        first = b""
+
+    async def _stream():
+        yield first
+        async for chunk in body:
+            yield chunk
+
+    return StreamingResponse(_stream(), media_type="text/csv", headers={"Content-Disposition": f'attachment; filename="report_{kind}.csv"'})
+
 @router.post("/run", response_model=RunResponse)
 async def run_report(req: RunRequest):
+    """Queue a run; poll GET /api/reports/{run_id} for status and progress."""
     eff = load_effective_settings()
-    if not eff["jira_api_token"]:
-        raise HTTPException(400, "Jira token missing (DB and .env are both empty). Set it in Admin.")
+    _check_request(req, eff)
+    start_workers()
+    cache_key = report_cache.request_key(req, eff)
+    # The version costs a store query, or a Jira search for live runs: only worth it with a cache.
+    version = await _data_version(req, eff) if report_cache.cache.enabled else None
+    cached = report_cache.cache.get(cache_key, version, _cache_valid) if version is not None else None
+    if cached is not None:
+        row = _load_run(cached)
+        return RunResponse(
+            run_id=cached,
+            status=row["status"],
+            csv_issues_url=f"/api/reports/{cached}/download/issues",
+            csv_transitions_url=f"/api/reports/{cached}/download/transitions",
+            meta={**(json.loads(row["meta"]) if row["meta"] else {}), "cache": "hit"}
+        )
+    if _queue.qsize() >= max(1, settings.report_queue_max):
+        raise HTTPException(429, "Too many queued report runs; try again shortly")
 
+    meta = {"request": req.model_dump(), "attempts": 0, "progress": {"issues": 0, "intervals": 0}, "cache_key": cache_key, "data_version": version}
     with SessionLocal() as db:
-        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
         db.execute(
             text(
-                "INSERT INTO report_runs (started_at, created_by, projects, jql, time_mode, timezone, agg_mode, epic_rollup, status) "
-                "VALUES (:started_at, :created_by, :projects, :jql, :time_mode, :tz, :agg, :epic, 'running')"
+                "INSERT INTO report_runs (started_at, created_by, projects, jql, time_mode, timezone, agg_mode, custom_buckets, epic_rollup, status, meta) "
+                "VALUES (:started_at, :created_by, :projects, :jql, :time_mode, :tz, :agg, :buckets, :epic, 'queued', :meta)"
             ),
             {
-                "started_at": now,
+                "started_at": _now(),
                 "created_by": "bootstrap",
                 "projects": json.dumps(req.project_keys),
                 "jql": req.jql or "",
                 "time_mode": "business" if req.business_hours else "24x7",
                 "tz": req.timezone or eff["timezone"],
                 "agg": req.aggregation,
+                "buckets": json.dumps(req.custom_buckets) if req.custom_buckets else None,
                 "epic": req.epic_rollup,
+                "meta": json.dumps(meta),
             }
         )
         db.commit()
         run_id = db.execute(text("SELECT last_insert_rowid()")).scalar_one()
-
-    issues_csv, transitions_csv, rollups_csv, meta = await _execute_run(run_id, req, eff)
-
-    with SessionLocal() as db:
-        done = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-        meta["csv_rollups_path"] = rollups_csv
-        db.execute(
-            text("UPDATE report_runs SET completed_at=:done, status='ok', csv_issues_path=:ci, csv_transitions_path=:ct, meta=:meta WHERE id=:i"),
-            {"done": done, "ci": issues_csv, "ct": transitions_csv, "meta": json.dumps(meta), "i": run_id}
-        )
-        db.commit()
+    _queue.put_nowait(run_id)
+    if version is not None:
+        report_cache.cache.put(cache_key, version, run_id)
 
     return RunResponse(
         run_id=run_id,
-        status="ok",
+        status="queued",
         csv_issues_url=f"/api/reports/{run_id}/download/issues",
         csv_transitions_url=f"/api/reports/{run_id}/download/transitions",
         meta=meta
     )
 
-async def _execute_run(run_id: int, req: RunRequest, eff: dict):
-    window_days = req.window_days or eff["default_window_days"]
+@router.post("/{run_id}/cancel")
+async def cancel_run(run_id: int):
+    row = _load_run(run_id)
+    if not row:
+        raise HTTPException(404, "Run not found")
+    if row["status"] not in ("queued", "running"):
+        raise HTTPException(409, f"Run is {row['status']}; only queued or running runs can be cancelled")
+    task = _running.get(run_id)
+    if task is not None:
+        _cancel_requested.add(run_id)
+        task.cancel()
+        await asyncio.wait({task})  # the worker records the cancellation
+    else:
+        _update_run(run_id, status="cancelled", completed_at=_now(), error="Cancelled before it started")
+        report_cache.cache.discard_run(run_id)
+    return {"id": run_id, "status": _load_run(run_id)["status"]}
+
+# Issues per unit of work: their changelogs are fetched together and their rows written together.
+REPORT_BATCH = 200
+CSV_KINDS = ("issues", "transitions", "rollups", "metrics")  # metrics: the throughput / cycle_time / aging_wip table
+TRANSITION_COLS = ["run_id","issue_key","status_name","status_category","entered_at","exited_at","duration_seconds_bh","duration_seconds_24x7","interval_index"]
+ISSUE_COLS = ["run_id","issue_key","project_key","issue_type","summary","status_current","created","updated","epic_key","parent_key","labels","total_time_open_bh_hours","total_time_open_24x7_hours","total_status_entries"]
+
+def _report_jql(req: RunRequest, window_days: int) -> str:
     # Order newest first so tests return recent cards
     jql_parts = [f"project in ({','.join(req.project_keys)})", f"updated >= -{window_days}d", "ORDER BY updated DESC"]
     if req.jql:
         jql_parts.insert(2, f"({req.jql})")
-    jql = " AND ".join(jql_parts[:2]) + " " + " ".join(jql_parts[2:])
+    return " AND ".join(jql_parts[:2]) + " " + " ".join(jql_parts[2:])
+
+async def _data_version(req: RunRequest, eff: dict) -> Optional[str]:
+    """Version stamp of the data a run would read; None (no caching) if it cannot be had."""
+    try:
+        if req.source == "local":
+            return "local:" + local_store.data_version(req.project_keys)
+        client = JiraClient(eff["jira_base_url"], eff["jira_email"], eff["jira_api_token"])
+        return "live:" + await client.scope_version(_report_jql(req, req.window_days or eff["default_window_days"]))
+    except Exception:
+        return None  # the run itself reports the problem
+
+def _cache_valid(run_id: int) -> bool:
+    row = _load_run(run_id)
+    if not row or row["status"] not in ("queued", "running", "ok"):
+        return False
+    return row["status"] != "ok" or all(p and Path(p).exists() for p in (row["csv_issues_path"], row["csv_transitions_path"]))
+
+def _check_request(req: RunRequest, eff: dict) -> None:
+    if req.source == "local" and req.jql:
+        raise HTTPException(400, "jql filters need source=live; local runs filter by project and window only")
+    if req.aggregation == "custom" and not any(k.strip() and v and v.strip() for k, v in (req.custom_buckets or {}).items()):
+        raise HTTPException(400, "aggregation=custom needs custom_buckets: {status or category name: bucket}")
+    if req.source == "live" and not eff["jira_api_token"]:
+        raise HTTPException(400, "Jira token missing (DB and .env are both empty). Set it in Admin.")
 
-    client = JiraClient(eff["jira_base_url"], eff["jira_email"], eff["jira_api_token"])
+async def _live_batches(client: JiraClient, jql: str, max_total: int) -> AsyncIterator[List[Tuple[dict, list]]]:
     fields = ["summary","issuetype","status","parent","labels","project","created","updated","customfield_10014"]
-    issues = await client.search_issues(jql, fields, expand_changelog=False, max_total=(req.max_issues or 25))
-    status_catalog = await client.get_status_catalog()  # name -> category
+    batch: List[dict] = []
+    # Histories come embedded in the search pages; only issues with more than the embedded
+    # 100 are paged separately, concurrently and bounded by JIRA_CHANGELOG_CONCURRENCY.
+    async for issue in client.iter_issues(jql, fields, expand_changelog=True, max_total=max_total):
+        batch.append(issue)
+        if len(batch) >= REPORT_BATCH:
+            yield list(zip(batch, await client.get_changelogs(batch)))
+            batch = []
+    if batch:
+        yield list(zip(batch, await client.get_changelogs(batch)))
+
+async def _local_batches(req: RunRequest, window_days: int) -> AsyncIterator[List[Tuple[dict, list]]]:
+    for batch in local_store.iter_issue_batches(req.project_keys, window_days, req.max_issues or 25, REPORT_BATCH):
+        yield batch
+
+async def _execute_run(run_id: int, req: RunRequest, eff: dict, progress: Optional[Callable[[int, int], None]] = None):
+    """Run the report into data/run_<id>_*.csv; returns (issues, transitions, rollups, meta).
+
+    Flow reports also write data/run_<id>_<report>.csv, recorded as meta["csv_metrics_path"].
+    """
+    paths = {
+        "issues": str(DATA_DIR / f"run_{run_id}_issues_summary.csv"),
+        "transitions": str(DATA_DIR / f"run_{run_id}_status_transitions_long.csv"),
+        "rollups": str(DATA_DIR / f"run_{run_id}_rollups.csv"),
+    }
+    sinks: Dict[str, Any] = {kind: FileSink(path) for kind, path in paths.items()}
+    if req.report in flow_metrics.REPORTS:
+        sinks["metrics"] = FileSink(str(DATA_DIR / f"run_{run_id}_{req.report}.csv"))
+    else:
+        sinks["metrics"] = NullSink()
+    meta = await _build_csvs(run_id, req, eff, sinks, progress)
+    if req.report in flow_metrics.REPORTS:
+        meta["csv_metrics_path"] = sinks["metrics"].path
+    return paths["issues"], paths["transitions"], paths["rollups"], meta
+
+async def _build_csvs(run_id: int, req: RunRequest, eff: dict, sinks: Dict[str, Any], progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """Produce the report CSVs into `sinks` (one per kind); every sink is closed on return.
+
+    Issues are processed a batch at a time and their interval rows written straight away. What
+    outlives a batch is one compact summary row per issue, spooled until the issues CSV header
+    (which depends on every status seen) is known, the hierarchy index for rollups and, for flow
+    reports, the interval arrays.
+    """
+    summaries = RowSpool()
+    try:
+        return await _build_csvs_into(run_id, req, eff, sinks, summaries, progress)
+    finally:
+        await summaries.close()
+        for sink in sinks.values():
+            await sink.close()
+
+async def _build_csvs_into(run_id: int, req: RunRequest, eff: dict, sinks: Dict[str, Any], summaries: RowSpool, progress: Optional[Callable[[int, int], None]]) -> Dict[str, Any]:
+    window_days = req.window_days or eff["default_window_days"]
+    jql = _report_jql(req, window_days)
 
-    intervals = []
-    per_issue_stats = defaultdict(lambda: {"seconds_bh": 0, "seconds_24": 0, "entries": 0})
-    per_issue_bounces = defaultdict(Counter)
+    client = None
+    if req.source == "local":
+        jql = "local: " + jql
+        status_catalog = local_store.load_status_catalog()
+        batches = _local_batches(req, window_days)
+    else:
+        client = JiraClient(eff["jira_base_url"], eff["jira_email"], eff["jira_api_token"])
+        status_catalog = await client.get_status_catalog()  # name -> category
+        local_store.save_status_catalog(status_catalog)
+        batches = _live_batches(client, jql, req.max_issues or 25)
 
     from datetime import timezone as _tz, datetime as _dt
     now_utc = _dt.now(_tz.utc)
@@ -135,59 +289,64 @@ async def _execute_run(run_id: int, req: RunRequest, eff: dict):
     bh_days = eff["business_days"]
     tz = eff["timezone"]
 
-    for issue in issues:
-        key = issue["key"]
-        histories = await client.get_issue_changelog(key)
-        status_changes = []
-        for h in histories:
-            for item in h.get("items", []):
-                if item.get("field") == "status":
-                    status_changes.append({"at": parse_jira_ts(h.get("created")), "from": item.get("fromString"), "to": item.get("toString")})
-        status_changes = [sc for sc in status_changes if sc["at"] is not None]
-        status_changes.sort(key=lambda x: x["at"])
-
-        for idx, change in enumerate(status_changes):
-            entered_dt = change["at"]
-            exited_dt = status_changes[idx+1]["at"] if idx+1 < len(status_changes) else now_utc
-            sec24 = int((exited_dt - entered_dt).total_seconds()) if exited_dt and entered_dt else 0
-            secbh = business_seconds_between(entered_dt, exited_dt, tz, bh_start, bh_end, bh_days) if exited_dt and entered_dt else 0
-            cat = status_catalog.get(change["to"] or "", "")
-            intervals.append({
-                "issue_key": key,
-                "status_name": change["to"] or "",
-                "status_category": cat,
-                "entered_at": entered_dt.isoformat(),
-                "exited_at": exited_dt.isoformat() if exited_dt else "",
-                "duration_seconds_bh": secbh,
-                "duration_seconds_24x7": sec24,
-            })
-            per_issue_stats[key]["seconds_bh"] += secbh
-            per_issue_stats[key]["seconds_24"] += sec24
-            per_issue_stats[key]["entries"] += 1
-            per_issue_bounces[key][change["to"] or ""] += 1
-
-    transitions_path = pathlib.Path("data") / f"run_{run_id}_status_transitions_long.csv"
-    with open(transitions_path, "w", newline="") as f:
-        w = csv.writer(f)
-        w.writerow(["run_id","issue_key","status_name","status_category","entered_at","exited_at","duration_seconds_bh","duration_seconds_24x7","interval_index"])
-        for idx, iv in enumerate(intervals):
-            w.writerow([run_id, iv["issue_key"], iv["status_name"], iv["status_category"], iv["entered_at"], iv["exited_at"], iv["duration_seconds_bh"], iv["duration_seconds_24x7"], idx])
-
-    issues_path = pathlib.Path("data") / f"run_{run_id}_issues_summary.csv"
-    with open(issues_path, "w", newline="") as f:
-        w = csv.writer(f)
-        all_statuses = set()
-        for c in per_issue_bounces.values():
-            all_statuses.update(c.keys())
-        top_statuses = sorted(all_statuses)[:20]
-        base_cols = ["run_id","issue_key","project_key","issue_type","summary","status_current","created","updated","epic_key","parent_key","labels","total_time_open_bh_hours","total_time_open_24x7_hours","total_status_entries"]
-        bounce_cols = [f"entries_{s}" for s in top_statuses]
-        w.writerow(base_cols + bounce_cols)
-        for issue in issues:
-            fields = issue["fields"]
+    all_statuses = set()
+    hierarchy = rollup.RollupIndex()
+    interval_index = 0
+    plan = buckets.BucketPlan(req.aggregation, status_catalog, req.custom_buckets)
+    # Flow reports record each interval compactly and are computed once every batch is in.
+    flow = flow_metrics.FlowCollector() if req.report in flow_metrics.REPORTS else None
+    # The first batch is read before any output, so a run that cannot start (no local data,
+    # Jira refusing the query) fails before an export has sent its header.
+    try:
+        first: Optional[List[Tuple[dict, list]]] = await batches.__anext__()
+    except StopAsyncIteration:
+        first = None
+    await sinks["transitions"].write([TRANSITION_COLS])
+
+    async def _all_batches() -> AsyncIterator[List[Tuple[dict, list]]]:
+        if first is not None:
+            yield first
+            async for b in batches:
+                yield b
+
+    async for batch in _all_batches():
+        rows = []
+        issue_rows = []
+        for issue, histories in batch:
             key = issue["key"]
-            stats = per_issue_stats.get(key, {"seconds_bh":0,"seconds_24":0,"entries":0})
-            row = [
+            status_changes = []
+            for h in histories:
+                for item in h.get("items", []):
+                    if item.get("field") == "status":
+                        status_changes.append({"at": parse_jira_ts(h.get("created")), "from": item.get("fromString"), "to": item.get("toString")})
+            status_changes = [sc for sc in status_changes if sc["at"] is not None]
+            status_changes.sort(key=lambda x: x["at"])
+
+            st = {"seconds_bh": 0, "seconds_24": 0, "entries": 0}
+            counts = Counter()
+            acc: List[int] = []  # seconds per plan column, on the run's time basis
+            fields = issue["fields"]
+            if flow is not None:
+                flow_issue = flow.issue(fields.get("project",{}).get("key",""), fields.get("issuetype",{}).get("name",""), fields.get("status",{}).get("name",""))
+            for idx, change in enumerate(status_changes):
+                entered_dt = change["at"]
+                exited_dt = status_changes[idx+1]["at"] if idx+1 < len(status_changes) else now_utc
+                sec24 = int((exited_dt - entered_dt).total_seconds()) if exited_dt and entered_dt else 0
+                secbh = business_seconds_between(entered_dt, exited_dt, tz, bh_start, bh_end, bh_days) if exited_dt and entered_dt else 0
+                cat = status_catalog.get(change["to"] or "", "")
+                rows.append([run_id, key, change["to"] or "", cat, entered_dt.isoformat(), exited_dt.isoformat() if exited_dt else "", secbh, sec24, interval_index])
+                if flow is not None:
+                    flow.interval(flow_issue, flow_metrics.category_code(cat, change["to"] or ""), entered_dt.timestamp(), secbh, sec24)
+                interval_index += 1
+                st["seconds_bh"] += secbh
+                st["seconds_24"] += sec24
+                st["entries"] += 1
+                counts[change["to"] or ""] += 1
+                plan.add(acc, change["to"] or "", secbh if req.business_hours else sec24)
+
+            epic = fields.get("customfield_10014","") or ""
+            parent = (fields.get("parent") or {}).get("key","") if fields.get("parent") else ""
+            issue_rows.append([[
                 run_id,
                 key,
                 fields.get("project",{}).get("key",""),
@@ -196,46 +355,156 @@ async def _execute_run(run_id: int, req: RunRequest, eff: dict):
                 fields.get("status",{}).get("name",""),
                 fields.get("created",""),
                 fields.get("updated",""),
-                fields.get("customfield_10014","") or "",
-                (fields.get("parent") or {}).get("key","") if fields.get("parent") else "",
+                epic,
+                parent,
                 ";".join(fields.get("labels") or []),
-                _hours(stats["seconds_bh"]),
-                _hours(stats["seconds_24"]),
-                stats["entries"]
-            ]
-            counts = per_issue_bounces.get(key, {})
-            row += [counts.get(s, 0) for s in top_statuses]
-            w.writerow(row)
-
-    epic_totals = defaultdict(lambda: {"seconds_bh":0,"seconds_24":0,"entries":0,"issues":set()})
-    parent_totals = defaultdict(lambda: {"seconds_bh":0,"seconds_24":0,"entries":0,"issues":set(),"epic":""})
-
-    for issue in issues:
-        key = issue["key"]
-        fields = issue["fields"]
-        epic = fields.get("customfield_10014","") or ""
-        parent = (fields.get("parent") or {}).get("key","") if fields.get("parent") else ""
-        st = per_issue_stats.get(key, {"seconds_bh":0,"seconds_24":0,"entries":0})
-        if epic:
-            epic_totals[epic]["seconds_bh"] += st["seconds_bh"]
-            epic_totals[epic]["seconds_24"] += st["seconds_24"]
-            epic_totals[epic]["entries"] += st["entries"]
-            epic_totals[epic]["issues"].add(key)
-        if parent:
-            parent_totals[parent]["seconds_bh"] += st["seconds_bh"]
-            parent_totals[parent]["seconds_24"] += st["seconds_24"]
-            parent_totals[parent]["entries"] += st["entries"]
-            parent_totals[parent]["issues"].add(key)
-            parent_totals[parent]["epic"] = epic
-
-    rollups_path = pathlib.Path("data") / f"run_{run_id}_rollups.csv"
-    with open(rollups_path, "w", newline="") as f:
-        w = csv.writer(f)
-        w.writerow(["run_id","level","entity_key","epic_key","parent_key","children_count","total_time_bh_hours","total_time_24x7_hours","total_status_entries"])
-        for parent_key, agg in parent_totals.items():
-            w.writerow([run_id,"parent","", "", parent_key, len(agg["issues"]), _hours(agg["seconds_bh"]), _hours(agg["seconds_24"]), agg["entries"]])
-        for epic_key, agg in epic_totals.items():
-            w.writerow([run_id,"epic",epic_key, epic_key, "", len(agg["issues"]), _hours(agg["seconds_bh"]), _hours(agg["seconds_24"]), agg["entries"]])
-
-    meta = {"issues": len(issues), "intervals": len(intervals), "jql": jql}
-    return str(issues_path), str(transitions_path), str(rollups_path), meta
+                _hours(st["seconds_bh"]),
+                _hours(st["seconds_24"]),
+                st["entries"]
+            ], counts, acc])
+            all_statuses.update(counts)
+            hierarchy.add(key, fields.get("issuetype",{}).get("name",""), parent, epic, st["seconds_bh"], st["seconds_24"], st["entries"])
+        await sinks["transitions"].write(rows)
+        await summaries.add(issue_rows)
+        if progress is not None:
+            progress(summaries.count, interval_index)
+
+    top_statuses = sorted(all_statuses)[:20]
+    slots = plan.output_columns(top_statuses)
+    await sinks["issues"].write([ISSUE_COLS + [f"entries_{s}" for s in top_statuses] + plan.header(slots)])
+    async for chunk in summaries.batches(1000):
+        await sinks["issues"].write([
+            row + [counts.get(s, 0) for s in top_statuses] + [_hours(acc[c]) if c < len(acc) else 0.0 for c in slots]
+            for row, counts, acc in chunk
+        ])
+
+    await sinks["rollups"].write(hierarchy.rows(run_id, req.epic_rollup))
+
+    if flow is not None:
+        metrics = flow.rows(req.report, run_id, req.business_hours)
+        await sinks["metrics"].write(metrics)
+
+    meta = {"issues": summaries.count, "intervals": interval_index, "jql": jql, "source": req.source, "report": req.report,
+            "aggregation": req.aggregation, "buckets": [label for group, label in plan.columns if group == "bucket"],
+            "rollup": {"mode": req.epic_rollup, **hierarchy.stats}}
+    if flow is not None:
+        meta["metric_rows"] = len(metrics) - 1
+    if client is not None:
+        meta.update({"changelogs_fetched": client.changelogs_fetched, "changelog_requests": client.changelog_requests})
+    return meta
+
+# ------------------- Worker pool ----------------------------------------------
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_running: Dict[int, asyncio.Task] = {}  # run_id -> engine task, for cancellation
+_cancel_requested: set = set()
+PROGRESS_EVERY = 1.0  # seconds between progress writes to report_runs.meta
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _load_run(run_id: int):
+    with SessionLocal() as db:
+        return db.execute(text("SELECT * FROM report_runs WHERE id = :i"), {"i": run_id}).mappings().first()
+
+def _update_run(run_id: int, **cols) -> None:
+    if "meta" in cols:
+        cols["meta"] = json.dumps(cols["meta"])
+    with SessionLocal() as db:
+        db.execute(text(f"UPDATE report_runs SET {', '.join(f'{c} = :{c}' for c in cols)} WHERE id = :run_id"), {**cols, "run_id": run_id})
+        db.commit()
+
+def _remove_outputs(run_id: int) -> None:
+    for name in ("issues_summary", "status_transitions_long", "rollups") + flow_metrics.REPORTS:
+        (DATA_DIR / f"run_{run_id}_{name}.csv").unlink(missing_ok=True)
+
+async def _process(run_id: int) -> None:
+    row = _load_run(run_id)
+    if not row or row["status"] != "queued":
+        return  # cancelled while queued
+    meta = json.loads(row["meta"]) if row["meta"] else {}
+    req = RunRequest(**meta["request"])
+    meta["attempts"] = meta.get("attempts", 0) + 1
+    meta["progress"] = {"issues": 0, "intervals": 0}
+    _update_run(run_id, status="running", meta=meta)
+    last_write = time.monotonic()
+
+    def progress(issues: int, intervals: int) -> None:
+        nonlocal last_write
+        meta["progress"] = {"issues": issues, "intervals": intervals}
+        if time.monotonic() - last_write >= PROGRESS_EVERY:
+            last_write = time.monotonic()
+            _update_run(run_id, meta=meta)
+
+    task = asyncio.create_task(_execute_run(run_id, req, load_effective_settings(), progress))
+    _running[run_id] = task
+    try:
+        issues_csv, transitions_csv, rollups_csv, result = await task
+    except asyncio.CancelledError:
+        if run_id not in _cancel_requested:
+            raise  # shutdown: the run stays 'running' and is recovered on the next start
+        _remove_outputs(run_id)
+        _update_run(run_id, status="cancelled", completed_at=_now(), error="Cancelled while running", meta=meta)
+        return
+    except Exception as e:
+        _remove_outputs(run_id)
+        detail = e.detail if isinstance(e, HTTPException) else f"{type(e).__name__}: {e}"
+        _update_run(run_id, status="failed", completed_at=_now(), error=str(detail)[:2000], meta=meta)
+        return
+    finally:
+        _running.pop(run_id, None)
+        _cancel_requested.discard(run_id)
+        report_cache.cache.discard_run(run_id)  # re-entered below if the run succeeded
+    meta.update(result)
+    meta["progress"] = {"issues": result["issues"], "intervals": result["intervals"]}
+    meta["csv_rollups_path"] = rollups_csv
+    _update_run(run_id, status="ok", completed_at=_now(), csv_issues_path=issues_csv, csv_transitions_path=transitions_csv, meta=meta)
+    if meta.get("data_version") is not None:
+        report_cache.cache.put(meta["cache_key"], meta["data_version"], run_id)  # TTL counts from completion
+
+async def _worker() -> None:
+    while True:
+        run_id = await _queue.get()
+        try:
+            await _process(run_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # keep the worker alive whatever one run does
+            _update_run(run_id, status="failed", completed_at=_now(), error=f"{type(e).__name__}: {e}"[:2000])
+        finally:
+            _queue.task_done()
+
+def start_workers() -> None:
+    global _queue
+    if _workers:
+        return
+    _queue = asyncio.Queue()
+    for _ in range(max(1, settings.report_workers)):
+        _workers.append(asyncio.create_task(_worker()))
+
+async def stop_workers() -> None:
+    for t in _workers:
+        t.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+def recover_runs() -> Dict[str, int]:
+    """Startup hook: re-queue runs a previous process left queued or running; fail those that
+    have no stored request (older rows) or have already used up REPORT_MAX_ATTEMPTS."""
+    start_workers()
+    counts = {"requeued": 0, "failed": 0}
+    with SessionLocal() as db:
+        rows = db.execute(text("SELECT id, status, meta FROM report_runs WHERE status IN ('queued', 'running') ORDER BY id")).mappings().all()
+    for row in rows:
+        meta = json.loads(row["meta"]) if row["meta"] else {}
+        if "request" not in meta or meta.get("attempts", 0) >= max(1, settings.report_max_attempts):
+            _remove_outputs(row["id"])
+            _update_run(row["id"], status="failed", completed_at=_now(), error="Interrupted by a server restart")
+            counts["failed"] += 1
+            continue
+        if row["status"] == "running":
+            _remove_outputs(row["id"])
+            _update_run(row["id"], status="queued")
+        _queue.put_nowait(row["id"])
+        counts["requeued"] += 1
+    return counts
@@ -14,6 +14,7 @@ class RunRequest(BaseModel):
     labels: Optional[List[str]] = None
     epics: Optional[List[str]] = None
     max_issues: Optional[int] = 25  # NEW: test-time cap
+    source: Literal["live","local"] = "live"  # local: read the ingested jira_issues/jira_transitions instead of Jira
 
 class RunResponse(BaseModel):
     run_id: int
@@ -0,0 +1,68 @@
+from typing import Dict, List, Optional, Tuple
+
+# Time-in-status aggregation for the issues CSV.
+#
+# A run's aggregation mode decides which groups of columns it reports: per status name, per
+# status category (from the Jira status catalog) and per custom bucket (RunRequest.custom_buckets).
+# The plan compiles each status once into the tuple of accumulator columns it feeds, so one
+# pass over an issue's intervals fills every group: status, category and bucket totals come
+# out of the same scan.
+
+GROUPS = {"status": ("status",), "category": ("category",), "both": ("status", "category"), "custom": ("bucket",)}
+UNCATEGORIZED = "Uncategorized"
+UNMAPPED = "Unmapped"
+
+class BucketPlan:
+    def __init__(self, aggregation: str, status_catalog: Dict[str, str], custom_buckets: Optional[Dict[str, str]] = None):
+        self.groups = GROUPS[aggregation]
+        self.catalog = status_catalog
+        # Custom keys match a status name first, then a category name, case-insensitively.
+        self.custom = {k.strip().casefold(): v.strip() for k, v in (custom_buckets or {}).items() if k.strip() and v and v.strip()}
+        self.columns: List[Tuple[str, str]] = []  # (group, label) per accumulator slot
+        self._column_ids: Dict[Tuple[str, str], int] = {}
+        self._targets: Dict[str, Tuple[int, ...]] = {}  # status name -> accumulator slots
+        if "bucket" in self.groups:
+            for label in dict.fromkeys(self.custom.values()):  # declared buckets keep their order, even if empty
+                self._column("bucket", label)
+        for name in status_catalog:
+            self.targets(name)
+
+    def _column(self, group: str, label: str) -> int:
+        c = self._column_ids.get((group, label))
+        if c is None:
+            c = self._column_ids[(group, label)] = len(self.columns)
+            self.columns.append((group, label))
+        return c
+
+    def targets(self, status: str) -> Tuple[int, ...]:
+        t = self._targets.get(status)
+        if t is None:
+            category = self.catalog.get(status, "") or UNCATEGORIZED
+            slots = []
+            if "status" in self.groups:
+                slots.append(self._column("status", status))
+            if "category" in self.groups:
+                slots.append(self._column("category", category))
+            if "bucket" in self.groups:
+                bucket = self.custom.get(status.strip().casefold()) or self.custom.get(category.casefold()) or UNMAPPED
+                slots.append(self._column("bucket", bucket))
+            t = self._targets[status] = tuple(slots)
+        return t
+
+    def add(self, acc: List[int], status: str, seconds: int) -> None:
+        """Add one interval to an issue's accumulator (grown as new statuses appear)."""
+        slots = self.targets(status)
+        if len(acc) < len(self.columns):
+            acc.extend([0] * (len(self.columns) - len(acc)))
+        for c in slots:
+            acc[c] += seconds
+
+    def output_columns(self, statuses: Optional[List[str]] = None) -> List[int]:
+        """Slots to report, in column order; status slots limited to `statuses` when given."""
+        keep = set(statuses) if statuses is not None else None
+        order = {"status": 0, "category": 1, "bucket": 2}
+        slots = [c for c, (group, label) in enumerate(self.columns) if group != "status" or keep is None or label in keep]
+        return sorted(slots, key=lambda c: (order[self.columns[c][0]], self.columns[c][1] if self.columns[c][0] != "bucket" else "", c))
+
+    def header(self, slots: List[int]) -> List[str]:
+        return [f"hours_{self.columns[c][0]}_{self.columns[c][1]}" for c in slots]
@@ -0,0 +1,110 @@
+from typing import Any, AsyncIterator, List, Optional, Sequence
+from io import StringIO
+import asyncio
+import csv
+import json
+import tempfile
+
+# Where the report engine sends CSV rows. The engine writes in batches, so a sink costs one
+# thread hop (file) or one queue slot (stream) per batch rather than per row.
+
+Row = Sequence[Any]
+
+def encode_rows(rows: List[Row]) -> str:
+    buf = StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+class RowSpool:
+    """Rows held back until the columns around them are known (the issues CSV header needs every
+    status of the run). Kept as JSON lines in memory up to `max_bytes`, in an unnamed temp file
+    past that, so a large run does not hold its rows in memory. Writes and reads run in a worker
+    thread, as the file sink's do, since past the threshold they are disk I/O."""
+
+    def __init__(self, max_bytes: int = 8 << 20):
+        self._f = tempfile.SpooledTemporaryFile(max_size=max_bytes, mode="w+", encoding="utf-8")
+        self.count = 0
+
+    def _write(self, rows: List[Any]) -> None:
+        self._f.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in rows))
+
+    def _read(self, size: int) -> List[Any]:
+        batch: List[Any] = []
+        while len(batch) < size:
+            line = self._f.readline()
+            if not line:
+                break
+            batch.append(json.loads(line))
+        return batch
+
+    async def add(self, rows: List[Any]) -> None:
+        await asyncio.to_thread(self._write, rows)
+        self.count += len(rows)
+
+    async def batches(self, size: int) -> AsyncIterator[List[Any]]:
+        """Every row added so far, in order, `size` at a time."""
+        await asyncio.to_thread(self._f.seek, 0)
+        while True:
+            batch = await asyncio.to_thread(self._read, size)
+            if not batch:
+                return
+            yield batch
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._f.close)
+
+class NullSink:
+    async def write(self, rows: List[Row]) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+class FileSink:
+    """Appends rows to a CSV file; open, write and close run in a worker thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = None
+
+    async def write(self, rows: List[Row]) -> None:
+        if not rows:
+            return
+        if self._f is None:
+            self._f = await asyncio.to_thread(open, self.path, "w", newline="")
+        await asyncio.to_thread(self._f.write, encode_rows(rows))
+
+    async def close(self) -> None:
+        if self._f is None:
+            self._f = await asyncio.to_thread(open, self.path, "w", newline="")
+        await asyncio.to_thread(self._f.close)
+
+class StreamSink:
+    """Hands encoded rows to a response body through a bounded queue.
+
+    A slow client fills the queue and the engine waits on it, so nothing accumulates.
+    """
+
+    def __init__(self, max_chunks: int = 16):
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=max_chunks)
+
+    async def write(self, rows: List[Row]) -> None:
+        if rows:
+            await self._queue.put(encode_rows(rows))
+
+    async def close(self) -> None:
+        await self._queue.put(None)
+
+    async def body(self, producer: "asyncio.Task") -> AsyncIterator[bytes]:
+        """Response body. The producer always closes the sink, even on failure; awaiting it after
+        the end marker re-raises its error, so a failed export never looks complete."""
+        try:
+            while True:
+                chunk = await self._queue.get()
+                if chunk is None:
+                    await producer
+                    return
+                yield chunk.encode("utf-8")
+        finally:
+            if not producer.done():
+                producer.cancel()  # client went away
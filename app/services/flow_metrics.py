@@ -0,0 +1,180 @@
+from typing import Any, Dict, List, Tuple
+from array import array
+from datetime import datetime, timezone
+import numpy as np
+
+# Throughput, cycle time and aging WIP over the report's status intervals.
+#
+# The engine records one compact row per interval (issue index, status category, entered
+# timestamp, seconds in the interval) while it writes the transitions CSV. The metrics are
+# then a handful of whole-array passes: per-issue start/finish come from the first
+# "In Progress" entry and the last interval, elapsed time is a bincount over the intervals in
+# between, and the distributions are sorted segments. Nothing loops per issue in Python.
+
+REPORTS = ("throughput", "cycle_time", "aging_wip")
+TODO, IN_PROGRESS, DONE = 0, 1, 2
+# statusCategory names (and keys) as Jira returns them
+CATEGORY_CODES = {"to do": TODO, "new": TODO, "in progress": IN_PROGRESS, "indeterminate": IN_PROGRESS, "done": DONE}
+# Used when the status catalog does not know a status (e.g. a local run before any live one)
+TODO_NAMES = {"to do", "open", "backlog", "new", "selected for development"}
+DONE_NAMES = {"done", "closed", "resolved", "cancelled", "won't do"}
+PERCENTILES = (50, 70, 85, 95)
+AGE_BINS_DAYS = (1, 3, 7, 14, 30)
+DAY = 86400
+WEEK = 7 * DAY
+EPOCH_MONDAY = -3 * DAY  # 1970-01-01 was a Thursday
+
+THROUGHPUT_COLS = ["run_id","project_key","week_start","completed"]
+CYCLE_TIME_COLS = ["run_id","issue_type","completed"] + ["mean_hours"] + [f"p{p}_hours" for p in PERCENTILES] + ["max_hours","basis"]
+_AGE_LABELS = [f"age_{lo}_{hi}d" for lo, hi in zip((0,) + AGE_BINS_DAYS, AGE_BINS_DAYS)] + [f"age_{AGE_BINS_DAYS[-1]}d_plus"]
+AGING_WIP_COLS = ["run_id","status_name","in_progress","p50_age_hours","p85_age_hours","max_age_hours"] + _AGE_LABELS + ["basis"]
+COLUMNS = {"throughput": THROUGHPUT_COLS, "cycle_time": CYCLE_TIME_COLS, "aging_wip": AGING_WIP_COLS}
+
+def category_code(category: str, status: str) -> int:
+    code = CATEGORY_CODES.get((category or "").strip().lower())
+    if code is not None:
+        return code
+    name = (status or "").strip().lower()
+    if name in DONE_NAMES:
+        return DONE
+    return TODO if name in TODO_NAMES else IN_PROGRESS
+
+class _Codes(dict):
+    """Label -> small int, in first-seen order."""
+
+    def code(self, label: str) -> int:
+        c = self.get(label)
+        if c is None:
+            c = self[label] = len(self)
+        return c
+
+    def labels(self) -> List[str]:
+        return list(self)
+
+class FlowCollector:
+    def __init__(self):
+        self.projects = _Codes()
+        self.types = _Codes()
+        self.statuses = _Codes()
+        self._issue_project = array("q")
+        self._issue_type = array("q")
+        self._issue_status = array("q")
+        self._iv_issue = array("q")
+        self._iv_cat = array("b")
+        self._iv_entered = array("d")
+        self._iv_secbh = array("d")
+        self._iv_sec24 = array("d")
+
+    def issue(self, project: str, issue_type: str, status: str) -> int:
+        """Register an issue; its intervals must follow, oldest first."""
+        self._issue_project.append(self.projects.code(project))
+        self._issue_type.append(self.types.code(issue_type))
+        self._issue_status.append(self.statuses.code(status))
+        return len(self._issue_project) - 1
+
+    def interval(self, issue: int, category: int, entered: float, secbh: int, sec24: int) -> None:
+        self._iv_issue.append(issue)
+        self._iv_cat.append(category)
+        self._iv_entered.append(entered)
+        self._iv_secbh.append(secbh)
+        self._iv_sec24.append(sec24)
+
+    def __len__(self) -> int:
+        return len(self._issue_project)
+
+    def _flow(self, business_hours: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Per issue: started (first In Progress entry), finished (entry into a final Done
+        status), whether it is in progress now, and seconds elapsed since it started (to
+        finished, or to now while in progress). NaN where undefined."""
+        n = len(self)
+        iss = np.frombuffer(self._iv_issue, dtype=np.int64) if self._iv_issue else np.zeros(0, dtype=np.int64)
+        cat = np.frombuffer(self._iv_cat, dtype=np.int8) if self._iv_cat else np.zeros(0, dtype=np.int8)
+        entered = np.frombuffer(self._iv_entered) if self._iv_entered else np.zeros(0)
+        secs = np.frombuffer(self._iv_secbh if business_hours else self._iv_sec24) if self._iv_issue else np.zeros(0)
+
+        started = np.full(n, np.nan)
+        in_progress = cat == IN_PROGRESS
+        first, at = np.unique(iss[in_progress], return_index=True)
+        started[first] = entered[in_progress][at]
+
+        finished = np.full(n, np.nan)
+        wip = np.zeros(n, dtype=bool)
+        if len(iss):
+            last = np.r_[iss[1:] != iss[:-1], True]  # intervals are grouped per issue, in time order
+            last_issue, last_cat = iss[last], cat[last]
+            finished[last_issue[last_cat == DONE]] = entered[last][last_cat == DONE]
+            wip[last_issue[last_cat == IN_PROGRESS]] = True
+        wip &= ~np.isnan(started)
+
+        # Time between start and finish (or now) is the sum of the intervals entered in that
+        # span; with business hours on this is business seconds, not wall-clock.
+        end = np.where(wip, np.inf, finished)
+        counted = (entered >= started[iss]) & (entered < end[iss])  # NaN compares false
+        # bincount gives ints when there are no intervals at all; NaN below needs floats
+        elapsed = np.bincount(iss, weights=np.where(counted, secs, 0.0), minlength=n).astype(np.float64, copy=False)
+        elapsed[np.isnan(started) | (np.isnan(finished) & ~wip)] = np.nan
+        return started, finished, wip, elapsed
+
+    def rows(self, report: str, run_id: int, business_hours: bool) -> List[List[Any]]:
+        """CSV rows (header first) for one of REPORTS."""
+        if report == "throughput":
+            return [THROUGHPUT_COLS] + self._throughput(run_id)
+        basis = "business_hours" if business_hours else "24x7"
+        _, finished, wip, elapsed = self._flow(business_hours)
+        if report == "cycle_time":
+            done = ~np.isnan(finished) & ~np.isnan(elapsed)
+            groups = np.frombuffer(self._issue_type, dtype=np.int64)[done] if len(self) else np.zeros(0, dtype=np.int64)
+            return [CYCLE_TIME_COLS] + self._cycle_time(run_id, groups, elapsed[done], basis)
+        if report == "aging_wip":
+            groups = np.frombuffer(self._issue_status, dtype=np.int64)[wip] if len(self) else np.zeros(0, dtype=np.int64)
+            return [AGING_WIP_COLS] + self._aging(run_id, groups, elapsed[wip], basis)
+        raise ValueError(f"unknown flow report {report!r}")
+
+    def _throughput(self, run_id: int) -> List[List[Any]]:
+        """Issues finished per project per week (Monday 00:00 UTC), zero weeks included."""
+        _, finished, _, _ = self._flow(False)
+        done = ~np.isnan(finished)
+        if not done.any():
+            return []
+        project = np.frombuffer(self._issue_project, dtype=np.int64)[done]
+        week = np.floor((finished[done] - EPOCH_MONDAY) / WEEK).astype(np.int64)
+        w0, nweeks = week.min(), int(week.max() - week.min()) + 1
+        nproj = len(self.projects)
+        counts = np.bincount(project * nweeks + (week - w0), minlength=nproj * nweeks).reshape(nproj, nweeks)
+        labels = self.projects.labels()
+        starts = [datetime.fromtimestamp(int(w0 + i) * WEEK + EPOCH_MONDAY, tz=timezone.utc).date().isoformat() for i in range(nweeks)]
+        return [[run_id, labels[p], starts[w], int(counts[p, w])] for p in np.flatnonzero(counts.sum(axis=1)) for w in range(nweeks)]
+
+    def _cycle_time(self, run_id: int, groups: np.ndarray, seconds: np.ndarray, basis: str) -> List[List[Any]]:
+        hours = seconds / 3600.0
+        labels = self.types.labels()
+        out = []
+        for g, values in [(None, np.sort(hours))] + _segments(groups, hours, len(labels)):
+            if len(values) == 0:
+                continue
+            pct = np.percentile(values, PERCENTILES)
+            out.append([run_id, "All" if g is None else labels[g], len(values), round(float(values.mean()), 2)]
+                       + [round(float(p), 2) for p in pct] + [round(float(values[-1]), 2), basis])
+        return out
+
+    def _aging(self, run_id: int, groups: np.ndarray, seconds: np.ndarray, basis: str) -> List[List[Any]]:
+        # Buckets are 24-hour days of age on the run's basis, like the hour columns.
+        hours = seconds / 3600.0
+        labels = self.statuses.labels()
+        out = []
+        for g, values in [(None, np.sort(hours))] + _segments(groups, hours, len(labels)):
+            if len(values) == 0:
+                continue
+            p50, p85 = np.percentile(values, (50, 85))
+            bins = np.bincount(np.digitize(values / 24.0, AGE_BINS_DAYS), minlength=len(AGE_BINS_DAYS) + 1)
+            out.append([run_id, "All" if g is None else labels[g], len(values), round(float(p50), 2), round(float(p85), 2), round(float(values[-1]), 2)]
+                       + [int(b) for b in bins] + [basis])
+        return out
+
+def _segments(groups: np.ndarray, values: np.ndarray, ngroups: int) -> List[Tuple[int, np.ndarray]]:
+    """(group, sorted values) for every group, from one lexsort."""
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    counts = np.bincount(groups, minlength=ngroups)
+    bounds = np.r_[0, np.cumsum(counts)]
+    return [(g, sorted_values[bounds[g]:bounds[g + 1]]) for g in range(ngroups)]
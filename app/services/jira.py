@@ -1,73 +1,142 @@
-import httpx
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional
 from urllib.parse import urlencode
+import asyncio
+from ..config import settings
+from . import jira_http, jira_stream
+
+# Page size of /issue/{key}/changelog; also the most histories search embeds per issue.
+CHANGELOG_PAGE = 100
 
 class JiraClient:
     def __init__(self, base_url: str, email: str, api_token: str):
         self.base = base_url.rstrip("/")
         self.auth = (email, api_token)
         self.headers = {"Accept": "application/json"}
+        self.changelog_requests = 0
+        self.changelogs_fetched = 0  # issues whose history was paged from /changelog
 
     async def test_connection(self) -> bool:
         if not self.auth[1]:
             return False
         url = f"{self.base}/rest/api/3/myself"
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            r = await client.get(url, auth=self.auth, headers=self.headers)
-            return r.status_code == 200
+        client = jira_http.get_client()
+        r = await client.get(url, auth=self.auth, headers=self.headers)
+        return r.status_code == 200
 
-    async def search_issues(self, jql: str, fields: List[str], expand_changelog: bool=False, max_total: Optional[int]=None):
+    async def iter_issues(self, jql: str, fields: List[str], expand_changelog: bool=False, max_total: Optional[int]=None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield search results one issue at a time, parsing each page while it downloads."""
         start_at = 0
         max_results = 100
-        issues: List[Dict[str, Any]] = []
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            while True:
-                if max_total is not None:
-                    remaining = max_total - len(issues)
-                    if remaining <= 0:
-                        break
-                    max_results = min(max_results, max(1, remaining))
-                params = {
-                    "jql": jql,
-                    "startAt": start_at,
-                    "maxResults": max_results,
-                    "fields": ",".join(fields),
-                    "expand": "changelog" if expand_changelog else None
-                }
-                url = f"{self.base}/rest/api/3/search?{urlencode({k:v for k,v in params.items() if v is not None})}"
+        seen = 0
+        client = jira_http.get_client()
+        while True:
+            if max_total is not None:
+                remaining = max_total - seen
+                if remaining <= 0:
+                    break
+                max_results = min(max_results, max(1, remaining))
+            params = {
+                "jql": jql,
+                "startAt": start_at,
+                "maxResults": max_results,
+                "fields": ",".join(fields),
+                "expand": "changelog" if expand_changelog else None
+            }
+            url = f"{self.base}/rest/api/3/search?{urlencode({k:v for k,v in params.items() if v is not None})}"
+            meta: Dict[str, Any] = {}
+            returned = 0
+            if settings.jira_stream_search:
+                async with client.stream("GET", url, auth=self.auth, headers=self.headers) as r:
+                    if r.status_code >= 400:
+                        await r.aread()
+                    r.raise_for_status()
+                    async for issue in jira_stream.iter_search_page(r, meta):
+                        returned += 1
+                        if max_total is not None and seen >= max_total:
+                            continue
+                        seen += 1
+                        yield issue
+            else:
                 r = await client.get(url, auth=self.auth, headers=self.headers)
                 r.raise_for_status()
-                data = r.json()
-                issues.extend(data.get("issues", []))
-                if start_at + max_results >= data.get("total", 0):
-                    break
-                start_at += max_results
-        if max_total is not None and len(issues) > max_total:
-            issues = issues[:max_total]
-        return issues
+                meta = r.json()
+                page = meta.pop("issues", None) or []
+                returned = len(page)
+                for issue in page:
+                    if max_total is not None and seen >= max_total:
+                        break
+                    seen += 1
+                    yield issue
+            # Jira may serve fewer than asked (it lowers maxResults with expand=changelog), so
+            # the next page starts after what this one actually held.
+            max_results = min(max_results, meta.get("maxResults") or max_results)
+            start_at += returned
+            if returned == 0 or start_at >= meta.get("total", 0):
+                break
 
-    async def get_issue_changelog(self, key: str):
-        start_at = 0
-        max_results = 100
-        histories: List[Dict[str, Any]] = []
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            while True:
-                url = f"{self.base}/rest/api/3/issue/{key}/changelog?startAt={start_at}&maxResults={max_results}"
+    async def scope_version(self, jql: str) -> str:
+        """Fingerprint of what an `ORDER BY updated DESC` query matches: its total and newest update."""
+        url = f"{self.base}/rest/api/3/search?{urlencode({'jql': jql, 'maxResults': 1, 'fields': 'updated'})}"
+        r = await jira_http.get_client().get(url, auth=self.auth, headers=self.headers)
+        r.raise_for_status()
+        data = r.json()
+        issues = data.get("issues") or []
+        newest = ((issues[0].get("fields") or {}).get("updated") or "") if issues else ""
+        return f"{data.get('total', 0)}|{newest}"
+
+    async def search_issues(self, jql: str, fields: List[str], expand_changelog: bool=False, max_total: Optional[int]=None):
+        return [issue async for issue in self.iter_issues(jql, fields, expand_changelog, max_total)]
+
+    async def _changelog_page(self, key: str, start_at: int, sem: Optional[asyncio.Semaphore]) -> Dict[str, Any]:
+        url = f"{self.base}/rest/api/3/issue/{key}/changelog?startAt={start_at}&maxResults={CHANGELOG_PAGE}"
+        client = jira_http.get_client()
+        if sem is None:
+            r = await client.get(url, auth=self.auth, headers=self.headers)
+        else:
+            async with sem:
                 r = await client.get(url, auth=self.auth, headers=self.headers)
-                r.raise_for_status()
-                data = r.json()
-                histories.extend(data.get("values", []))
-                if start_at + max_results >= data.get("total", 0):
-                    break
-                start_at += max_results
+        self.changelog_requests += 1
+        r.raise_for_status()
+        return r.json()
+
+    async def get_issue_changelog(self, key: str, sem: Optional[asyncio.Semaphore] = None):
+        """Full history of one issue, oldest page first; pages after the first are fetched concurrently."""
+        first = await self._changelog_page(key, 0, sem)
+        histories: List[Dict[str, Any]] = list(first.get("values", []))
+        total = first.get("total", 0)
+        step = first.get("maxResults") or CHANGELOG_PAGE
+        if histories:
+            rest = await asyncio.gather(*(self._changelog_page(key, off, sem) for off in range(len(histories), total, step)))
+            for page in rest:
+                histories.extend(page.get("values", []))
         return histories
 
+    async def get_changelogs(self, issues: List[Dict[str, Any]], concurrency: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """Histories for each issue, in the order given.
+
+        Issues searched with expand=changelog keep their embedded histories; only those whose
+        embedded changelog was truncated (more than 100 histories) are paged from
+        /issue/{key}/changelog, at most `concurrency` requests at a time.
+        """
+        sem = asyncio.Semaphore(max(1, concurrency or settings.jira_changelog_concurrency))
+
+        async def _one(issue: Dict[str, Any]) -> List[Dict[str, Any]]:
+            cl = issue.get("changelog")
+            if cl is not None:
+                histories = cl.get("histories") or []
+                if cl.get("total") is None or cl["total"] <= len(histories):
+                    return histories
+            self.changelogs_fetched += 1
+            return await self.get_issue_changelog(issue["key"], sem)
+
+        return list(await asyncio.gather(*(_one(issue) for issue in issues)))
+
     async def get_status_catalog(self) -> Dict[str, str]:
         url = f"{self.base}/rest/api/3/status"
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            r = await client.get(url, auth=self.auth, headers=self.headers)
-            r.raise_for_status()
-            arr = r.json()
+        client = jira_http.get_client()
+        r = await client.get(url, auth=self.auth, headers=self.headers)
+        r.raise_for_status()
+        arr = r.json()
         out: Dict[str, str] = {}
         for s in arr:
             name = s.get("name") or ""
@@ -0,0 +1,123 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.orm import sessionmaker
+from ..config import settings
+from ..db import SessionLocal
+
+# Reads the normalized copy the backend ingest keeps in jira_issues / jira_transitions, so
+# reports can run without touching Jira. Rows come back in the same shape the search API
+# returns, which lets the report engine treat both sources alike.
+
+IN_CHUNK = 500  # ids per IN (...) list; SQLite caps bound parameters per statement
+
+_store_session = None
+
+def _session():
+    """Session on the ingest store: this app's database unless JIRA_STORE_PATH points elsewhere."""
+    global _store_session
+    path = settings.jira_store_path
+    if not path or path == settings.sqlite_path:
+        return SessionLocal()
+    if _store_session is None:
+        engine = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true", echo=False, future=True)
+        _store_session = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    return _store_session()
+
+def _jira_ts(value: Any) -> str:
+    """Stored DateTime (UTC, naive) -> Jira's timestamp format."""
+    if not value:
+        return ""
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}+0000"
+
+def _issue(row) -> Dict[str, Any]:
+    return {
+        "id": row["issue_id"],
+        "key": row["key"],
+        "fields": {
+            "project": {"key": row["project_key"]},
+            "issuetype": {"name": row["issue_type"] or ""},
+            "summary": row["summary"] or "",
+            "status": {"name": row["status"] or ""},
+            "created": _jira_ts(row["created"]),
+            "updated": _jira_ts(row["updated"]),
+            "customfield_10014": row["epic_key"] or "",
+            "parent": {"key": row["parent_key"]} if row["parent_key"] else None,
+            "labels": (row["labels"] or "").split(),
+        },
+    }
+
+def iter_issue_batches(project_keys: List[str], window_days: int, max_issues: Optional[int], batch_size: int) -> Iterator[List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]]:
+    """Issues updated within the window, newest first, with their status histories, in batches.
+
+    Uses idx_jira_issues_project_updated for the issue scan (read with a cursor, batch by batch)
+    and the issue_id index for each batch's transitions.
+    """
+    since = (datetime.now(timezone.utc) - timedelta(days=window_days)).replace(tzinfo=None)
+    sql = (
+        "SELECT issue_id, key, project_key, issue_type, summary, status, assignee, epic_key, parent_key, labels, created, updated "
+        "FROM jira_issues WHERE project_key IN :projects AND updated >= :since ORDER BY updated DESC"
+    )
+    params: Dict[str, Any] = {"projects": list(project_keys), "since": since.strftime("%Y-%m-%d %H:%M:%S.%f")}
+    if max_issues:
+        sql += " LIMIT :limit"
+        params["limit"] = max_issues
+    transitions = text(
+        'SELECT issue_id, "when", author, from_status, to_status FROM jira_transitions '
+        'WHERE issue_id IN :ids ORDER BY issue_id, "when", id'
+    ).bindparams(bindparam("ids", expanding=True))
+    with _session() as db:
+        try:
+            result = db.execute(text(sql).bindparams(bindparam("projects", expanding=True)), params).mappings()
+        except Exception as e:
+            if "no such table" in str(e):
+                raise HTTPException(409, "No locally ingested Jira data; run an ingest (POST /api/jira/ingest) or use source=live")
+            if "no such column" in str(e):
+                raise HTTPException(409, "The ingest store predates this version; run an ingest (POST /api/jira/ingest) to migrate it")
+            raise
+        while True:
+            rows = result.fetchmany(max(1, min(batch_size, IN_CHUNK)))
+            if not rows:
+                break
+            issues = [_issue(r) for r in rows]
+            histories: Dict[str, List[Dict[str, Any]]] = {i["id"]: [] for i in issues}
+            # A second cursor on the same connection; the issue scan stays open underneath.
+            for t in db.execute(transitions, {"ids": list(histories)}).mappings():
+                histories[t["issue_id"]].append({
+                    "created": _jira_ts(t["when"]),
+                    "author": {"displayName": t["author"] or ""},
+                    "items": [{"field": "status", "fromString": t["from_status"], "toString": t["to_status"]}],
+                })
+            yield [(i, histories[i["id"]]) for i in issues]
+
+def data_version(project_keys: List[str]) -> str:
+    """Changes whenever ingest, a webhook or a reconcile sweep changes the projects' rows."""
+    scope = text("SELECT COUNT(*), MAX(updated) FROM jira_issues WHERE project_key IN :projects").bindparams(bindparam("projects", expanding=True))
+    with _session() as db:
+        try:
+            count, newest = db.execute(scope, {"projects": list(project_keys)}).one()
+            last_transition = db.execute(text("SELECT MAX(id) FROM jira_transitions")).scalar()
+        except Exception as e:
+            if "no such table" in str(e):
+                return "empty"
+            raise
+    return f"{count}|{newest or ''}|{last_transition or 0}"
+
+def save_status_catalog(catalog: Dict[str, str]) -> None:
+    """Remember the last status -> category map seen live, for local runs."""
+    if not catalog:
+        return
+    with SessionLocal() as db:
+        db.execute(
+            text("INSERT INTO jira_statuses (name, category) VALUES (:n, :c) ON CONFLICT(name) DO UPDATE SET category = excluded.category"),
+            [{"n": name, "c": cat} for name, cat in catalog.items()],
+        )
+        db.commit()
+
+def load_status_catalog() -> Dict[str, str]:
+    with SessionLocal() as db:
+        return {name: cat for name, cat in db.execute(text("SELECT name, category FROM jira_statuses")).all()}
@@ -0,0 +1,90 @@
+from typing import Any, Callable, Dict, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import time
+from ..config import settings
+from ..schemas import RunRequest
+
+# Report runs by request, so a dashboard re-posting the same RunRequest gets the existing run.
+#
+# The key is a hash of the request in canonical form plus the effective settings that shape the
+# output. Each entry also holds the data version the run was computed against (for local runs
+# the newest `updated` and row counts of the ingest store, for live ones Jira's total and newest
+# `updated` for the scope). A different version is a miss and replaces the entry. Open
+# intervals are measured up to the moment a run executes, so REPORT_CACHE_TTL_SECONDS bounds
+# how stale those durations get even when no data changes.
+#
+# Runs are entered when queued, so identical requests arriving while one is in flight share it.
+
+# Settings that change the CSVs without appearing in the request
+EFFECTIVE_KEYS = ("jira_base_url", "timezone", "business_hours_start", "business_hours_end", "business_days")
+
+def request_key(req: RunRequest, eff: dict) -> str:
+    body = req.model_dump()
+    body["project_keys"] = sorted({k.strip() for k in req.project_keys if k.strip()})
+    for name in ("labels", "epics"):
+        body[name] = sorted(set(body[name] or []))
+    body["jql"] = (req.jql or "").strip()
+    body["window_days"] = req.window_days or eff["default_window_days"]
+    body["max_issues"] = req.max_issues or 25
+    body["custom_buckets"] = body["custom_buckets"] if req.aggregation == "custom" else None
+    body["settings"] = {k: eff.get(k) for k in EFFECTIVE_KEYS}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+class ReportCache:
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # key -> {"run_id", "version", "at"}, oldest first
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "expired": 0, "evicted": 0, "invalidated": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """False with REPORT_CACHE_SIZE=0: callers then skip working out a data version at all."""
+        return settings.report_cache_size > 0
+
+    def get(self, key: str, version: str, valid: Callable[[int], bool]) -> Optional[int]:
+        """Run id cached for `key` at `version`, if it is fresh and `valid(run_id)` still holds."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._counters["misses"] += 1
+            return None
+        if entry["version"] != version:
+            reason = "stale"
+        elif time.monotonic() - entry["at"] > settings.report_cache_ttl_seconds:
+            reason = "expired"
+        elif not valid(entry["run_id"]):
+            reason = "invalidated"
+        else:
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry["run_id"]
+        del self._entries[key]
+        self._counters[reason] += 1
+        self._counters["misses"] += 1
+        return None
+
+    def put(self, key: str, version: str, run_id: int) -> None:
+        if not self.enabled:
+            return
+        size = settings.report_cache_size
+        self._entries[key] = {"run_id": run_id, "version": version, "at": time.monotonic()}
+        self._entries.move_to_end(key)
+        while len(self._entries) > size:
+            self._entries.popitem(last=False)
+            self._counters["evicted"] += 1
+
+    def discard_run(self, run_id: int) -> None:
+        for key in [k for k, e in self._entries.items() if e["run_id"] == run_id]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            "entries": len(self._entries),
+            "size": settings.report_cache_size,
+            "ttl_seconds": settings.report_cache_ttl_seconds,
+            **self._counters,
+            "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else None,
+        }
+
+cache = ReportCache()
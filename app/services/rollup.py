@@ -1,4 +1,117 @@
-from typing import Dict, Any, List
+from typing import Any, Dict, List
+from array import array
 
-def build_rollups(issues: List[dict]) -> Dict[str, Any]:
-    return {"issue_count": len(issues)}
+# Epic / parent rollups for a report run.
+#
+# Every issue in the run, and every parent or epic they point at, is one node with an index into
+# flat counter arrays. Each node has a single upward link: its parent if it has one
+# (sub-task -> story, epic -> initiative, team-managed story -> epic), else its epic link.
+# full_rollup walks the nodes once, leaves first, adding each node's own totals and its subtree
+# into the node above, so an initiative sums every level beneath it. epic_only keeps the
+# one-level view: each epic totals the issues linked to it directly.
+
+COLUMNS = ["run_id","level","entity_key","epic_key","parent_key","children_count","total_time_bh_hours","total_time_24x7_hours","total_status_entries","descendants_count"]
+
+def _hours(seconds: int) -> float:
+    return round(seconds / 3600.0, 2)
+
+class RollupIndex:
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.keys: List[str] = []
+        self._parent = array("q")  # node index, -1 for none
+        self._epic = array("q")
+        self._is_epic = array("b")  # issue type Epic, or the target of an epic link
+        self._own_bh = array("q")
+        self._own_24 = array("q")
+        self._own_entries = array("q")
+        self.stats: Dict[str, int] = {}
+
+    def _node(self, key: str) -> int:
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = len(self.keys)
+            self.keys.append(key)
+            for a in (self._parent, self._epic):
+                a.append(-1)
+            for a in (self._is_epic, self._own_bh, self._own_24, self._own_entries):
+                a.append(0)
+        return i
+
+    def add(self, key: str, issue_type: str, parent_key: str, epic_key: str, seconds_bh: int, seconds_24: int, entries: int) -> None:
+        """Record one issue of the run with its own time in status."""
+        i = self._node(key)
+        self._parent[i] = self._node(parent_key) if parent_key and parent_key != key else -1
+        self._epic[i] = self._node(epic_key) if epic_key and epic_key != key else -1
+        if self._epic[i] >= 0:
+            self._is_epic[self._epic[i]] = 1
+        if (issue_type or "").lower() == "epic":
+            self._is_epic[i] = 1
+        self._own_bh[i] = seconds_bh
+        self._own_24[i] = seconds_24
+        self._own_entries[i] = entries
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _up(self) -> array:
+        return array("q", (p if p >= 0 else e for p, e in zip(self._parent, self._epic)))
+
+    def rows(self, run_id: int, mode: str) -> List[List[Any]]:
+        """Rollup CSV rows (header first), one per node with children."""
+        return [COLUMNS] + (self._epic_only(run_id) if mode == "epic_only" else self._full(run_id))
+
+    def _row(self, run_id: int, i: int, level: str, children: int, bh: int, h24: int, entries: int, descendants: int) -> List[Any]:
+        epic = self._epic[i]
+        parent = self._parent[i]
+        return [run_id, level, self.keys[i], self.keys[epic] if epic >= 0 else (self.keys[i] if level == "epic" else ""),
+                self.keys[parent] if parent >= 0 else "", children, _hours(bh), _hours(h24), entries, descendants]
+
+    def _epic_only(self, run_id: int) -> List[List[Any]]:
+        n = len(self)
+        children, bh, h24, entries = array("q", bytes(8 * n)), array("q", bytes(8 * n)), array("q", bytes(8 * n)), array("q", bytes(8 * n))
+        for i in range(n):
+            u = self._epic[i] if self._epic[i] >= 0 else self._parent[i]
+            if u >= 0 and self._is_epic[u]:
+                children[u] += 1
+                bh[u] += self._own_bh[i]
+                h24[u] += self._own_24[i]
+                entries[u] += self._own_entries[i]
+        self.stats = {"nodes": n, "levels": 2 if any(children) else min(n, 1), "cycle_nodes": 0}
+        return [self._row(run_id, i, "epic", children[i], bh[i], h24[i], entries[i], children[i]) for i in range(n) if children[i]]
+
+    def _full(self, run_id: int) -> List[List[Any]]:
+        n = len(self)
+        up = self._up()
+        children = array("q", bytes(8 * n))
+        for u in up:
+            if u >= 0:
+                children[u] += 1
+        # Subtree totals, excluding the node itself
+        bh, h24, entries, descendants = array("q", bytes(8 * n)), array("q", bytes(8 * n)), array("q", bytes(8 * n)), array("q", bytes(8 * n))
+        height = array("q", bytes(8 * n))  # levels below the node
+        has_epic_child = array("b", bytes(n))
+        pending = array("q", children)
+        order = [i for i in range(n) if not pending[i]]
+        for i in order:  # grows as parents become ready: a single leaves-first pass
+            u = up[i]
+            if u < 0:
+                continue
+            bh[u] += bh[i] + self._own_bh[i]
+            h24[u] += h24[i] + self._own_24[i]
+            entries[u] += entries[i] + self._own_entries[i]
+            descendants[u] += descendants[i] + 1
+            height[u] = max(height[u], height[i] + 1)
+            if self._is_epic[i]:
+                has_epic_child[u] = 1
+            pending[u] -= 1
+            if not pending[u]:
+                order.append(u)
+        # Nodes on a parent loop never become ready and are left out.
+        self.stats = {"nodes": n, "levels": max(height, default=-1) + 1, "cycle_nodes": n - len(order)}
+        out = []
+        for i in order:
+            if children[i]:
+                level = "epic" if self._is_epic[i] else ("initiative" if has_epic_child[i] else "parent")
+                out.append(self._row(run_id, i, level, children[i], bh[i], h24[i], entries[i], descendants[i]))
+        return out
@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy import text
 from ..db.database import get_sessionmaker
+from ..services import jira_creds
 from .deps import current_admin
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -84,5 +85,6 @@ async def put_settings_route(payload: SettingsPayload, _=Depends(current_admin))
     async with Session() as session:
         await session.execute(text(sql), params)
         await session.commit()
+    jira_creds.invalidate()
 
     return {"ok": True, "updated": True}
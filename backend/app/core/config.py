@@ -19,6 +19,52 @@ class Settings(BaseSettings):
 
     default_window_days: int = Field(default=180, alias="DEFAULT_WINDOW_DAYS")
 
+    # Shared Jira HTTP client (one pool for the whole app)
+    jira_http_max_connections: int = Field(default=20, alias="JIRA_HTTP_MAX_CONNECTIONS")
+    jira_http_max_keepalive: int = Field(default=20, alias="JIRA_HTTP_MAX_KEEPALIVE")
+    jira_http_keepalive_expiry: float = Field(default=30.0, alias="JIRA_HTTP_KEEPALIVE_EXPIRY")
+    jira_http_timeout: float = Field(default=60.0, alias="JIRA_HTTP_TIMEOUT")
+    jira_http2: bool = Field(default=False, alias="JIRA_HTTP2")  # needs the h2 package
+
+    # Per-site request budget and retry policy for 429/503 responses
+    jira_rate_limit_rps: float = Field(default=10.0, alias="JIRA_RATE_LIMIT_RPS")  # 0 disables the budget
+    jira_rate_limit_burst: int = Field(default=20, alias="JIRA_RATE_LIMIT_BURST")
+    jira_retry_max: int = Field(default=6, alias="JIRA_RETRY_MAX")
+    jira_retry_base_delay: float = Field(default=1.0, alias="JIRA_RETRY_BASE_DELAY")
+    jira_retry_max_delay: float = Field(default=120.0, alias="JIRA_RETRY_MAX_DELAY")
+
+    # Number of /search pages POST /jira/ingest keeps in flight at once
+    jira_ingest_concurrency: int = Field(default=4, alias="JIRA_INGEST_CONCURRENCY")
+    # Background ingest jobs run at most this many at a time
+    jira_ingest_workers: int = Field(default=1, alias="JIRA_INGEST_WORKERS")
+    # Raw payload kept per issue (jira_issue_blobs): none | fields-only (no changelog) | full
+    jira_ingest_raw_storage: str = Field(default="full", alias="JIRA_INGEST_RAW_STORAGE")
+    # Compression for jira_issue_blobs: zlib | zstd (zstd needs the zstandard package)
+    jira_raw_codec: str = Field(default="zlib", alias="JIRA_RAW_CODEC")
+    # Delta ingests re-read this many minutes before the stored high-water mark
+    jira_sync_overlap_minutes: int = Field(default=10, alias="JIRA_SYNC_OVERLAP_MINUTES")
+    # Ingest pipeline: threads parsing issues, parsed pages buffered for the writer, pages per write transaction
+    jira_ingest_parse_workers: int = Field(default=2, alias="JIRA_INGEST_PARSE_WORKERS")
+    jira_ingest_queue_pages: int = Field(default=16, alias="JIRA_INGEST_QUEUE_PAGES")
+    jira_ingest_write_batch: int = Field(default=8, alias="JIRA_INGEST_WRITE_BATCH")
+    # A project with more issues than this in its window is ingested as several `updated` date slices
+    jira_partition_max_issues: int = Field(default=5000, alias="JIRA_PARTITION_MAX_ISSUES")
+    # maxResults asked for by reconcile sweeps (fields=id,key,project); Jira may clamp it lower
+    jira_reconcile_page_size: int = Field(default=1000, alias="JIRA_RECONCILE_PAGE_SIZE")
+    # Parse search responses issue by issue while they download instead of buffering whole pages
+    jira_ingest_stream: bool = Field(default=True, alias="JIRA_INGEST_STREAM")
+    # Parallel /issue/{key}/changelog requests per job for issues whose embedded changelog was truncated
+    jira_changelog_concurrency: int = Field(default=8, alias="JIRA_CHANGELOG_CONCURRENCY")
+    # Shared secret for POST /jira/webhook (HMAC X-Hub-Signature or ?token=); empty disables the endpoint
+    jira_webhook_secret: str = Field(default="", alias="JIRA_WEBHOOK_SECRET")
+    # Webhook events are coalesced for this long, or until this many issues are pending, then written in one transaction
+    jira_webhook_batch_ms: int = Field(default=500, alias="JIRA_WEBHOOK_BATCH_MS")
+    jira_webhook_max_batch: int = Field(default=500, alias="JIRA_WEBHOOK_MAX_BATCH")
+    # First delay before retrying a failed flush; doubles per failure up to a minute
+    jira_webhook_retry_ms: int = Field(default=1000, alias="JIRA_WEBHOOK_RETRY_MS")
+    # Saved Jira credentials are re-read after this many seconds even without a settings write
+    jira_creds_cache_ttl: float = Field(default=300.0, alias="JIRA_CREDS_CACHE_TTL")
+
     business_hours_start: str = Field(default="09:00", alias="BUSINESS_HOURS_START")
     business_hours_end: str = Field(default="17:00", alias="BUSINESS_HOURS_END")
     business_days: str = Field(default="Mon,Tue,Wed,Thu,Fri", alias="BUSINESS_DAYS")
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column
-from sqlalchemy import Integer, String, Text, DateTime, Index
+from sqlalchemy import Integer, String, Text, DateTime, Float, Index, LargeBinary
 
 BaseJira = declarative_base()
 
@@ -15,12 +15,22 @@ class JiraIssue(BaseJira):
     assignee: Mapped[str] = mapped_column(String(255), default="")
     epic_key: Mapped[str] = mapped_column(String(32), default="")
     parent_key: Mapped[str] = mapped_column(String(32), default="")
+    labels: Mapped[str] = mapped_column(Text, default="")  # space-separated; Jira labels cannot contain spaces
     created: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
     updated: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
-    raw_json: Mapped[str] = mapped_column(Text, default="")  # raw issue payload as JSON string
+    raw_json: Mapped[str] = mapped_column(Text, default="")  # legacy inline payload; new rows use raw_hash
+    content_hash: Mapped[str] = mapped_column(String(64), default="")  # sha256 of the fetched payload; unchanged -> skip write
+    raw_hash: Mapped[str] = mapped_column(String(64), default="")  # jira_issue_blobs.hash of the stored payload, "" if none
 
 Index("idx_jira_issues_project_updated", JiraIssue.project_key, JiraIssue.updated)
 
+class JiraIssueBlob(BaseJira):
+    __tablename__ = "jira_issue_blobs"
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 of the uncompressed JSON
+    codec: Mapped[str] = mapped_column(String(8), default="zlib")  # zlib|zstd
+    size: Mapped[int] = mapped_column(Integer, default=0)  # uncompressed bytes
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+
 class JiraTransition(BaseJira):
     __tablename__ = "jira_transitions"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -30,3 +40,46 @@ class JiraTransition(BaseJira):
     author: Mapped[str] = mapped_column(String(255), default="")
     from_status: Mapped[str] = mapped_column(String(64), default="")
     to_status: Mapped[str] = mapped_column(String(64), default="")
+
+class JiraSyncCursor(BaseJira):
+    __tablename__ = "jira_sync_cursors"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    jql_key: Mapped[str] = mapped_column(Text, unique=True)  # normalized JQL from _build_jql
+    high_water: Mapped[DateTime] = mapped_column(DateTime, nullable=True)  # max JiraIssue.updated seen, UTC
+    last_run_at: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
+    last_full_at: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
+
+class JiraIngestJob(BaseJira):
+    __tablename__ = "jira_ingest_jobs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    state: Mapped[str] = mapped_column(String(16), default="queued", index=True)  # queued|running|succeeded|failed|interrupted
+    mode: Mapped[str] = mapped_column(String(8), default="full")  # full|delta
+    jql: Mapped[str] = mapped_column(Text, default="")  # effective JQL, fixed for the life of the job
+    jql_key: Mapped[str] = mapped_column(Text, default="")  # sync cursor key
+    partitions_json: Mapped[str] = mapped_column(Text, default="")  # per-partition jql, checkpoint and counters
+    request_json: Mapped[str] = mapped_column(Text, default="{}")  # IngestRequest without credentials
+    # Jira base URL the job reads; resumes must use the same one. Not called base_url, which
+    # jira_creds would take for a saved-credentials column.
+    site: Mapped[str] = mapped_column(Text, default="")
+    since: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
+    start_at: Mapped[int] = mapped_column(Integer, default=0)  # next startAt to fetch; everything before it is committed
+    total: Mapped[int] = mapped_column(Integer, nullable=True)
+    fetched: Mapped[int] = mapped_column(Integer, default=0)
+    pages: Mapped[int] = mapped_column(Integer, default=0)
+    issues_saved: Mapped[int] = mapped_column(Integer, default=0)
+    issues_unchanged: Mapped[int] = mapped_column(Integer, default=0)
+    transitions_saved: Mapped[int] = mapped_column(Integer, default=0)
+    changelogs_completed: Mapped[int] = mapped_column(Integer, default=0)  # issues whose truncated changelog was refetched
+    changelog_requests: Mapped[int] = mapped_column(Integer, default=0)
+    high_water: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
+    elapsed_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    write_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    fetch_seconds: Mapped[float] = mapped_column(Float, default=0.0)  # summed over concurrent page fetches
+    parse_seconds: Mapped[float] = mapped_column(Float, default=0.0)  # summed over parse pool tasks
+    queue_wait_seconds: Mapped[float] = mapped_column(Float, default=0.0)  # fetchers blocked on a full write queue
+    writer_idle_seconds: Mapped[float] = mapped_column(Float, default=0.0)  # writer waiting for parsed pages
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
+    started_at: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
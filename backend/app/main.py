@@ -4,6 +4,7 @@ from fastapi.staticfiles import StaticFiles
 from .api import auth, admin, reports, health, users, jira
 from .db.database import init_db
 from .core.config import get_settings
+from .services import jira_ingest, jira_http, jira_creds, jira_webhook
 
 app = FastAPI(title="Jira Tools")
 
@@ -12,6 +13,16 @@ settings = get_settings()
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    await jira_http.startup()
+    await jira_creds.warm()
+    jira_ingest.start_workers()
+    await jira.resume_ingest_jobs()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await jira_ingest.stop_workers()
+    await jira_webhook.shutdown()
+    await jira_http.shutdown()
 
 app.include_router(auth.router, prefix="/api")
 app.include_router(admin.router, prefix="/api")
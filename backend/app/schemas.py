@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 class UserOut(BaseModel):
@@ -62,3 +62,28 @@ class ReportDetail(BaseModel):
     report: ReportOut
     issues: List[IssueRow]
     buckets: Dict[str, Dict[str, int]]  # issue_key -> {bucket: seconds}
+
+class IngestRequest(BaseModel):
+    jira_base_url: Optional[str] = None
+    jira_email: Optional[str] = None
+    jira_api_token: Optional[str] = None
+    projects: List[str] = Field(default_factory=list)
+    labels: List[str] = Field(default_factory=list)
+    jql: str = ""
+    updated_window_days: int = 180
+    max_issues: int = 25000
+    full: bool = False  # ignore the sync cursor and re-pull the whole updated window
+    concurrency: Optional[int] = Field(default=None, ge=1, le=32)  # parallel page fetches; defaults to JIRA_INGEST_CONCURRENCY
+    fields: List[str] = Field(default_factory=list)  # extra Jira fields to request on top of the ones ingest parses
+    raw_storage: Optional[Literal["none", "fields-only", "full"]] = None  # stored raw payload; defaults to JIRA_INGEST_RAW_STORAGE
+    stream: Optional[bool] = None  # parse search pages incrementally; defaults to JIRA_INGEST_STREAM
+
+class ReconcileRequest(BaseModel):
+    jira_base_url: Optional[str] = None
+    jira_email: Optional[str] = None
+    jira_api_token: Optional[str] = None
+    projects: List[str] = Field(default_factory=list)
+    labels: List[str] = Field(default_factory=list)
+    jql: str = ""
+    concurrency: Optional[int] = Field(default=None, ge=1, le=32)  # parallel sweep pages; defaults to JIRA_INGEST_CONCURRENCY
+    dry_run: bool = False  # report what would be deleted or re-keyed without writing
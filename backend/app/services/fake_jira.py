@@ -0,0 +1,435 @@
+"""Deterministic stand-in for the Jira Cloud REST API, for offline ingest and report runs.
+
+Serves the endpoints the two clients use (search, issue changelog, status catalog, projects,
+myself) over synthetic data that is generated from the issue index alone, so a million-issue
+site costs no memory until it is read. Pagination, maxResults clamping, truncated embedded
+changelogs, latency and 429/5xx responses behave like the real service.
+
+In process, hand it to the shared client::
+
+    await jira_http.startup(transport=fake_jira.transport(FakeJiraConfig(issues=10_000)))
+
+Or run it as a server from the backend directory and point either app's JIRA_BASE_URL at it::
+
+    FAKE_JIRA_ISSUES=50000 uvicorn app.services.fake_jira:app --port 9000
+
+The module-level `app` is built from FAKE_JIRA_* on first access, not at import.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import asyncio
+import os
+import random
+import re
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+WORKFLOW = [
+    ("1", "To Do", "new", "To Do"),
+    ("3", "In Progress", "indeterminate", "In Progress"),
+    ("10001", "In Review", "indeterminate", "In Progress"),
+    ("10002", "Blocked", "indeterminate", "In Progress"),
+    ("10003", "Done", "done", "Done"),
+]
+_STATUS = {name: (sid, ckey, cname) for sid, name, ckey, cname in WORKFLOW}
+# Forward moves dominate; review and blocked loops give issues realistic rework.
+_NEXT = {
+    "To Do": ["In Progress"] * 9 + ["Done"],
+    "In Progress": ["In Review"] * 6 + ["Blocked"] * 2 + ["To Do"],
+    "In Review": ["Done"] * 5 + ["In Progress"] * 3,
+    "Blocked": ["In Progress"],
+    "Done": ["In Progress"],
+}
+USERS = ["Ada Lovelace", "Grace Hopper", "Alan Turing", "Edsger Dijkstra", "Barbara Liskov", "Ken Thompson", "Frances Allen", "Donald Knuth"]
+LABELS = ["backend", "frontend", "infra", "customer", "tech-debt", "security"]
+
+
+@dataclass
+class FakeJiraConfig:
+    projects: List[str] = field(default_factory=lambda: ["ALPHA", "BETA", "GAMMA"])
+    issues: int = 3000  # across all projects, assigned round-robin
+    seed: int = 7
+    span_days: int = 365  # issues are created over this many days before `anchor`
+    anchor: Optional[str] = None  # ISO date all timestamps end at; default today 00:00 UTC
+    overflow_every: int = 97  # every Nth issue gets more histories than search embeds
+    max_results: int = 100  # server-side cap on maxResults
+    changelog_embed: int = 100  # histories embedded per issue by expand=changelog
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    rate_limit_rate: float = 0.0  # fraction of requests answered 429
+    error_rate: float = 0.0  # fraction of requests answered 500/502/503
+    retry_after: int = 1
+    require_auth: bool = True
+    user_timezone: str = "UTC"  # profile zone reported by /myself; absolute JQL dates are read in it
+
+    @classmethod
+    def from_env(cls) -> "FakeJiraConfig":
+        """Read FAKE_JIRA_<FIELD> variables, e.g. FAKE_JIRA_ISSUES=100000, FAKE_JIRA_PROJECTS=A,B."""
+        cfg = cls()
+        for f in fields(cls):
+            raw = os.getenv(f"FAKE_JIRA_{f.name.upper()}")
+            if raw is None:
+                continue
+            current = getattr(cfg, f.name)
+            if isinstance(current, bool):
+                value: Any = raw.strip().lower() in ("1", "true", "yes", "on")
+            elif isinstance(current, int):
+                value = int(raw)
+            elif isinstance(current, float):
+                value = float(raw)
+            elif isinstance(current, list):
+                value = [p.strip() for p in raw.split(",") if p.strip()]
+            else:
+                value = raw
+            setattr(cfg, f.name, value)
+        return cfg
+
+
+def _fmt(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}+0000"
+
+
+class FakeJiraData:
+    """Synthetic site. Everything about issue `i` is derived from (seed, i)."""
+
+    def __init__(self, cfg: FakeJiraConfig):
+        self.cfg = cfg
+        if cfg.anchor:
+            anchor = datetime.fromisoformat(cfg.anchor)
+            self.anchor = anchor if anchor.tzinfo else anchor.replace(tzinfo=timezone.utc)
+        else:
+            self.anchor = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = self.anchor - timedelta(days=cfg.span_days)
+        self._updated: Optional[List[float]] = None
+        self._matches: Dict[str, List[int]] = {}
+
+    # ---- identity ----------------------------------------------------------
+    def project_of(self, i: int) -> Tuple[int, str]:
+        p = i % len(self.cfg.projects)
+        return p, self.cfg.projects[p]
+
+    def number_of(self, i: int) -> int:
+        return i // len(self.cfg.projects) + 1
+
+    def index_of_key(self, key: str) -> Optional[int]:
+        proj, _, num = key.upper().rpartition("-")
+        if proj not in self.cfg.projects or not num.isdigit():
+            return None
+        i = (int(num) - 1) * len(self.cfg.projects) + self.cfg.projects.index(proj)
+        return i if 0 <= i < self.cfg.issues else None
+
+    def index_of(self, id_or_key: str) -> Optional[int]:
+        if id_or_key.isdigit():
+            i = int(id_or_key) - 100000
+            return i if 0 <= i < self.cfg.issues else None
+        return self.index_of_key(id_or_key)
+
+    def key_of(self, i: int) -> str:
+        return f"{self.project_of(i)[1]}-{self.number_of(i)}"
+
+    def _rng(self, i: int) -> random.Random:
+        return random.Random(self.cfg.seed * 1_000_003 + i)
+
+    # ---- timeline ----------------------------------------------------------
+    def _timeline(self, i: int) -> Tuple[datetime, List[Tuple[datetime, str, str, str]], List[str]]:
+        """created, [(when, author, from, to)], labels."""
+        rng = self._rng(i)
+        span = (self.anchor - self.start).total_seconds()
+        created = self.start + timedelta(seconds=span * i / max(1, self.cfg.issues) + rng.uniform(0, 3600))
+        overflow = self.cfg.overflow_every > 0 and i % self.cfg.overflow_every == self.cfg.overflow_every - 1
+        moves = rng.randint(self.cfg.changelog_embed + 1, self.cfg.changelog_embed * 2 + 50) if overflow else rng.randint(0, 8)
+        gaps = [rng.expovariate(1 / 64800.0) for _ in range(moves)]
+        room = (self.anchor - created).total_seconds() * 0.95
+        scale = min(1.0, room / sum(gaps)) if gaps and sum(gaps) > 0 else 1.0
+        status, when, hist = "To Do", created, []
+        for g in gaps:
+            when = when + timedelta(seconds=g * scale)
+            nxt = rng.choice(_NEXT[status])
+            hist.append((when, rng.choice(USERS), status, nxt))
+            status = nxt
+        labels = rng.sample(LABELS, rng.randint(0, 2))
+        return created, hist, labels
+
+    def updated_ts(self, i: int) -> float:
+        if self._updated is None:
+            self._updated = [0.0] * self.cfg.issues
+        ts = self._updated[i]
+        if not ts:
+            created, hist, _ = self._timeline(i)
+            ts = (hist[-1][0] if hist else created).timestamp()
+            self._updated[i] = ts
+        return ts
+
+    # ---- payloads ----------------------------------------------------------
+    def histories(self, i: int) -> List[Dict[str, Any]]:
+        _, hist, _ = self._timeline(i)
+        out = []
+        for n, (when, author, frm, to) in enumerate(hist):
+            out.append({
+                "id": str((100000 + i) * 1000 + n),
+                "author": {"displayName": author, "accountId": f"acc-{USERS.index(author)}"},
+                "created": _fmt(when),
+                "items": [{
+                    "field": "status", "fieldtype": "jira", "fieldId": "status",
+                    "from": _STATUS[frm][0], "fromString": frm, "to": _STATUS[to][0], "toString": to,
+                }],
+            })
+        return out
+
+    def issue(self, i: int, wanted: Optional[set] = None, expand_changelog: bool = False) -> Dict[str, Any]:
+        rng = self._rng(i + 7_919_000)
+        created, hist, labels = self._timeline(i)
+        pidx, pkey = self.project_of(i)
+        num = self.number_of(i)
+        status = hist[-1][3] if hist else "To Do"
+        sid, ckey, cname = _STATUS[status]
+        epic_num = ((num - 1) // 25) * 25 + 1  # every 25th issue in a project is an epic
+        is_epic = num == epic_num
+        is_subtask = not is_epic and num - 1 != epic_num and rng.random() < 0.15
+        issue_type = "Epic" if is_epic else ("Sub-task" if is_subtask else rng.choice(["Story", "Story", "Bug", "Task"]))
+        parent_key = f"{pkey}-{num - 1}" if is_subtask else (f"{pkey}-{epic_num}" if not is_epic else "")
+        epic_key = f"{pkey}-{epic_num}" if not is_epic else ""
+        assignee = rng.choice(USERS + [None])
+        all_fields: Dict[str, Any] = {
+            "project": {"id": str(10000 + pidx), "key": pkey, "name": pkey.title()},
+            "issuetype": {"name": issue_type, "subtask": is_subtask},
+            "summary": f"{issue_type} {pkey}-{num}: synthetic work item",
+            "status": {"id": sid, "name": status, "statusCategory": {"key": ckey, "name": cname}},
+            "assignee": {"displayName": assignee, "accountId": f"acc-{USERS.index(assignee)}"} if assignee else None,
+            "parent": {"key": parent_key} if parent_key else None,
+            "epic": {"key": epic_key} if epic_key else None,
+            "customfield_10014": epic_key or None,
+            "labels": labels,
+            "created": _fmt(created),
+            "updated": _fmt(hist[-1][0] if hist else created),
+        }
+        if wanted is None or "*all" in wanted or "*navigable" in wanted:
+            flds = all_fields
+        else:
+            flds = {k: v for k, v in all_fields.items() if k in wanted}
+        out: Dict[str, Any] = {"id": str(100000 + i), "key": f"{pkey}-{num}", "self": f"/rest/api/3/issue/{100000 + i}", "fields": flds}
+        if expand_changelog:
+            histories = self.histories(i)
+            embedded = histories[-self.cfg.changelog_embed:] if self.cfg.changelog_embed else []
+            out["changelog"] = {"startAt": 0, "maxResults": len(embedded), "total": len(histories), "histories": embedded}
+        return out
+
+    # ---- JQL ---------------------------------------------------------------
+    def search(self, jql: str) -> List[int]:
+        """Indices matching a small JQL subset: project, labels, key/id, status,
+        created/updated comparisons, joined by AND, plus ORDER BY. Other clauses are ignored."""
+        norm = " ".join((jql or "").split())
+        hit = self._matches.get(norm)
+        if hit is not None:
+            return hit
+        body, order = norm, ""
+        m = re.search(r"\border\s+by\s+(.+)$", norm, re.I)
+        if m:
+            body, order = norm[:m.start()].strip(), m.group(1).strip()
+        preds = [p for p in (self._clause(c) for c in _split_and(body)) if p is not None]
+        idx = [i for i in range(self.cfg.issues) if all(p(i) for p in preds)]
+        if order:
+            fld, _, direction = order.partition(" ")
+            desc = direction.strip().lower().startswith("desc")
+            fld = fld.lower()
+            if fld == "updated":
+                idx.sort(key=self.updated_ts, reverse=desc)
+            elif fld == "created":
+                idx.sort(key=lambda i: self._timeline(i)[0], reverse=desc)
+            elif fld in ("key", "id", "issuekey"):
+                idx.sort(key=lambda i: (self.project_of(i)[1], self.number_of(i)), reverse=desc)
+        if len(self._matches) > 64:
+            self._matches.clear()
+        self._matches[norm] = idx
+        return idx
+
+    def _clause(self, clause: str):
+        c = clause.strip()
+        while c.startswith("(") and c.endswith(")"):
+            c = c[1:-1].strip()
+        m = re.match(r'^(\w+)\s+(in|=|!=|not in)\s+(.+)$', c, re.I)
+        if m:
+            fld, op, rhs = m.group(1).lower(), m.group(2).lower(), m.group(3).strip()
+            values = {v.strip().strip('"\'').upper() for v in rhs.strip("()").split(",") if v.strip()}
+            negate = op in ("!=", "not in")
+            getter = {
+                "project": lambda i: {self.project_of(i)[1], self.project_of(i)[1].title().upper(), str(10000 + self.project_of(i)[0])},
+                "key": lambda i: {self.key_of(i)},
+                "issuekey": lambda i: {self.key_of(i)},
+                "id": lambda i: {str(100000 + i)},
+                "labels": lambda i: {l.upper() for l in self._timeline(i)[2]},
+                "status": lambda i: {(self._timeline(i)[1][-1][3] if self._timeline(i)[1] else "To Do").upper()},
+            }.get(fld)
+            if getter is None:
+                return None
+            return lambda i: bool(getter(i) & values) != negate
+        m = re.match(r'^(updated|created)\s*(>=|>|<=|<)\s*(.+)$', c, re.I)
+        if m:
+            fld, op, rhs = m.group(1).lower(), m.group(2), m.group(3).strip().strip('"\'')
+            rel = re.match(r"^-(\d+)([mhdw])$", rhs)
+            if rel:
+                unit = {"m": 60, "h": 3600, "d": 86400, "w": 604800}[rel.group(2)]
+                bound = datetime.now(timezone.utc).timestamp() - int(rel.group(1)) * unit
+            else:
+                try:
+                    dt = datetime.fromisoformat(rhs.replace("/", "-"))
+                except ValueError:
+                    return None
+                bound = (dt if dt.tzinfo else dt.replace(tzinfo=ZoneInfo(self.cfg.user_timezone))).timestamp()
+            value = self.updated_ts if fld == "updated" else (lambda i: self._timeline(i)[0].timestamp())
+            cmp = {">=": lambda a: a >= bound, ">": lambda a: a > bound, "<=": lambda a: a <= bound, "<": lambda a: a < bound}[op]
+            return lambda i: cmp(value(i))
+        return None
+
+
+def _split_and(body: str) -> List[str]:
+    """Split on top-level AND (outside parentheses and quotes)."""
+    parts, depth, quote, start, i = [], 0, "", 0, 0
+    low = body.lower()
+    while i < len(body):
+        ch = body[i]
+        if quote:
+            if ch == quote:
+                quote = ""
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif depth == 0 and low.startswith(" and ", i):
+            parts.append(body[start:i])
+            i += 5
+            start = i
+            continue
+        i += 1
+    parts.append(body[start:])
+    return [p for p in (p.strip() for p in parts) if p]
+
+
+def create_app(config: Optional[FakeJiraConfig] = None) -> FastAPI:
+    cfg = config or FakeJiraConfig.from_env()
+    data = FakeJiraData(cfg)
+    faults = random.Random(cfg.seed)
+    stats = {"requests": 0, "rate_limited": 0, "errors": 0, "by_path": {}}
+    api = FastAPI(title="Fake Jira")
+
+    def _page_args(request: Request, default: int = 50) -> Tuple[int, int]:
+        q = request.query_params
+        start_at = max(0, int(q.get("startAt") or 0))
+        max_results = int(q.get("maxResults") if q.get("maxResults") is not None else default)
+        return start_at, max(0, min(max_results, cfg.max_results))
+
+    @api.middleware("http")
+    async def _faults(request: Request, call_next):
+        if not request.url.path.startswith("/rest/"):
+            return await call_next(request)
+        stats["requests"] += 1
+        route = re.sub(r"/issue/[^/]+", "/issue/{key}", re.sub(r"/project/(?!search)[^/]+", "/project/{key}", request.url.path))
+        stats["by_path"][route] = stats["by_path"].get(route, 0) + 1
+        if cfg.latency_ms or cfg.latency_jitter_ms:
+            await asyncio.sleep((cfg.latency_ms + faults.uniform(0, cfg.latency_jitter_ms)) / 1000.0)
+        if cfg.require_auth and "authorization" not in request.headers:
+            return JSONResponse({"errorMessages": ["You are not authenticated."]}, status_code=401)
+        roll = faults.random()
+        if roll < cfg.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"errorMessages": ["Rate limit exceeded."]}, status_code=429,
+                headers={"Retry-After": str(cfg.retry_after), "X-RateLimit-Remaining": "0"},
+            )
+        if roll < cfg.rate_limit_rate + cfg.error_rate:
+            stats["errors"] += 1
+            code = faults.choice([500, 502, 503])
+            return JSONResponse({"errorMessages": [f"Injected {code}"]}, status_code=code)
+        return await call_next(request)
+
+    @api.get("/rest/api/3/myself")
+    async def myself():
+        return {"accountId": "acc-fake", "displayName": "Fake Jira User", "emailAddress": "fake@example.invalid", "active": True, "timeZone": cfg.user_timezone}
+
+    @api.get("/rest/api/3/status")
+    async def statuses():
+        return [{"id": sid, "name": name, "statusCategory": {"key": ckey, "name": cname}} for sid, name, ckey, cname in WORKFLOW]
+
+    def _project(pidx: int) -> Dict[str, Any]:
+        key = cfg.projects[pidx]
+        return {"id": str(10000 + pidx), "key": key, "name": key.title(), "projectTypeKey": "software", "simplified": False, "archived": False}
+
+    @api.get("/rest/api/3/project/search")
+    async def project_search(request: Request):
+        start_at, max_results = _page_args(request)
+        values = [_project(p) for p in range(len(cfg.projects))]
+        page = values[start_at:start_at + max_results]
+        return {"startAt": start_at, "maxResults": max_results, "total": len(values), "isLast": start_at + len(page) >= len(values), "values": page}
+
+    @api.get("/rest/api/3/project/{id_or_key}")
+    async def project(id_or_key: str):
+        for p in range(len(cfg.projects)):
+            if id_or_key in (cfg.projects[p], str(10000 + p)):
+                return _project(p)
+        return JSONResponse({"errorMessages": ["No project could be found."]}, status_code=404)
+
+    @api.get("/rest/api/3/search")
+    async def search(request: Request):
+        q = request.query_params
+        start_at, max_results = _page_args(request)
+        wanted = {f.strip() for f in (q.get("fields") or "*navigable").split(",") if f.strip()}
+        expand_changelog = "changelog" in (q.get("expand") or "")
+        matches = data.search(q.get("jql") or "")
+        page = matches[start_at:start_at + max_results]
+        return {
+            "expand": "schema,names",
+            "startAt": start_at,
+            "maxResults": max_results,
+            "total": len(matches),
+            "issues": [data.issue(i, wanted, expand_changelog) for i in page],
+        }
+
+    @api.get("/rest/api/3/issue/{id_or_key}/changelog")
+    async def changelog(id_or_key: str, request: Request):
+        i = data.index_of(id_or_key)
+        if i is None:
+            return JSONResponse({"errorMessages": ["Issue does not exist or you do not have permission to see it."]}, status_code=404)
+        start_at, max_results = _page_args(request, default=100)
+        values = data.histories(i)
+        page = values[start_at:start_at + max_results]
+        return {"startAt": start_at, "maxResults": max_results, "total": len(values), "isLast": start_at + len(page) >= len(values), "values": page}
+
+    @api.get("/rest/api/3/issue/{id_or_key}")
+    async def issue(id_or_key: str, request: Request):
+        i = data.index_of(id_or_key)
+        if i is None:
+            return JSONResponse({"errorMessages": ["Issue does not exist or you do not have permission to see it."]}, status_code=404)
+        q = request.query_params
+        wanted = {f.strip() for f in (q.get("fields") or "*all").split(",") if f.strip()}
+        return data.issue(i, wanted, "changelog" in (q.get("expand") or ""))
+
+    @api.get("/_fake/stats")
+    async def fake_stats():
+        return {"config": cfg.__dict__, **stats}
+
+    api.state.data = data
+    api.state.stats = stats
+    return api
+
+
+def transport(config: Optional[FakeJiraConfig] = None) -> httpx.AsyncBaseTransport:
+    """An httpx transport that answers from an in-process fake site."""
+    return httpx.ASGITransport(app=create_app(config))
+
+
+_app: Optional[FastAPI] = None
+
+
+def __getattr__(name: str) -> Any:
+    """`app` for uvicorn, built on first access so importing the module reads no environment."""
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,155 @@
+from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+from sqlalchemy import text
+from ..db.database import get_sessionmaker
+from ..core.config import get_settings
+import base64
+import hashlib
+import time
+
+try:
+    from cryptography.fernet import Fernet
+    HAVE_CRYPTO = True
+except Exception:
+    HAVE_CRYPTO = False
+
+SETTINGS_SYNONYMS = {
+    "base_url": ["jira_base_url", "base_url", "jira_url", "url"],
+    "email": ["jira_email", "email", "username", "user_email"],
+    "token": ["jira_api_token", "api_token", "jira_token", "jira_api_token_encrypted", "jira_token_encrypted", "token", "encrypted_token"],
+}
+
+# Saved credentials are read once and reused until a settings write bumps the version (or the
+# TTL lapses, which covers edits made to the database outside this process). The schema scan that
+# finds settings-like tables runs only at startup and from the diagnostics endpoints, never on a
+# settings write.
+_version = 0
+_tables: Optional[Dict[str, List[str]]] = None  # table -> columns, from the last schema scan
+_cached: Optional[Tuple[int, float, Tuple[Optional[str], Optional[str], Optional[str], Dict[str, Any]]]] = None
+_counters = {"hits": 0, "misses": 0, "scans": 0}
+
+def _first_present(row: Dict[str, Any], names: List[str]):
+    for n in names:
+        if n in row and row[n]:
+            return n, row[n]
+    return None, None
+
+@lru_cache(maxsize=4)
+def fernet_from_secret(secret: str):
+    if not HAVE_CRYPTO:
+        return None
+    # Derive a stable Fernet key from APP_SECRET (sha256 -> urlsafe base64)
+    h = hashlib.sha256((secret or "").encode()).digest()
+    key = base64.urlsafe_b64encode(h)
+    return Fernet(key)
+
+def _maybe_decrypt(token_value: str, token_column: Optional[str]) -> str:
+    if not token_value:
+        return token_value
+    looks_encrypted = False
+    if token_column and "encrypt" in token_column.lower():
+        looks_encrypted = True
+    if token_value.startswith("gAAAAA"):  # typical Fernet prefix
+        looks_encrypted = True
+    if looks_encrypted and HAVE_CRYPTO:
+        try:
+            f = fernet_from_secret(get_settings().app_secret)
+            if f:
+                return f.decrypt(token_value.encode()).decode()
+        except Exception:
+            pass
+    return token_value
+
+async def _read_candidates(tables: Optional[Dict[str, List[str]]]) -> Tuple[Dict[str, List[str]], List[Dict[str, Any]]]:
+    """Latest row of every settings-like table. With `tables` given, the schema is not re-read."""
+    Session = get_sessionmaker()
+    async with Session() as session:
+        def _sync_scan(sync_session):
+            res = []
+            found: Dict[str, List[str]] = {}
+            bind = sync_session.get_bind()
+            with bind.connect() as conn:
+                if tables is None:
+                    names = [r[0] for r in conn.execute(text("SELECT name FROM sqlite_master WHERE type='table'")).fetchall()]
+                else:
+                    names = list(tables)
+                for t in names:
+                    try:
+                        if tables is None:
+                            cols = [row[1] for row in conn.execute(text(f"PRAGMA table_info({t})")).fetchall()]
+                            colset = set(cols)
+                            if not any(name in colset for names in SETTINGS_SYNONYMS.values() for name in names):
+                                continue
+                        else:
+                            cols = tables[t]
+                        found[t] = cols
+                        row = conn.execute(text(f"SELECT * FROM {t} ORDER BY rowid DESC LIMIT 1")).mappings().fetchone()
+                        if not row:
+                            continue
+                        rowd = dict(row)
+                        b_name, b_val = _first_present(rowd, SETTINGS_SYNONYMS["base_url"])
+                        e_name, e_val = _first_present(rowd, SETTINGS_SYNONYMS["email"])
+                        t_name, t_val = _first_present(rowd, SETTINGS_SYNONYMS["token"])
+                        if any([b_val, e_val, t_val]):
+                            res.append({
+                                "table": t,
+                                "columns": cols,
+                                "base_url": {"column": b_name, "value": b_val},
+                                "email": {"column": e_name, "value": e_val},
+                                "token": {"column": t_name, "value": t_val},
+                            })
+                    except Exception:
+                        continue
+            return found, res
+        return await session.run_sync(_sync_scan)
+
+async def scan_db_for_settings_candidates() -> List[Dict[str, Any]]:
+    """Full schema scan; also refreshes the table list used by cached lookups."""
+    global _tables
+    _counters["scans"] += 1
+    _tables, candidates = await _read_candidates(None)
+    return candidates
+
+async def load_saved_jira_settings(refresh: bool = False) -> Tuple[Optional[str], Optional[str], Optional[str], Dict[str, Any]]:
+    """Saved (base_url, email, token, meta), decrypted. `refresh` forces a schema scan and re-read."""
+    global _cached, _tables
+    ttl = get_settings().jira_creds_cache_ttl
+    if not refresh and _cached is not None:
+        version, loaded_at, value = _cached
+        if version == _version and time.monotonic() - loaded_at < ttl:
+            _counters["hits"] += 1
+            return value
+    _counters["misses"] += 1
+    version = _version
+    if refresh or _tables is None:
+        candidates = await scan_db_for_settings_candidates()
+    else:
+        _tables, candidates = await _read_candidates(_tables)
+    meta = {"candidates": candidates}
+    def score(c):
+        return sum(1 for k in ["base_url", "email", "token"] if c[k]["value"])
+    value: Tuple[Optional[str], Optional[str], Optional[str], Dict[str, Any]] = (None, None, None, meta)
+    if candidates:
+        candidates.sort(key=score, reverse=True)
+        best = candidates[0]
+        token_raw = best["token"]["value"]
+        token_col = best["token"]["column"]
+        token_final = _maybe_decrypt(token_raw, token_col) if token_raw else None
+        value = (best["base_url"]["value"], best["email"]["value"], token_final, meta)
+    if version == _version:  # a settings write during the read leaves the cache cold
+        _cached = (version, time.monotonic(), value)
+    return value
+
+def invalidate() -> None:
+    """Call after writing Jira settings. Only the cached value is dropped; the next lookup re-reads
+    the tables already found, and the schema is scanned again only by warm() or diagnostics."""
+    global _version, _cached
+    _version += 1
+    _cached = None
+
+def cache_stats() -> Dict[str, Any]:
+    return {"version": _version, "cached": _cached is not None, "tables": sorted(_tables or {}), **_counters}
+
+async def warm() -> None:
+    """Startup hook: scan the schema once and prime the cache."""
+    await load_saved_jira_settings(refresh=True)
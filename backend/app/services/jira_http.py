@@ -0,0 +1,130 @@
+from typing import Any, Dict, Optional
+import httpx
+from ..core.config import get_settings
+from .jira_transport import RateLimitedTransport
+
+try:
+    import h2  # noqa: F401  (pip install httpx[http2])
+    HAVE_H2 = True
+except Exception:
+    HAVE_H2 = False
+
+class PoolStatsTransport(httpx.AsyncHTTPTransport):
+    """AsyncHTTPTransport that counts requests and fresh TCP connects so pool reuse is visible.
+
+    Everything is counted from request trace events; the pool itself is only read through its
+    public `connections` list.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+        self.connections_opened = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0  # in flight but not yet sending on a connection
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        outer_trace = request.extensions.get("trace")
+        queued = True
+
+        async def trace(name: str, info: Dict[str, Any]) -> None:
+            nonlocal queued
+            if name == "connection.connect_tcp.complete":
+                self.connections_opened += 1
+            elif queued and name.endswith(".send_request_headers.started"):
+                queued = False
+                self.waiting -= 1
+            if outer_trace is not None:
+                await outer_trace(name, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        self.requests += 1
+        self.in_flight += 1
+        self.waiting += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+            if queued:
+                self.waiting -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        conns = list(getattr(getattr(self, "_pool", None), "connections", None) or [])
+        idle = sum(1 for c in conns if callable(getattr(c, "is_idle", None)) and c.is_idle())
+        return {
+            "connections_open": len(conns),
+            "connections_idle": idle,
+            "connections_active": len(conns) - idle,
+            "connections_opened_total": self.connections_opened,
+            "requests_total": self.requests,
+            "requests_reused_connection": max(0, self.requests - self.connections_opened),
+            "requests_in_flight": self.in_flight,
+            "requests_waiting": self.waiting,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+_client: Optional[httpx.AsyncClient] = None
+_transport: Optional[httpx.AsyncBaseTransport] = None  # innermost (network or override) transport
+_limiter: Optional[RateLimitedTransport] = None
+
+def _http2_enabled() -> bool:
+    return bool(get_settings().jira_http2 and HAVE_H2)
+
+def _build_transport() -> PoolStatsTransport:
+    s = get_settings()
+    limits = httpx.Limits(
+        max_connections=s.jira_http_max_connections,
+        max_keepalive_connections=s.jira_http_max_keepalive,
+        keepalive_expiry=s.jira_http_keepalive_expiry,
+    )
+    return PoolStatsTransport(limits=limits, http2=_http2_enabled(), retries=0)  # retries belong to RateLimitedTransport
+
+def _build_client(transport: Optional[httpx.AsyncBaseTransport]) -> httpx.AsyncClient:
+    global _transport, _limiter
+    _transport = transport or _build_transport()
+    _limiter = RateLimitedTransport(_transport)
+    return httpx.AsyncClient(transport=_limiter, timeout=get_settings().jira_http_timeout)
+
+async def startup(transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+    """Create the application-wide Jira client. `transport` overrides the pooled network transport (tests, fake Jira)."""
+    global _client
+    await shutdown()
+    _client = _build_client(transport)
+
+async def shutdown() -> None:
+    global _client, _transport, _limiter
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _transport = None
+    _limiter = None
+
+def get_client() -> httpx.AsyncClient:
+    """The shared client. Never close it per call; the pool lives until shutdown()."""
+    global _client
+    if _client is None:
+        # Outside the app lifecycle (scripts): build lazily, same settings.
+        _client = _build_client(None)
+    return _client
+
+def pool_stats() -> Dict[str, Any]:
+    s = get_settings()
+    out: Dict[str, Any] = {
+        "started": _client is not None,
+        "http2": _http2_enabled(),
+        "http2_requested": s.jira_http2,
+        "limits": {
+            "max_connections": s.jira_http_max_connections,
+            "max_keepalive_connections": s.jira_http_max_keepalive,
+            "keepalive_expiry": s.jira_http_keepalive_expiry,
+        },
+    }
+    if isinstance(_transport, PoolStatsTransport):
+        out.update(_transport.stats())
+    return out
+
+def transport_stats() -> Dict[str, Any]:
+    """Throttle/retry counters and per-site request budget state."""
+    return _limiter.stats() if _limiter is not None else {"started": False}
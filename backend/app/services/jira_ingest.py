@@ -0,0 +1,960 @@
+from fastapi import HTTPException
+from typing import List, Dict, Any, Optional, Tuple
+from ..db.database import get_sessionmaker
+from ..db.jira_models import BaseJira, JiraSyncCursor, JiraIngestJob
+from ..core.config import get_settings
+from ..schemas import IngestRequest
+from . import jira_store, jira_http, jira_stream
+from sqlalchemy import select, text, update
+import httpx
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import math
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import re
+
+KEY_REGEX = re.compile(r'^[A-Z][A-Z0-9_]+$')
+
+def _quote(s: str) -> str:
+    s = s.replace('"', '\\"')
+    return f'"{s}"'
+
+def _jql_time(dt: datetime, tz: Any = timezone.utc) -> str:
+    """A naive-UTC instant as a JQL date; Jira reads those in the searching user's time zone."""
+    return dt.replace(tzinfo=timezone.utc).astimezone(tz).strftime('"%Y-%m-%d %H:%M"')
+
+def _build_jql(req: IngestRequest, since_minutes: Optional[int] = None, updated_range: Optional[Tuple[datetime, Optional[datetime]]] = None, tz: Any = timezone.utc) -> str:
+    clauses = []
+    if req.projects:
+        parts = []
+        for p in req.projects:
+            p = (p or "").strip()
+            if not p:
+                continue
+            if p.isdigit():
+                parts.append(p)       # numeric ID
+            elif KEY_REGEX.match(p):
+                parts.append(p)       # key
+            else:
+                parts.append(_quote(p))  # name
+        if parts:
+            clauses.append(f"project in ({', '.join(parts)})")
+    if req.labels:
+        parts = []
+        for l in req.labels:
+            l = (l or "").strip()
+            if not l: continue
+            parts.append(_quote(l) if " " in l else l)
+        if parts:
+            clauses.append(f"labels in ({', '.join(parts)})")
+    if updated_range is not None:
+        lo, hi = updated_range
+        clauses.append(f"updated >= {_jql_time(lo, tz)}")
+        if hi is not None:
+            clauses.append(f"updated < {_jql_time(hi, tz)}")
+    elif req.updated_window_days and req.updated_window_days > 0:
+        if since_minutes is not None and since_minutes < req.updated_window_days * 1440:
+            clauses.append(f"updated >= -{since_minutes}m")
+        else:
+            clauses.append(f"updated >= -{req.updated_window_days}d")
+    elif since_minutes is not None:
+        clauses.append(f"updated >= -{since_minutes}m")
+    if req.jql.strip():
+        clauses.append(f"({req.jql.strip()})")
+    jql = " and ".join(clauses) if clauses else ""
+    if "order by" not in jql.lower():
+        jql = (jql + " order by updated desc").strip()
+    return jql or "order by updated desc"
+
+def _normalize_jql(jql: str) -> str:
+    return " ".join(jql.split())
+
+def _utc_naive(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+async def _load_cursor(jql_key: str) -> Optional[JiraSyncCursor]:
+    Session = get_sessionmaker()
+    async with Session() as session:
+        res = await session.execute(select(JiraSyncCursor).where(JiraSyncCursor.jql_key == jql_key))
+        return res.scalar_one_or_none()
+
+async def _store_cursor(jql_key: str, high_water: Optional[datetime], full: bool) -> Optional[datetime]:
+    now = _utc_naive(datetime.now(timezone.utc))
+    Session = get_sessionmaker()
+    async with Session() as session:
+        res = await session.execute(select(JiraSyncCursor).where(JiraSyncCursor.jql_key == jql_key))
+        cur = res.scalar_one_or_none()
+        if cur is None:
+            cur = JiraSyncCursor(jql_key=jql_key)
+            session.add(cur)
+        if high_water and (cur.high_water is None or high_water > cur.high_water):
+            cur.high_water = high_water
+        cur.last_run_at = now
+        if full:
+            cur.last_full_at = now
+        await session.commit()
+        return cur.high_water
+
+def _add_missing_columns(bind) -> List[Tuple[str, str]]:
+    # create_all never alters an existing table; add columns introduced since it was created.
+    added = []
+    with bind.connect() as conn:
+        for table in BaseJira.metadata.sorted_tables:
+            have = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table.name})")).fetchall()}
+            for col in table.columns:
+                if col.name in have:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(dialect=conn.dialect)}"
+                default = col.default.arg if col.default is not None and col.default.is_scalar else None
+                if isinstance(default, str):
+                    ddl += " DEFAULT '" + default.replace("'", "''") + "'"
+                elif isinstance(default, (int, float)):
+                    ddl += f" DEFAULT {default}"
+                conn.execute(text(ddl))
+                added.append((table.name, col.name))
+        conn.commit()
+    return added
+
+def _reset_for_reingest(bind) -> None:
+    """Make the next ingest of every query a full one that rewrites each row it fetches.
+
+    Stores written before jira_issues.labels existed also predate UTC timestamps: their times
+    are Jira's local wall-clock with the offset dropped, which cannot be converted in place.
+    """
+    with bind.connect() as conn:
+        conn.execute(text("UPDATE jira_issues SET content_hash = ''"))
+        conn.execute(text("DELETE FROM jira_sync_cursors"))
+        conn.commit()
+
+async def _ensure_tables():
+    Session = get_sessionmaker()
+    async with Session() as session:
+        def _create(sync_session):
+            bind = sync_session.get_bind()
+            BaseJira.metadata.create_all(bind=bind)
+            if ("jira_issues", "labels") in _add_missing_columns(bind):
+                _reset_for_reingest(bind)
+        await session.run_sync(_create)
+
+def _as_utc(dt: datetime) -> datetime:
+    # SQLite DateTime columns drop the offset, so everything is stored as UTC wall-clock time.
+    return dt.astimezone(timezone.utc) if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+def _parse_issue_fields(issue: Dict[str, Any]) -> Dict[str, Any]:
+    f = issue.get("fields") or {}
+    key = issue.get("key", "")
+    project_key = (f.get("project") or {}).get("key") or (key.split("-")[0] if "-" in key else "")
+    issue_type = (f.get("issuetype") or {}).get("name") or ""
+    summary = f.get("summary") or ""
+    status = (f.get("status") or {}).get("name") or ""
+    assignee = (f.get("assignee") or {}).get("displayName") or ""
+    parent_key = (f.get("parent") or {}).get("key") or ""
+    epic_key = (f.get("epic") or {}).get("key") or ""
+    def _dt(s):
+        if not s: return None
+        try:
+            return _as_utc(datetime.fromisoformat(s.replace("Z","+00:00")))
+        except Exception:
+            return None
+    return {
+        "issue_id": str(issue.get("id")),
+        "key": key,
+        "project_key": project_key,
+        "issue_type": issue_type,
+        "summary": summary,
+        "status": status,
+        "assignee": assignee,
+        "parent_key": parent_key,
+        "epic_key": epic_key,
+        "labels": " ".join(l for l in (f.get("labels") or []) if l),
+        "created": _dt((f.get("created") or "")),
+        "updated": _dt((f.get("updated") or "")),
+    }
+
+def _extract_transitions(issue: Dict[str, Any]):
+    hist = (issue.get("changelog") or {}).get("histories") or []
+    out = []
+    for h in hist:
+        created = h.get("created")
+        try:
+            when = _as_utc(datetime.fromisoformat(created.replace("Z","+00:00")))
+        except Exception:
+            continue
+        author = (h.get("author") or {}).get("displayName") or ""
+        for it in h.get("items", []):
+            if (it.get("field") or "").lower() == "status":
+                out.append({
+                    "when": when,
+                    "author": author,
+                    "from_status": it.get("fromString") or "",
+                    "to_status": it.get("toString") or "",
+                })
+    out.sort(key=lambda x: x["when"])
+    return out
+
+# ------------------- Fetch / write ------------------------------------------
+# Everything _parse_issue_fields reads; requested on every ingest so projection never drops a column.
+INGEST_FIELDS = ["project", "issuetype", "summary", "status", "assignee", "parent", "epic", "labels", "created", "updated"]
+RAW_STORAGE_MODES = ("none", "fields-only", "full")
+
+def _ingest_fields(req: IngestRequest) -> str:
+    extra = [f.strip() for f in req.fields if f and f.strip()]
+    return ",".join(dict.fromkeys(INGEST_FIELDS + extra))
+
+def _raw_storage(req: IngestRequest) -> str:
+    mode = req.raw_storage or get_settings().jira_ingest_raw_storage
+    return mode if mode in RAW_STORAGE_MODES else "full"
+
+def _raw_payload(issue: Dict[str, Any], mode: str) -> Optional[Dict[str, Any]]:
+    if mode == "none":
+        return None
+    if mode == "fields-only":
+        return {"id": issue.get("id"), "key": issue.get("key"), "fields": issue.get("fields") or {}}
+    return issue
+
+def _search_error(status_code: int, jql: str, body: str) -> HTTPException:
+    return HTTPException(status_code=status_code, detail=f"Jira error (status {status_code}) for JQL: {jql} :: {body[:500]}")
+
+# ------------------- Changelog overflow ---------------------------------------
+# Search with expand=changelog embeds at most 100 histories per issue; the rest has to be
+# read from /issue/{key}/changelog. Only issues whose embedded changelog is short pay for it.
+CHANGELOG_PAGE = 100
+
+def _changelog_truncated(issue: Dict[str, Any]) -> bool:
+    cl = issue.get("changelog") or {}
+    total = cl.get("total")
+    return total is not None and total > len(cl.get("histories") or [])
+
+async def _fetch_changelog_page(client: httpx.AsyncClient, base: str, auth: Tuple[str, str], key: str, start_at: int, sem: asyncio.Semaphore) -> Dict[str, Any]:
+    async with sem:
+        r = await client.get(
+            f"{base}/rest/api/3/issue/{key}/changelog",
+            params={"startAt": start_at, "maxResults": CHANGELOG_PAGE},
+            auth=auth,
+            headers={"Accept": "application/json"},
+        )
+    if r.status_code >= 400:
+        raise HTTPException(status_code=r.status_code, detail=f"Jira error (status {r.status_code}) reading changelog of {key} :: {r.text[:500]}")
+    return r.json()
+
+async def _complete_changelog(client: httpx.AsyncClient, base: str, auth: Tuple[str, str], issue: Dict[str, Any], sem: asyncio.Semaphore) -> int:
+    """Replace a truncated embedded changelog with the full history. Returns requests made."""
+    key = issue.get("key") or issue.get("id")
+    first = await _fetch_changelog_page(client, base, auth, key, 0, sem)
+    histories = list(first.get("values") or [])
+    total = first.get("total") or len(histories)
+    step = first.get("maxResults") or CHANGELOG_PAGE
+    rest = await asyncio.gather(*(
+        _fetch_changelog_page(client, base, auth, key, off, sem) for off in range(len(histories), total, step)
+    )) if histories else []
+    for page in rest:
+        histories.extend(page.get("values") or [])
+    issue["changelog"] = {"startAt": 0, "maxResults": len(histories), "total": len(histories), "histories": histories}
+    return 1 + len(rest)
+
+# ------------------- Pages ----------------------------------------------------
+class _Page:
+    """Rows built from one search page, filled issue by issue as the response is parsed."""
+
+    def __init__(self, raw_storage: str):
+        self.raw_storage = raw_storage
+        self.meta: Dict[str, Any] = {}
+        self.count = 0
+        self.issue_rows: List[Dict[str, Any]] = []
+        self.transition_rows: List[Dict[str, Any]] = []
+        self.blob_rows: List[Dict[str, Any]] = []
+        self.max_updated: Optional[datetime] = None
+        self.changelogs_completed = 0
+        self.changelog_requests = 0
+        self.parse_seconds = 0.0
+
+    def merge(self, other: "_Page") -> None:
+        self.count += other.count
+        self.issue_rows.extend(other.issue_rows)
+        self.transition_rows.extend(other.transition_rows)
+        self.blob_rows.extend(other.blob_rows)
+        if other.max_updated and (self.max_updated is None or other.max_updated > self.max_updated):
+            self.max_updated = other.max_updated
+        self.parse_seconds += other.parse_seconds
+
+    def add(self, issue: Dict[str, Any]) -> None:
+        self.count += 1
+        fields = _parse_issue_fields(issue)
+        updated = _utc_naive(fields["updated"])
+        if updated and (self.max_updated is None or updated > self.max_updated):
+            self.max_updated = updated
+        # The storage mode is part of the hash so switching modes rewrites the blobs once.
+        content = jira_store.canonical_json(issue)
+        row = {**fields, "raw_json": "", "content_hash": jira_store.sha256_hex(self.raw_storage + "|" + content), "raw_hash": ""}
+        payload = _raw_payload(issue, self.raw_storage)
+        if payload is not None:
+            blob = jira_store.encode_blob(content if payload is issue else jira_store.canonical_json(payload))
+            row["raw_hash"] = blob["hash"]
+            self.blob_rows.append(blob)
+        self.issue_rows.append(row)
+        for t in _extract_transitions(issue):
+            self.transition_rows.append({
+                "issue_id": fields["issue_id"],
+                "issue_key": fields["key"],
+                "when": t["when"],
+                "author": t["author"],
+                "from_status": t["from_status"],
+                "to_status": t["to_status"],
+            })
+
+# Issues handed to the parse pool per task; small enough that a streamed page never piles up.
+PARSE_BATCH = 25
+
+def _parse_batch(issues: List[Dict[str, Any]], raw_storage: str) -> _Page:
+    """Parse stage, run on the pool: fields, transitions, content hash and compressed blob."""
+    started = time.perf_counter()
+    page = _Page(raw_storage)
+    for issue in issues:
+        page.add(issue)
+    page.parse_seconds = time.perf_counter() - started
+    return page
+
+async def _fetch_page(ctx: "_Run", jql: str, start_at: int, max_results: int) -> _Page:
+    """Fetch stage for one search page; parsing is handed to the pool in batches as issues arrive.
+
+    With streaming on, issues are split out of the body while it downloads, so neither the raw
+    page nor its decoded dict is ever held whole. Issues whose embedded changelog was truncated
+    are completed first and parsed on their own.
+    """
+    loop = asyncio.get_running_loop()
+    page = _Page(ctx.raw_storage)
+    overflow: List[asyncio.Task] = []
+    parsing: List[asyncio.Future] = []
+    batch: List[Dict[str, Any]] = []
+
+    def _parse(issues: List[Dict[str, Any]]) -> None:
+        parsing.append(loop.run_in_executor(ctx.parse_pool, _parse_batch, issues, ctx.raw_storage))
+
+    async def _complete(issue: Dict[str, Any]) -> int:
+        requests = await _complete_changelog(ctx.client, ctx.base, ctx.auth, issue, ctx.changelog_sem)
+        _parse([issue])
+        return requests
+
+    def _take(issue: Dict[str, Any]) -> None:
+        if _changelog_truncated(issue):
+            overflow.append(asyncio.create_task(_complete(issue)))
+            return
+        batch.append(issue)
+        if len(batch) >= PARSE_BATCH:
+            _parse(batch[:])
+            batch.clear()
+
+    url = f"{ctx.base}/rest/api/3/search"
+    params = {"jql": jql, "startAt": start_at, "maxResults": max_results, "fields": ctx.fields, "expand": "changelog"}
+    headers = {"Accept": "application/json"}
+    meta: Dict[str, Any] = {}
+    try:
+        async with ctx.gate:
+            started = time.monotonic()
+            if ctx.stream:
+                async with ctx.client.stream("GET", url, headers=headers, params=params, auth=ctx.auth) as r:
+                    if r.status_code >= 400:
+                        await r.aread()
+                        raise _search_error(r.status_code, jql, r.text)
+                    async for issue in jira_stream.iter_search_page(r, meta):
+                        _take(issue)
+            else:
+                r = await ctx.client.get(url, headers=headers, params=params, auth=ctx.auth)
+                if r.status_code >= 400:
+                    raise _search_error(r.status_code, jql, r.text)
+                meta = r.json()
+                for issue in meta.pop("issues", None) or []:
+                    _take(issue)
+            if batch:
+                _parse(batch[:])
+                batch.clear()
+        page.changelog_requests = sum(await asyncio.gather(*overflow))
+        page.changelogs_completed = len(overflow)
+        ctx.stats["fetch_seconds"] += time.monotonic() - started
+        for part in await asyncio.gather(*parsing):
+            page.merge(part)
+        ctx.stats["parse_seconds"] += page.parse_seconds
+        page.meta = meta
+    finally:
+        for task in overflow:
+            task.cancel()
+    return page
+
+async def _count_issues(ctx: "_Run", jql: str) -> Optional[int]:
+    async with ctx.gate:
+        r = await ctx.client.get(
+            f"{ctx.base}/rest/api/3/search",
+            headers={"Accept": "application/json"},
+            params={"jql": jql, "startAt": 0, "maxResults": 0, "fields": "id"},
+            auth=ctx.auth,
+        )
+    if r.status_code >= 400:
+        raise _search_error(r.status_code, jql, r.text)
+    return r.json().get("total")
+
+async def _user_timezone(ctx: "_Run") -> Any:
+    """The searching user's profile time zone, in which Jira reads absolute JQL dates (UTC if unknown)."""
+    if ctx.tz is None:
+        async with ctx.gate:
+            r = await ctx.client.get(f"{ctx.base}/rest/api/3/myself", headers={"Accept": "application/json"}, auth=ctx.auth)
+        name = r.json().get("timeZone") if r.status_code < 400 else None
+        try:
+            ctx.tz = ZoneInfo(name) if name else timezone.utc
+        except (ValueError, KeyError):
+            ctx.tz = timezone.utc
+    return ctx.tz
+
+# ------------------- Partitions -----------------------------------------------
+# A job is split into partitions: one per requested project and, for a project whose full
+# window holds more than JIRA_PARTITION_MAX_ISSUES issues, one per `updated` date slice.
+# Each partition pages from startAt 0 on its own (shallow offsets are what Jira serves fast)
+# and checkpoints its own startAt; all of them share one limit on in-flight search requests.
+def _partition(key: str, jql: str, cursor_key: str, mode: str, since: Optional[datetime], split: bool) -> Dict[str, Any]:
+    return {
+        "key": key, "jql": jql, "cursor_key": cursor_key, "mode": mode,
+        "since": since.isoformat() if since else None, "split": split,
+        "state": "queued", "start_at": 0, "total": None, "fetched": 0, "pages": 0,
+        "issues_saved": 0, "issues_unchanged": 0, "transitions_saved": 0,
+        "high_water": None, "elapsed_seconds": 0.0,
+    }
+
+async def _plan_partitions(req: IngestRequest) -> List[Dict[str, Any]]:
+    """One partition per project (or one for the whole request), full or delta from its cursor."""
+    subsets = [req.model_copy(update={"projects": [p]}) for p in dict.fromkeys(p.strip() for p in req.projects if p and p.strip())]
+    parts = []
+    overlap = max(0, get_settings().jira_sync_overlap_minutes)
+    for sub in subsets or [req]:
+        # Cursor is keyed by the full-window query; a delta run only narrows the updated clause.
+        cursor_key = _normalize_jql(_build_jql(sub))
+        cursor = None if req.full else await _load_cursor(cursor_key)
+        key = sub.projects[0] if subsets else "all"
+        if cursor is not None and cursor.high_water is not None:
+            lag = _now() - cursor.high_water
+            jql = _build_jql(sub, since_minutes=max(1, math.ceil(lag.total_seconds() / 60)) + overlap)
+            # Pinned to an absolute bound when the job first runs, see _pin_delta_windows
+            parts.append({**_partition(key, jql, cursor_key, "delta", cursor.high_water, split=True), "pinned": False})
+        else:
+            parts.append(_partition(key, _build_jql(sub), cursor_key, "full", None, split=False))
+    return parts
+
+async def _save_partitions(ctx: "_Run") -> None:
+    Session = get_sessionmaker()
+    async with Session() as session:
+        job = await session.get(JiraIngestJob, ctx.job_id)
+        job.partitions_json = json.dumps(ctx.parts)
+        await session.commit()
+
+def _subset(req: IngestRequest, key: str) -> IngestRequest:
+    return req.model_copy(update={"projects": [key]}) if key != "all" else req
+
+async def _pin_delta_windows(ctx: "_Run", req: IngestRequest) -> None:
+    """Rewrite planned delta partitions to search from the cursor minus the overlap as an absolute
+    date (first run only). Their `-Nm` clause is relative to when the job was created; a job that
+    waited in the queue, or a resume hours later, would otherwise skip what changed meanwhile."""
+    todo = [p for p in ctx.parts if not p.get("pinned", True)]
+    if not todo:
+        return
+    tz = await _user_timezone(ctx)
+    overlap = timedelta(minutes=max(0, get_settings().jira_sync_overlap_minutes))
+    window = req.updated_window_days or 0
+    for p in todo:
+        lo = datetime.fromisoformat(p["since"]) - overlap
+        if window > 0:
+            lo = max(lo, _now() - timedelta(days=window))
+        p["jql"] = _build_jql(_subset(req, p["key"]), updated_range=(lo, None), tz=tz)
+        p["pinned"] = True
+    await _save_partitions(ctx)
+
+async def _split_large_partitions(ctx: "_Run", req: IngestRequest) -> None:
+    """Replace full partitions over the size threshold with `updated` date slices (first run only)."""
+    threshold = max(1, get_settings().jira_partition_max_issues)
+    window = req.updated_window_days or 0
+    todo = [p for p in ctx.parts if not p["split"] and p["state"] == "queued" and p["start_at"] == 0]
+    if not todo:
+        return
+    totals = dict(zip((id(p) for p in todo), await asyncio.gather(*(_count_issues(ctx, p["jql"]) for p in todo))))
+    planned: List[Dict[str, Any]] = []
+    for p in ctx.parts:
+        if id(p) not in totals:
+            planned.append(p)
+            continue
+        total = totals[id(p)]
+        slices = min(math.ceil((total or 0) / threshold), window) if window > 0 else 1
+        if slices <= 1:
+            planned.append({**p, "split": True, "total": total})
+            continue
+        sub = _subset(req, p["key"])
+        tz = await _user_timezone(ctx)
+        # Absolute bounds rather than -Nm offsets: slices run at different times, and relative
+        # bounds would drift apart between them, leaving gaps or overlaps at the seams.
+        now = _now()
+        lo = now - timedelta(days=window)
+        width = (now - lo) / slices
+        for k in range(slices):
+            start = lo + width * k
+            end = lo + width * (k + 1) if k < slices - 1 else None  # newest slice stays open-ended
+            planned.append(_partition(
+                f"{p['key']}#{k + 1}/{slices}", _build_jql(sub, updated_range=(start, end), tz=tz),
+                p["cursor_key"], p["mode"], None, split=True,
+            ))
+    ctx.parts[:] = planned
+    await _save_partitions(ctx)
+
+class _Run:
+    """Shared state for one attempt at a job: client, limits and the partition list."""
+
+    def __init__(self, job: JiraIngestJob, req: IngestRequest, base: str, auth: Tuple[str, str]):
+        settings = get_settings()
+        self.job_id = job.id
+        self.client = jira_http.get_client()
+        self.base = base
+        self.auth = auth
+        self.fields = _ingest_fields(req)
+        self.raw_storage = _raw_storage(req)
+        self.stream = settings.jira_ingest_stream if req.stream is None else req.stream
+        self.concurrency = req.concurrency or max(1, settings.jira_ingest_concurrency)
+        self.gate = asyncio.Semaphore(self.concurrency)  # search requests in flight, across partitions
+        self.changelog_sem = asyncio.Semaphore(max(1, settings.jira_changelog_concurrency))
+        # Parse stage: a thread pool (zlib and sha256 release the GIL; issue dicts need no pickling).
+        self.parse_pool = ThreadPoolExecutor(max_workers=max(1, settings.jira_ingest_parse_workers), thread_name_prefix="jira-parse")
+        # Write stage: one writer drains this queue; its bound is what keeps parsed pages from piling up.
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.jira_ingest_queue_pages))
+        self.write_batch = max(1, settings.jira_ingest_write_batch)
+        self.late_finishes: List[Tuple] = []  # failed/interrupted partition finishes, queued once the partitions stop
+        self.stats = {"fetch_seconds": 0.0, "parse_seconds": 0.0, "queue_wait_seconds": 0.0, "writer_idle_seconds": 0.0}
+        self.budget = max(0, req.max_issues - (job.fetched or 0))  # max_issues spans every attempt
+        self.reserved = 0  # budget held by page fetches in flight
+        self.tz: Any = None  # the Jira user's time zone, looked up once it is needed
+        self._settled = asyncio.Event()
+        self.parts: List[Dict[str, Any]] = json.loads(job.partitions_json or "[]")
+        if not self.parts:
+            # Job queued before partitioning existed: continue its single query where it stopped.
+            legacy = _partition("all", job.jql, job.jql_key, job.mode or "full", job.since, split=True)
+            legacy["start_at"] = job.start_at or 0
+            self.parts = [legacy]
+
+    async def take(self, n: int) -> int:
+        """Reserve up to `n` issues of the max_issues budget. While the budget is spent but fetches
+        still hold reservations, wait for them: a short page hands back what it did not use."""
+        while not self.budget and self.reserved:
+            self._settled.clear()
+            await self._settled.wait()
+        n = max(0, min(n, self.budget))
+        self.budget -= n
+        self.reserved += n
+        return n
+
+    def fetch(self, jql: str, start_at: int, want: int) -> "asyncio.Task[_Page]":
+        """Fetch a page against a reservation of `want` issues, settled as soon as the fetch ends
+        (done, failed or cancelled) rather than when its partition gets round to the result."""
+        def settle(task: "asyncio.Task[_Page]") -> None:
+            used = task.result().count if not task.cancelled() and task.exception() is None else 0
+            self.reserved -= want
+            self.budget += want - used
+            self._settled.set()
+        task = asyncio.create_task(_fetch_page(self, jql, start_at, want))
+        task.add_done_callback(settle)
+        return task
+
+    async def put(self, item: Tuple) -> None:
+        started = time.monotonic()
+        await self.queue.put(item)
+        self.stats["queue_wait_seconds"] += time.monotonic() - started
+
+async def _write_batch(ctx: _Run, items: List[Tuple]) -> None:
+    """Commit queued pages and partition finishes in one transaction, checkpoints included.
+
+    Items are ("page", part, next_start_at, total, page) or ("finish", part, state, elapsed);
+    a partition's items arrive in its startAt order, so its checkpoint only ever moves forward
+    over committed rows.
+    """
+    started = time.monotonic()
+    staged: Dict[int, Dict[str, Any]] = {}
+    counters = {"fetched": 0, "pages": 0, "issues": 0, "issues_unchanged": 0, "transitions": 0, "changelogs_completed": 0, "changelog_requests": 0}
+    high_water: Optional[datetime] = None
+    Session = get_sessionmaker()
+    async with Session() as session:
+        for item in items:
+            part = item[1]
+            cur = staged.setdefault(id(part), dict(part))
+            if item[0] == "finish":
+                _, _, state, elapsed = item
+                cur["state"] = state
+                cur["elapsed_seconds"] = cur["elapsed_seconds"] + elapsed
+                continue
+            _, _, next_start_at, total, page = item
+            written = await jira_store.write_issue_page(session, page.issue_rows, page.transition_rows, page.blob_rows)
+            high = _utc_naive(datetime.fromisoformat(cur["high_water"])) if cur["high_water"] else None
+            if page.max_updated and (high is None or page.max_updated > high):
+                high = page.max_updated
+            cur.update({
+                "state": "running",
+                "start_at": next_start_at,
+                "total": total,
+                "fetched": cur["fetched"] + page.count,
+                "pages": cur["pages"] + 1,
+                "issues_saved": cur["issues_saved"] + written["issues"],
+                "issues_unchanged": cur["issues_unchanged"] + written["issues_unchanged"],
+                "transitions_saved": cur["transitions_saved"] + written["transitions"],
+                "high_water": high.isoformat() if high else None,
+            })
+            counters["fetched"] += page.count
+            counters["pages"] += 1
+            counters["issues"] += written["issues"]
+            counters["issues_unchanged"] += written["issues_unchanged"]
+            counters["transitions"] += written["transitions"]
+            counters["changelogs_completed"] += page.changelogs_completed
+            counters["changelog_requests"] += page.changelog_requests
+            if page.max_updated and (high_water is None or page.max_updated > high_water):
+                high_water = page.max_updated
+        parts = [staged.get(id(p), p) for p in ctx.parts]
+        stats, ctx.stats = ctx.stats, {k: 0.0 for k in ctx.stats}
+        job = await session.get(JiraIngestJob, ctx.job_id)
+        job.partitions_json = json.dumps(parts)
+        job.start_at = sum(p["start_at"] for p in parts)
+        job.total = sum(p["total"] for p in parts if p["total"] is not None)
+        job.fetched += counters["fetched"]
+        job.pages += counters["pages"]
+        job.issues_saved += counters["issues"]
+        job.issues_unchanged += counters["issues_unchanged"]
+        job.transitions_saved += counters["transitions"]
+        job.changelogs_completed += counters["changelogs_completed"]
+        job.changelog_requests += counters["changelog_requests"]
+        if high_water and (job.high_water is None or high_water > job.high_water):
+            job.high_water = high_water
+        job.fetch_seconds += stats["fetch_seconds"]
+        job.parse_seconds += stats["parse_seconds"]
+        job.queue_wait_seconds += stats["queue_wait_seconds"]
+        job.writer_idle_seconds += stats["writer_idle_seconds"]
+        job.write_seconds += time.monotonic() - started
+        await session.commit()
+    for p in ctx.parts:
+        if id(p) in staged:
+            p.update(staged[id(p)])
+
+async def _writer(ctx: _Run) -> None:
+    """Write stage: drain the queue in batches of up to JIRA_INGEST_WRITE_BATCH items until None."""
+    while True:
+        idle = time.monotonic()
+        item = await ctx.queue.get()
+        ctx.stats["writer_idle_seconds"] += time.monotonic() - idle
+        if item is None:
+            return
+        items, stop = [item], False
+        while len(items) < ctx.write_batch and not ctx.queue.empty():
+            nxt = ctx.queue.get_nowait()
+            if nxt is None:
+                stop = True
+                break
+            items.append(nxt)
+        await _write_batch(ctx, items)
+        if stop:
+            return
+
+async def _run_partition(ctx: _Run, part: Dict[str, Any]) -> None:
+    """Page through one partition from its checkpoint, committing pages in startAt order."""
+    started = time.monotonic()
+    jql = part["jql"]
+    start_at = part["start_at"]
+    step = 100
+    state = "running"
+    try:
+        want = await ctx.take(step)
+        if not want:
+            state = "truncated"
+            return
+        page = await ctx.fetch(jql, start_at, want)
+        total = page.meta.get("total")
+        step = min(step, page.meta.get("maxResults") or step)  # Jira may clamp maxResults
+        # From where the first page ended, which is short of a page when the budget granted less.
+        offsets = deque(range(start_at + page.count, total, step)) if total is not None and page.count else deque()
+        cut = False
+
+        # Sliding window: at most `concurrency` pages of this partition in flight (the shared gate
+        # bounds the job as a whole), queued for the writer strictly in startAt order so the
+        # partition's start_at is always a safe place to resume from.
+        pending: deque = deque()
+        try:
+            while True:
+                if not page.count:
+                    part["total"] = total if total is not None else start_at
+                    break
+                await ctx.put(("page", part, start_at + page.count, total, page))
+                start_at += page.count
+                if total is None and page.count >= step:
+                    offsets.append(start_at)  # no total reported: fall back to walking page by page
+                while offsets and len(pending) < ctx.concurrency:
+                    end = offsets[1] if len(offsets) > 1 else total  # a page never runs into the next one
+                    size = min(step, end - offsets[0]) if end is not None else step
+                    want = await ctx.take(size)
+                    if not want:
+                        cut = True
+                        offsets.clear()
+                        break
+                    off = offsets.popleft()
+                    if want < size:
+                        offsets.appendleft(off + want)  # the rest of the page, once budget comes back
+                    pending.append((off, ctx.fetch(jql, off, want)))
+                if not pending:
+                    break
+                start_at, task = pending.popleft()
+                page = await task
+        finally:
+            for _, task in pending:
+                task.cancel()
+        state = "truncated" if cut else "succeeded"
+    except asyncio.CancelledError:
+        state = "interrupted"
+        raise
+    except Exception:
+        state = "failed"
+        raise
+    finally:
+        item = ("finish", part, state, time.monotonic() - started)
+        if state in ("succeeded", "truncated"):
+            await ctx.put(item)
+        else:
+            # A cancelled task cannot wait on a full queue; run_job queues these behind the
+            # partition's pages once every partition has stopped.
+            ctx.late_finishes.append(item)
+
+async def _store_partition_cursors(ctx: _Run) -> None:
+    # A cursor advances only when every partition of its query saw its whole result set; a
+    # max_issues cut keeps the newest issues and would otherwise skip the older ones next time.
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for p in ctx.parts:
+        groups.setdefault(p["cursor_key"], []).append(p)
+    for cursor_key, parts in groups.items():
+        if not all(p["state"] == "succeeded" for p in parts):
+            continue
+        marks = [datetime.fromisoformat(p["high_water"]) for p in parts if p["high_water"]]
+        await _store_cursor(cursor_key, max(marks) if marks else None, full=all(p["mode"] == "full" for p in parts))
+
+# ------------------- Jobs -----------------------------------------------------
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+async def create_job(req: IngestRequest, base_url: str = "") -> JiraIngestJob:
+    """Plan the partitions (full or delta from each one's sync cursor) and persist a queued job."""
+    await _ensure_tables()
+    parts = await _plan_partitions(req)
+    modes = {p["mode"] for p in parts}
+    sinces = [datetime.fromisoformat(p["since"]) for p in parts if p["since"]]
+    job = JiraIngestJob(
+        state="queued",
+        mode=modes.pop() if len(modes) == 1 else "mixed",
+        jql=parts[0]["jql"] if len(parts) == 1 else _build_jql(req),
+        jql_key=_normalize_jql(_build_jql(req)),
+        request_json=req.model_dump_json(exclude={"jira_base_url", "jira_email", "jira_api_token"}),
+        site=base_url.rstrip("/"),
+        partitions_json=json.dumps(parts),
+        since=min(sinces) if sinces else None,
+        created_at=_now(),
+    )
+    Session = get_sessionmaker()
+    async with Session() as session:
+        session.add(job)
+        await session.commit()
+    return job
+
+async def get_job(job_id: int) -> Optional[JiraIngestJob]:
+    Session = get_sessionmaker()
+    async with Session() as session:
+        return await session.get(JiraIngestJob, job_id)
+
+async def claim(job_id: int, from_states: Tuple[str, ...], to_state: str = "queued") -> bool:
+    """Move the job to `to_state` if it is still in one of `from_states`. Only one caller can win,
+    so a job id that reaches the queue twice still runs once."""
+    Session = get_sessionmaker()
+    async with Session() as session:
+        res = await session.execute(
+            update(JiraIngestJob).where(JiraIngestJob.id == job_id, JiraIngestJob.state.in_(from_states)).values(state=to_state)
+        )
+        await session.commit()
+        return res.rowcount == 1
+
+async def _set_state(job_id: int, state: str, error: Optional[str] = None, elapsed: float = 0.0) -> None:
+    Session = get_sessionmaker()
+    async with Session() as session:
+        job = await session.get(JiraIngestJob, job_id)
+        if job is None:
+            return
+        job.state = state
+        job.elapsed_seconds = (job.elapsed_seconds or 0.0) + elapsed
+        if state == "running":
+            job.started_at = job.started_at or _now()
+            job.attempts = (job.attempts or 0) + 1
+            job.error = None
+        else:
+            job.error = error
+        if state in ("succeeded", "failed"):
+            job.finished_at = _now()
+        await session.commit()
+
+def _partition_to_dict(p: Dict[str, Any]) -> Dict[str, Any]:
+    elapsed = p.get("elapsed_seconds") or 0.0
+    return {
+        "key": p["key"],
+        "state": p["state"],
+        "mode": p["mode"],
+        "jql": p["jql"],
+        "start_at": p["start_at"],
+        "total_reported_by_jira": p["total"],
+        "fetched": p["fetched"],
+        "issues_saved": p["issues_saved"],
+        "issues_unchanged": p["issues_unchanged"],
+        "transitions_saved": p["transitions_saved"],
+        "pages": p["pages"],
+        "cursor": p["high_water"] + "Z" if p["high_water"] else None,
+        "elapsed_seconds": round(elapsed, 3),
+        "issues_per_sec": round(p["fetched"] / elapsed, 1) if elapsed > 0 else None,
+    }
+
+def job_to_dict(job: JiraIngestJob) -> Dict[str, Any]:
+    def _iso(dt):
+        return dt.isoformat() + "Z" if dt else None
+    elapsed = job.elapsed_seconds or 0.0
+    rows = (job.issues_saved or 0) + (job.transitions_saved or 0)
+    req = json.loads(job.request_json or "{}")
+    parts = json.loads(job.partitions_json or "[]")
+    return {
+        "job_id": job.id,
+        "state": job.state,
+        "mode": job.mode,
+        # The query actually searched; a partitioned job searches one per partition instead.
+        "jql": parts[0]["jql"] if len(parts) == 1 else (None if parts else job.jql),
+        "partition_jql": {p["key"]: p["jql"] for p in parts},
+        "base_url": job.site or None,
+        "since": _iso(job.since),
+        "start_at": job.start_at,
+        "total_reported_by_jira": job.total,
+        "fetched": job.fetched,
+        "issues_saved": job.issues_saved,
+        "issues_unchanged": job.issues_unchanged,
+        "transitions_saved": job.transitions_saved,
+        "changelogs_completed": job.changelogs_completed,
+        "changelog_requests": job.changelog_requests,
+        "pages": job.pages,
+        "concurrency": req.get("concurrency") or max(1, get_settings().jira_ingest_concurrency),
+        "raw_storage": req.get("raw_storage") or get_settings().jira_ingest_raw_storage,
+        "cursor": _iso(job.high_water),
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": _iso(job.created_at),
+        "started_at": _iso(job.started_at),
+        "finished_at": _iso(job.finished_at),
+        "elapsed_seconds": round(elapsed, 3),
+        "pages_per_sec": round(job.pages / elapsed, 2) if elapsed > 0 else None,
+        "write_seconds": round(job.write_seconds or 0.0, 3),
+        "rows_per_sec": round(rows / job.write_seconds, 1) if job.write_seconds else None,
+        # Busy time per stage. Fetch and parse add up across concurrent pages; a large
+        # queue_wait means the writer is the bottleneck, a large writer_idle means fetch/parse is.
+        "stages": {
+            "fetch_seconds": round(job.fetch_seconds or 0.0, 3),
+            "parse_seconds": round(job.parse_seconds or 0.0, 3),
+            "write_seconds": round(job.write_seconds or 0.0, 3),
+            "queue_wait_seconds": round(job.queue_wait_seconds or 0.0, 3),
+            "writer_idle_seconds": round(job.writer_idle_seconds or 0.0, 3),
+        },
+        "partitions": [_partition_to_dict(p) for p in parts],
+    }
+
+async def run_job(job_id: int, base: str, email: str, token: str) -> None:
+    """Run every unfinished partition of the job concurrently, each from its last committed startAt."""
+    job = await get_job(job_id)
+    if job is None or not await claim(job_id, ("queued",), "running"):
+        return  # finished, or already taken by another worker
+    req = IngestRequest.model_validate_json(job.request_json or "{}")
+
+    await _set_state(job_id, "running")
+    started = time.monotonic()
+    ctx: Optional[_Run] = None
+    try:
+        ctx = _Run(job, req, base, (email, token))
+        await _pin_delta_windows(ctx, req)
+        await _split_large_partitions(ctx, req)
+        # Pipeline: partition tasks fetch (bounded by the shared gate) and hand batches of issues
+        # to the parse pool; parsed pages go through the bounded queue to the single writer.
+        writer = asyncio.create_task(_writer(ctx))
+        tasks = [asyncio.create_task(_run_partition(ctx, p)) for p in ctx.parts if p["state"] not in ("succeeded", "truncated")]
+        try:
+            pending = set(tasks) | {writer}
+            while pending - {writer}:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        raise task.exception()
+                if writer in done:
+                    raise RuntimeError("Ingest writer stopped early")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)  # let partitions record where they stopped
+            if not writer.done():
+                for item in ctx.late_finishes:
+                    await ctx.queue.put(item)
+                await ctx.queue.put(None)  # commit whatever was already parsed, then stop
+            await writer
+        await _store_partition_cursors(ctx)
+        await _set_state(job_id, "succeeded", elapsed=time.monotonic() - started)
+    except asyncio.CancelledError:
+        await _set_state(job_id, "interrupted", error="Worker stopped before the job finished", elapsed=time.monotonic() - started)
+        raise
+    except HTTPException as e:
+        await _set_state(job_id, "failed", error=str(e.detail), elapsed=time.monotonic() - started)
+    except Exception as e:
+        await _set_state(job_id, "failed", error=f"{type(e).__name__}: {e}", elapsed=time.monotonic() - started)
+    finally:
+        if ctx is not None:
+            ctx.parse_pool.shutdown(wait=False, cancel_futures=True)
+
+# ------------------- Worker ---------------------------------------------------
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+
+async def _worker():
+    while True:
+        job_id, base, email, token = await _queue.get()
+        try:
+            await run_job(job_id, base, email, token)
+        finally:
+            _queue.task_done()
+
+def start_workers() -> None:
+    global _queue
+    if _workers:
+        return
+    _queue = asyncio.Queue()
+    for _ in range(max(1, get_settings().jira_ingest_workers)):
+        _workers.append(asyncio.create_task(_worker()))
+
+async def stop_workers() -> None:
+    for t in _workers:
+        t.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+def enqueue(job_id: int, base: str, email: str, token: str) -> None:
+    start_workers()
+    _queue.put_nowait((job_id, base, email, token))
+
+async def interrupted_jobs() -> List[JiraIngestJob]:
+    """Mark jobs left 'running' by a previous process as interrupted; return every resumable job."""
+    await _ensure_tables()
+    Session = get_sessionmaker()
+    async with Session() as session:
+        res = await session.execute(select(JiraIngestJob).where(JiraIngestJob.state.in_(("queued", "running", "interrupted"))).order_by(JiraIngestJob.id))
+        jobs = res.scalars().all()
+        for job in jobs:
+            if job.state == "running":
+                job.state = "interrupted"
+        await session.commit()
+        return list(jobs)
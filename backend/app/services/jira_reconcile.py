@@ -0,0 +1,166 @@
+"""Deletion and move reconciliation for the local Jira tables.
+
+Ingest only upserts what search returns, so issues deleted in Jira or moved to another project
+linger in jira_issues / jira_transitions. A sweep pages through the scope asking for
+``fields=id,key,project`` only, diffs the ids against the local rows and then:
+
+* local ids missing from the sweep are looked up with ``id in (...)``; the ones Jira no longer
+  returns are deleted (issue, transitions, unreferenced blobs), the rest are re-keyed;
+* ids present in both with a different key or project are re-keyed in place.
+
+Nothing is deleted on the strength of the paged sweep alone, so an issue that shifts between
+pages while the sweep runs is at worst looked up once more.
+"""
+from typing import Any, Dict, List, Set, Tuple
+from sqlalchemy import select
+import asyncio
+import time
+from fastapi import HTTPException
+from ..core.config import get_settings
+from ..db.database import get_sessionmaker
+from ..db.jira_models import JiraIssue
+from ..schemas import IngestRequest, ReconcileRequest
+from . import jira_http, jira_store
+from .jira_ingest import KEY_REGEX, _build_jql, _ensure_tables, _search_error
+
+SWEEP_FIELDS = "id,key,project"
+# Ids per `id in (...)` lookup; keeps the JQL well under URL length limits.
+LOOKUP_CHUNK = 100
+
+def _scope_jql(req: ReconcileRequest) -> str:
+    """The ingest scope without the updated window, in a stable order for concurrent paging."""
+    scope = IngestRequest(projects=req.projects, labels=req.labels, jql=req.jql, updated_window_days=0)
+    jql = _build_jql(scope)
+    return jql[:jql.lower().rindex("order by")].strip() + " order by key asc"
+
+class _Sweep:
+    def __init__(self, base: str, auth: Tuple[str, str], concurrency: int):
+        self.client = jira_http.get_client()
+        self.base = base
+        self.auth = auth
+        self.sem = asyncio.Semaphore(max(1, concurrency))
+        self.requests = 0
+        self.bytes = 0
+
+    async def search(self, jql: str, start_at: int, max_results: int) -> Dict[str, Any]:
+        params = {"jql": jql, "startAt": start_at, "maxResults": max_results, "fields": SWEEP_FIELDS, "validateQuery": "warn"}
+        async with self.sem:
+            r = await self.client.get(f"{self.base}/rest/api/3/search", headers={"Accept": "application/json"}, params=params, auth=self.auth)
+        self.requests += 1
+        self.bytes += len(r.content)
+        if r.status_code >= 400:
+            raise _search_error(r.status_code, jql, r.text)
+        return r.json()
+
+    async def scan(self, jql: str, page_size: int) -> Dict[str, Tuple[str, str]]:
+        """issue_id -> (key, project_key) for every issue `jql` matches."""
+        found: Dict[str, Tuple[str, str]] = {}
+
+        def _take(data: Dict[str, Any]) -> None:
+            for issue in data.get("issues") or []:
+                project = ((issue.get("fields") or {}).get("project") or {}).get("key") or ""
+                found[str(issue.get("id"))] = (issue.get("key") or "", project)
+
+        first = await self.search(jql, 0, page_size)
+        _take(first)
+        total = int(first.get("total") or 0)
+        step = int(first.get("maxResults") or 0) or len(first.get("issues") or []) or page_size  # Jira may clamp the page size
+        pages = await asyncio.gather(*(self.search(jql, s, step) for s in range(step, total, step)))
+        for data in pages:
+            _take(data)
+        return found
+
+    async def lookup(self, issue_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+        """Current key and project of each id that still exists, wherever it lives now."""
+        chunks = [issue_ids[i:i + LOOKUP_CHUNK] for i in range(0, len(issue_ids), LOOKUP_CHUNK)]
+        results = await asyncio.gather(*(self.scan(f"id in ({', '.join(c)})", LOOKUP_CHUNK) for c in chunks))
+        found: Dict[str, Tuple[str, str]] = {}
+        for part in results:
+            found.update(part)
+        return found
+
+async def _local_rows(projects: Set[str], issue_ids: List[str]) -> Dict[str, Tuple[str, str, str]]:
+    """issue_id -> (key, project_key, raw_hash) for local rows in `projects` or with one of `issue_ids`."""
+    cols = (JiraIssue.issue_id, JiraIssue.key, JiraIssue.project_key, JiraIssue.raw_hash)
+    out: Dict[str, Tuple[str, str, str]] = {}
+    Session = get_sessionmaker()
+    async with Session() as session:
+        if projects:
+            for issue_id, key, project, raw_hash in (await session.execute(select(*cols).where(JiraIssue.project_key.in_(sorted(projects))))).all():
+                out[issue_id] = (key, project, raw_hash or "")
+        wanted = [i for i in issue_ids if i not in out]
+        for chunk in jira_store._chunks(wanted, jira_store.IN_CLAUSE_CHUNK):
+            for issue_id, key, project, raw_hash in (await session.execute(select(*cols).where(JiraIssue.issue_id.in_(chunk)))).all():
+                out[issue_id] = (key, project, raw_hash or "")
+    return out
+
+async def _apply(moves: Dict[str, Tuple[str, str, str, str]], deletes: Dict[str, str]) -> None:
+    """moves: issue_id -> (old_key, old_project, new_key, new_project); deletes: issue_id -> raw_hash."""
+    Session = get_sessionmaker()
+    async with Session() as session:
+        if moves:
+            rows = [{"i": i, "k": new_key, "p": new_project} for i, (_, _, new_key, new_project) in moves.items()]
+            conn = await session.connection()
+            await conn.exec_driver_sql("UPDATE jira_issues SET key = :k, project_key = :p WHERE issue_id = :i", rows)
+            await conn.exec_driver_sql("UPDATE jira_transitions SET issue_key = :k WHERE issue_id = :i", rows)
+            # Children still point at the old key until their next ingest; fix the links now.
+            renamed = [{"old": old_key, "new": new_key} for old_key, _, new_key, _ in moves.values() if old_key != new_key]
+            if renamed:
+                await conn.exec_driver_sql("UPDATE jira_issues SET parent_key = :new WHERE parent_key = :old", renamed)
+                await conn.exec_driver_sql("UPDATE jira_issues SET epic_key = :new WHERE epic_key = :old", renamed)
+        await jira_store.delete_issues(session, list(deletes))
+        await session.commit()
+
+async def reconcile(req: ReconcileRequest, base: str, email: str, token: str) -> Dict[str, Any]:
+    """Sweep the scope and delete or re-key local orphans. With `dry_run` nothing is written."""
+    s = get_settings()
+    if not (req.projects or req.labels or req.jql.strip()):
+        raise HTTPException(status_code=400, detail="Reconcile needs a scope: projects, labels or jql")
+    await _ensure_tables()
+    started = time.monotonic()
+    jql = _scope_jql(req)
+    sweep = _Sweep(base, (email, token), req.concurrency or s.jira_ingest_concurrency)
+
+    remote = await sweep.scan(jql, s.jira_reconcile_page_size)
+    scan_requests, scan_bytes = sweep.requests, sweep.bytes
+    # Local rows compared against the sweep: the requested project keys plus every project the
+    # sweep touched, and any row (whatever its project) whose id the sweep returned.
+    projects = {p.strip() for p in req.projects if p and KEY_REGEX.match(p.strip())}
+    projects.update(project for _, project in remote.values() if project)
+    local = await _local_rows(projects, list(remote))
+
+    moves: Dict[str, Tuple[str, str, str, str]] = {}
+    for issue_id, (key, project) in remote.items():
+        row = local.get(issue_id)
+        if row is not None and (row[0], row[1]) != (key, project):
+            moves[issue_id] = (row[0], row[1], key, project)
+    missing = [issue_id for issue_id in local if issue_id not in remote]
+    still_there = await sweep.lookup(missing) if missing else {}
+    deletes: Dict[str, str] = {}
+    for issue_id in missing:
+        key, project, raw_hash = local[issue_id]
+        if issue_id not in still_there:
+            deletes[issue_id] = raw_hash
+        elif still_there[issue_id] != (key, project):
+            moves[issue_id] = (key, project, *still_there[issue_id])
+
+    if not req.dry_run and (moves or deletes):
+        await _apply(moves, deletes)
+    return {
+        "jql": jql,
+        "dry_run": req.dry_run,
+        "remote": len(remote),
+        "local": len(local),
+        "not_ingested": sum(1 for i in remote if i not in local),  # in scope remotely, never ingested (e.g. outside the window)
+        "out_of_scope": len(missing) - len(deletes),  # still in Jira, no longer matched by the scope
+        "moved": len(moves),
+        "deleted": len(deletes),
+        "moved_keys": [{"from": f"{op}/{ok}", "to": f"{np}/{nk}"} for ok, op, nk, np in list(moves.values())[:50]],
+        "deleted_keys": [local[i][0] for i in list(deletes)[:50]],
+        "requests": sweep.requests,
+        "scan_requests": scan_requests,
+        "lookup_requests": sweep.requests - scan_requests,
+        "bytes_fetched": sweep.bytes,
+        "scan_bytes": scan_bytes,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
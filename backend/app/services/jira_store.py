@@ -0,0 +1,208 @@
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import zlib
+from datetime import timezone
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import get_settings
+from ..db.jira_models import JiraIssue, JiraIssueBlob, JiraTransition
+
+try:
+    import zstandard
+    HAVE_ZSTD = True
+except Exception:
+    HAVE_ZSTD = False
+
+# SQLite caps bound parameters per statement (999 on older builds)
+IN_CLAUSE_CHUNK = 500
+
+ISSUE_COLUMNS = [
+    "issue_id", "key", "project_key", "issue_type", "summary", "status",
+    "assignee", "epic_key", "parent_key", "labels", "created", "updated", "raw_json",
+    "content_hash", "raw_hash",
+]
+
+def _chunks(seq: List[Any], size: int):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+# ------------------- Blobs ----------------------------------------------------
+def canonical_json(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def sha256_hex(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _codec() -> str:
+    return "zstd" if get_settings().jira_raw_codec == "zstd" and HAVE_ZSTD else "zlib"
+
+def encode_blob(text: str) -> Dict[str, Any]:
+    """Row for jira_issue_blobs: compressed `text` keyed by its sha256."""
+    raw = text.encode("utf-8")
+    codec = _codec()
+    data = zstandard.ZstdCompressor(level=6).compress(raw) if codec == "zstd" else zlib.compress(raw, 6)
+    return {"hash": hashlib.sha256(raw).hexdigest(), "codec": codec, "size": len(raw), "data": data}
+
+def decode_blob(codec: str, data: bytes) -> Any:
+    if codec == "zstd":
+        if not HAVE_ZSTD:
+            raise RuntimeError("Blob is zstd-compressed but the zstandard package is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raw = zlib.decompress(data)
+    return json.loads(raw.decode("utf-8"))
+
+async def read_raw_payload(session: AsyncSession, issue_id: str) -> Optional[Any]:
+    """Stored raw payload for an issue (blob store first, then the legacy raw_json column)."""
+    row = (await session.execute(select(JiraIssue.raw_hash, JiraIssue.raw_json).where(JiraIssue.issue_id == issue_id))).first()
+    if not row:
+        return None
+    raw_hash, raw_json = row
+    if raw_hash:
+        blob = await session.get(JiraIssueBlob, raw_hash)
+        if blob is not None:
+            return decode_blob(blob.codec, blob.data)
+    return json.loads(raw_json) if raw_json else None
+
+# ------------------- Writes ---------------------------------------------------
+async def _stored_hashes(session: AsyncSession, issue_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+    out: Dict[str, Tuple[str, str]] = {}
+    for chunk in _chunks(issue_ids, IN_CLAUSE_CHUNK):
+        res = await session.execute(
+            select(JiraIssue.issue_id, JiraIssue.content_hash, JiraIssue.raw_hash).where(JiraIssue.issue_id.in_(chunk))
+        )
+        for issue_id, content_hash, raw_hash in res.all():
+            out[issue_id] = (content_hash or "", raw_hash or "")
+    return out
+
+async def upsert_issues(session: AsyncSession, issue_rows: List[Dict[str, Any]]) -> int:
+    """One INSERT ... ON CONFLICT(issue_id) DO UPDATE executemany for the whole batch."""
+    if not issue_rows:
+        return 0
+    stmt = sqlite_insert(JiraIssue)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JiraIssue.issue_id],
+        set_={c: getattr(stmt.excluded, c) for c in ISSUE_COLUMNS if c != "issue_id"},
+    )
+    await session.execute(stmt, [{c: r.get(c, "") for c in ISSUE_COLUMNS} for r in issue_rows])
+    return len(issue_rows)
+
+async def insert_blobs(session: AsyncSession, blob_rows: List[Dict[str, Any]]) -> int:
+    """Content-addressed: a hash that is already stored is left alone."""
+    if not blob_rows:
+        return 0
+    stmt = sqlite_insert(JiraIssueBlob).on_conflict_do_nothing(index_elements=[JiraIssueBlob.hash])
+    await session.execute(stmt, blob_rows)
+    return len(blob_rows)
+
+async def delete_orphan_blobs(session: AsyncSession, hashes: List[str]) -> None:
+    """Drop blobs in `hashes` that no issue points at any more."""
+    for chunk in _chunks([h for h in hashes if h], IN_CLAUSE_CHUNK):
+        still_used = select(JiraIssue.raw_hash).where(JiraIssue.raw_hash.in_(chunk))
+        await session.execute(
+            delete(JiraIssueBlob).where(JiraIssueBlob.hash.in_(chunk), JiraIssueBlob.hash.not_in(still_used))
+        )
+
+async def replace_transitions(session: AsyncSession, issue_ids: List[str], transition_rows: List[Dict[str, Any]]) -> int:
+    """Drop every stored transition for `issue_ids` and insert `transition_rows` in one executemany."""
+    for chunk in _chunks(issue_ids, IN_CLAUSE_CHUNK):
+        await session.execute(delete(JiraTransition).where(JiraTransition.issue_id.in_(chunk)))
+    if transition_rows:
+        await session.execute(insert(JiraTransition), transition_rows)
+    return len(transition_rows)
+
+async def write_issue_page(
+    session: AsyncSession,
+    issue_rows: List[Dict[str, Any]],
+    transition_rows: List[Dict[str, Any]],
+    blob_rows: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, int]:
+    """Upsert a page of issues, their blobs and transitions. Caller commits.
+
+    Issues whose content_hash matches the stored one are skipped entirely, transitions included.
+    """
+    stored = await _stored_hashes(session, [r["issue_id"] for r in issue_rows])
+    changed = [r for r in issue_rows if not r.get("content_hash") or stored.get(r["issue_id"], ("", ""))[0] != r["content_hash"]]
+    changed_ids = {r["issue_id"] for r in changed}
+    wanted_blobs = {r.get("raw_hash") for r in changed if r.get("raw_hash")}
+
+    stats = {"issues": 0, "issues_unchanged": len(issue_rows) - len(changed), "transitions": 0, "blobs": 0}
+    stats["blobs"] = await insert_blobs(session, [b for b in (blob_rows or []) if b["hash"] in wanted_blobs])
+    stats["issues"] = await upsert_issues(session, changed)
+    stats["transitions"] = await replace_transitions(
+        session, [r["issue_id"] for r in changed], [t for t in transition_rows if t["issue_id"] in changed_ids]
+    )
+    replaced = [stored[i][1] for i in changed_ids if i in stored and stored[i][1]]
+    await delete_orphan_blobs(session, replaced)
+    return stats
+
+# ------------------- Partial updates ------------------------------------------
+# Columns a partial update (webhook event) may set; raw_hash is left to the next ingest.
+FIELD_COLUMNS = ["key", "project_key", "issue_type", "summary", "status", "assignee", "epic_key", "parent_key", "labels", "created", "updated"]
+
+async def merge_issues(session: AsyncSession, issue_rows: List[Dict[str, Any]]) -> int:
+    """Upsert parsed fields only. content_hash is cleared so the next ingest rewrites the row,
+    its transitions and its blob in full. A row older than the stored one (by `updated`) is
+    left out, so a late delivery cannot roll back what an ingest or newer event wrote."""
+    if not issue_rows:
+        return 0
+    stmt = sqlite_insert(JiraIssue)
+    set_ = {c: getattr(stmt.excluded, c) for c in FIELD_COLUMNS}
+    set_["content_hash"] = ""
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JiraIssue.issue_id], set_=set_,
+        where=or_(JiraIssue.updated.is_(None), stmt.excluded.updated >= JiraIssue.updated),
+    )
+    cols = ["issue_id"] + FIELD_COLUMNS
+    await session.execute(stmt, [{**{c: r.get(c, "") for c in cols}, "raw_json": "", "content_hash": "", "raw_hash": ""} for r in issue_rows])
+    return len(issue_rows)
+
+async def append_transitions(session: AsyncSession, transition_rows: List[Dict[str, Any]]) -> int:
+    """Insert transitions not stored yet, matched on (issue_id, when, to_status); redelivered events are no-ops.
+
+    Like merge_issues, nothing older than the stored issue is applied: where the row still
+    holds an ingest's full history (content_hash set), transitions at or before its `updated`
+    are already in it. Call this before merge_issues, which clears content_hash.
+    """
+    if not transition_rows:
+        return 0
+    seen = set()
+    covered: Dict[str, Any] = {}  # issue_id -> updated of an ingested row
+    for chunk in _chunks(sorted({t["issue_id"] for t in transition_rows}), IN_CLAUSE_CHUNK):
+        res = await session.execute(
+            select(JiraTransition.issue_id, JiraTransition.when, JiraTransition.to_status).where(JiraTransition.issue_id.in_(chunk))
+        )
+        seen.update((i, _naive(w), to) for i, w, to in res.all())
+        res = await session.execute(
+            select(JiraIssue.issue_id, JiraIssue.updated).where(JiraIssue.issue_id.in_(chunk), JiraIssue.content_hash != "", JiraIssue.updated.is_not(None))
+        )
+        covered.update((i, _naive(u)) for i, u in res.all())
+    fresh = []
+    for t in transition_rows:
+        k = (t["issue_id"], _naive(t["when"]), t["to_status"])
+        if t["issue_id"] in covered and k[1] is not None and k[1] <= covered[t["issue_id"]]:
+            continue
+        if k not in seen:
+            seen.add(k)
+            fresh.append(t)
+    if fresh:
+        await session.execute(insert(JiraTransition), fresh)
+    return len(fresh)
+
+async def delete_issues(session: AsyncSession, issue_ids: List[str]) -> int:
+    """Delete issues with their transitions and any blob nothing else references. Caller commits."""
+    hashes: List[str] = []
+    deleted = 0
+    for chunk in _chunks(issue_ids, IN_CLAUSE_CHUNK):
+        hashes.extend(h for (h,) in (await session.execute(select(JiraIssue.raw_hash).where(JiraIssue.issue_id.in_(chunk)))).all() if h)
+        await session.execute(delete(JiraTransition).where(JiraTransition.issue_id.in_(chunk)))
+        deleted += (await session.execute(delete(JiraIssue).where(JiraIssue.issue_id.in_(chunk)))).rowcount or 0
+    await delete_orphan_blobs(session, sorted(set(hashes)))
+    return deleted
+
+def _naive(dt):
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
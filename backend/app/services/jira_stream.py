@@ -0,0 +1,116 @@
+"""Incremental parsing of Jira search responses.
+
+A search page with expanded changelogs can be tens of MB. Instead of buffering the body and
+calling ``r.json()``, :class:`SearchPageParser` is fed decoded chunks as they arrive and hands
+back each element of the top-level ``issues`` array as soon as its closing brace is seen. Only
+one issue's text is held at a time; everything outside the array (``total``, ``startAt``, ...)
+is kept as a small skeleton and decoded at the end.
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional
+import codecs
+import json
+import re
+import httpx
+
+# Characters that can change nesting or string state; everything else is skipped in bulk.
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_END = re.compile(r'["\\]')
+
+
+class SearchPageParser:
+    def __init__(self, array_key: str = "issues"):
+        self.array_key = array_key
+        self._depth = 0
+        self._in_string = False
+        self._in_array = False
+        self._last_key: Optional[str] = None  # last string closed at depth 1
+        # Offsets below are relative to _buf, the text not yet consumed.
+        self._buf = ""
+        self._resume = 0
+        self._string_start = 0
+        self._element_start: Optional[int] = None
+        self._skeleton: List[str] = []
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return every array element completed by it."""
+        out: List[Dict[str, Any]] = []
+        buf = self._buf + text
+        n = len(buf)
+        i = self._resume
+        pos = 0  # start of skeleton text not yet copied out
+        while i < n:
+            if self._in_string:
+                m = _STRING_END.search(buf, i)
+                if m is None:
+                    i = n
+                    break
+                if m.group() == "\\":
+                    if m.end() >= n:
+                        i = m.start()  # keep the backslash until the escaped char arrives
+                        break
+                    i = m.end() + 1
+                    continue
+                self._in_string = False
+                i = m.end()
+                if self._depth == 1 and not self._in_array:
+                    self._last_key = buf[self._string_start + 1:i - 1]
+                continue
+            m = _STRUCTURAL.search(buf, i)
+            if m is None:
+                i = n
+                break
+            c = m.group()
+            i = m.end()
+            if c == '"':
+                self._in_string = True
+                self._string_start = m.start()
+            elif c in "{[":
+                if self._in_array and self._depth == 2:
+                    self._element_start = m.start()
+                elif c == "[" and self._depth == 1 and not self._in_array and self._last_key == self.array_key:
+                    self._in_array = True
+                    self._skeleton.append(buf[pos:i])
+                    pos = i
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._in_array and self._depth == 2 and self._element_start is not None:
+                    out.append(json.loads(buf[self._element_start:i]))
+                    self._element_start = None
+                elif self._in_array and self._depth == 1:
+                    self._in_array = False
+                    self._last_key = None
+                    pos = m.start()  # the closing bracket belongs to the skeleton
+        # Retain only what later chunks still need: a partial element or a partial key.
+        if self._in_array:
+            if self._element_start is not None:
+                keep = self._element_start
+            else:
+                keep = self._string_start if self._in_string else i
+        else:
+            keep = self._string_start if self._in_string else i
+            self._skeleton.append(buf[pos:keep])
+        self._buf = buf[keep:]
+        self._resume = i - keep
+        if self._element_start is not None:
+            self._element_start -= keep
+        if self._in_string:
+            self._string_start -= keep
+        return out
+
+    def close(self) -> Dict[str, Any]:
+        """Decode everything outside the array; ``issues`` comes back empty."""
+        skeleton = "".join(self._skeleton) + (self._buf if not self._in_array else "")
+        return json.loads(skeleton) if skeleton.strip() else {}
+
+
+async def iter_search_page(response: httpx.Response, meta: Dict[str, Any], array_key: str = "issues") -> AsyncIterator[Dict[str, Any]]:
+    """Yield issues from a streamed response; fills `meta` with the remaining top-level keys."""
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+    parser = SearchPageParser(array_key)
+    async for chunk in response.aiter_bytes():
+        for issue in parser.feed(decoder.decode(chunk)):
+            yield issue
+    for issue in parser.feed(decoder.decode(b"", final=True)):
+        yield issue
+    meta.update(parser.close())
@@ -0,0 +1,179 @@
+from typing import Any, Dict, Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import asyncio
+import random
+import time
+import httpx
+from ..core.config import get_settings
+
+RETRY_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class TokenBucket:
+    """Request budget for one Jira site: `rate` requests/sec with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def block_for(self, seconds: float) -> None:
+        """Pause the whole site, e.g. after a 429 with Retry-After."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> float:
+        """Take one token, sleeping as needed. Returns seconds waited (including queueing behind other callers)."""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.rate <= 0:
+                    return time.monotonic() - started  # budget disabled
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return time.monotonic() - started
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except Exception:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    # Jira Cloud sends X-RateLimit-Reset as an ISO 8601 timestamp
+    if not value:
+        return None
+    try:
+        when = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except Exception:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport with a per-site token bucket and retries for 429/503 and connection errors.
+
+    Server hints win: Retry-After, then X-RateLimit-Reset when X-RateLimit-Remaining is 0.
+    Otherwise the delay is jittered exponential backoff.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        s = get_settings()
+        self.inner = inner
+        self.rate = s.jira_rate_limit_rps
+        self.burst = s.jira_rate_limit_burst
+        self.max_retries = s.jira_retry_max
+        self.base_delay = s.jira_retry_base_delay
+        self.max_delay = s.jira_retry_max_delay
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._sites: Dict[str, Dict[str, Any]] = {}
+        self.counters = {
+            "requests": 0,
+            "throttled_429": 0,
+            "unavailable_503": 0,
+            "transport_errors": 0,
+            "retries": 0,
+            "gave_up": 0,
+            "retry_wait_seconds": 0.0,
+            "budget_wait_seconds": 0.0,
+        }
+
+    def _bucket(self, site: str) -> TokenBucket:
+        b = self._buckets.get(site)
+        if b is None:
+            b = self._buckets[site] = TokenBucket(self.rate, self.burst)
+        return b
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_delay, self.base_delay * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+    def _note_headers(self, site: str, response: httpx.Response) -> None:
+        h = response.headers
+        seen = {k: h[k] for k in ("X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "X-RateLimit-NearLimit", "RateLimit-Reason") if k in h}
+        if seen:
+            self._sites.setdefault(site, {})["last_rate_limit_headers"] = seen
+
+    def _server_delay(self, response: httpx.Response) -> Optional[float]:
+        delay = _parse_retry_after(response.headers.get("Retry-After"))
+        if delay is None and response.headers.get("X-RateLimit-Remaining") == "0":
+            delay = _parse_reset(response.headers.get("X-RateLimit-Reset"))
+        return None if delay is None else min(delay, self.max_delay)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        site = request.url.netloc.decode("ascii", "ignore")
+        bucket = self._bucket(site)
+        retryable = request.method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            waited = await bucket.acquire()
+            self.counters["budget_wait_seconds"] += waited
+            self.counters["requests"] += 1
+            try:
+                response = await self.inner.handle_async_request(request)
+            except httpx.TransportError:
+                self.counters["transport_errors"] += 1
+                if not retryable or attempt >= self.max_retries:
+                    self.counters["gave_up"] += 1
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                self._note_headers(site, response)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                self.counters["throttled_429" if response.status_code == 429 else "unavailable_503"] += 1
+                if not retryable or attempt >= self.max_retries:
+                    self.counters["gave_up"] += 1
+                    return response
+                server_delay = self._server_delay(response)
+                await response.aclose()
+                if server_delay is not None:
+                    # The site told us when to come back: hold every request to it, not just this one.
+                    bucket.block_for(server_delay)
+                    delay = 0.0
+                else:
+                    delay = self._backoff(attempt)
+            attempt += 1
+            self.counters["retries"] += 1
+            self.counters["retry_wait_seconds"] += delay
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        sites = {}
+        for site, b in self._buckets.items():
+            sites[site] = {
+                "tokens": round(b.tokens, 2),
+                "blocked_for_seconds": round(max(0.0, b.blocked_until - now), 2),
+                **self._sites.get(site, {}),
+            }
+        return {
+            "budget": {"rate_per_sec": self.rate, "burst": self.burst, "max_retries": self.max_retries},
+            **{k: (round(v, 3) if isinstance(v, float) else v) for k, v in self.counters.items()},
+            "sites": sites,
+        }
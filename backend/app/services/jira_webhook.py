@@ -0,0 +1,165 @@
+"""Jira webhook receiver: applies issue events to the local tables between ingests.
+
+Events are buffered per issue and flushed by a single task once the batching window
+(JIRA_WEBHOOK_BATCH_MS) has passed since the first buffered event, or as soon as
+JIRA_WEBHOOK_MAX_BATCH issues are pending. A burst of edits to one issue becomes one row
+write; a burst across many issues becomes one transaction.
+
+Updated issues get their parsed fields upserted and the status changes from the event's
+changelog appended. Their content_hash is cleared, so the next ingest still rewrites the row,
+its full transition history and its raw blob.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import hmac
+import time
+from ..core.config import get_settings
+from ..db.database import get_sessionmaker
+from . import jira_store
+from .jira_ingest import _ensure_tables, _extract_transitions, _parse_issue_fields, _utc_naive
+
+UPSERT_EVENTS = ("jira:issue_created", "jira:issue_updated")
+DELETE_EVENTS = ("jira:issue_deleted",)
+RETRY_MAX_SECONDS = 60.0
+
+_pending: Dict[str, Dict[str, Any]] = {}  # issue_id -> {"row", "transitions", "deleted"}
+_flusher: Optional[asyncio.Task] = None
+_full = asyncio.Event()
+_write_lock = asyncio.Lock()
+_counters = {"received": 0, "ignored": 0, "coalesced": 0, "batches": 0, "issues_written": 0, "issues_deleted": 0, "transitions_added": 0, "errors": 0}
+_last_flush: Dict[str, Any] = {}
+
+def verify(body: bytes, signature: Optional[str], token: Optional[str]) -> bool:
+    """Accept either an `X-Hub-Signature: sha256=<hmac of body>` header or the secret as a query token."""
+    secret = get_settings().jira_webhook_secret
+    if not secret:
+        return False
+    if signature:
+        algo, _, digest = signature.partition("=")
+        if algo.lower() != "sha256":
+            return False
+        expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, digest.strip().lower())
+    return bool(token) and hmac.compare_digest(secret, token)
+
+def _event_name(payload: Dict[str, Any]) -> str:
+    name = (payload.get("webhookEvent") or "").strip()
+    return name if name.startswith("jira:") else f"jira:{name}"
+
+def _event_transitions(payload: Dict[str, Any], fields: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Status changes carried by the event, as jira_transitions rows."""
+    items = (payload.get("changelog") or {}).get("items") or []
+    if not items:
+        return []
+    ts = payload.get("timestamp")
+    when = datetime.fromtimestamp(ts / 1000, tz=timezone.utc) if isinstance(ts, (int, float)) else (fields["updated"] or datetime.now(timezone.utc))
+    history = {"created": when.isoformat(), "author": payload.get("user") or {}, "items": items}
+    return [
+        {"issue_id": fields["issue_id"], "issue_key": fields["key"], **t}
+        for t in _extract_transitions({"changelog": {"histories": [history]}})
+    ]
+
+def submit(payload: Dict[str, Any]) -> str:
+    """Buffer one event; returns what happened to it (queued, ignored)."""
+    _counters["received"] += 1
+    event = _event_name(payload)
+    issue = payload.get("issue") or {}
+    if event not in UPSERT_EVENTS + DELETE_EVENTS or not issue.get("id"):
+        _counters["ignored"] += 1
+        return "ignored"
+    issue_id = str(issue["id"])
+    entry = _pending.get(issue_id)
+    if entry is not None:
+        _counters["coalesced"] += 1
+    if event in DELETE_EVENTS:
+        _pending[issue_id] = {"row": None, "transitions": [], "deleted": True}
+    else:
+        fields = _parse_issue_fields(issue)
+        if entry is None or entry["deleted"]:
+            entry = _pending[issue_id] = {"row": None, "transitions": [], "deleted": False}
+        # Deliveries can arrive out of order; keep the freshest field values.
+        old = entry["row"]
+        if old is None or not old["updated"] or not fields["updated"] or _utc_naive(fields["updated"]) >= _utc_naive(old["updated"]):
+            entry["row"] = fields
+        entry["transitions"].extend(_event_transitions(payload, fields))
+    _schedule()
+    return "queued"
+
+def _schedule() -> None:
+    global _flusher
+    if len(_pending) >= max(1, get_settings().jira_webhook_max_batch):
+        _full.set()
+    if _flusher is None or _flusher.done():
+        _flusher = asyncio.create_task(_flush_after_window())
+
+async def _flush_after_window() -> None:
+    try:
+        await asyncio.wait_for(_full.wait(), timeout=max(0.0, get_settings().jira_webhook_batch_ms) / 1000)
+    except asyncio.TimeoutError:
+        pass
+    delay = max(0.05, get_settings().jira_webhook_retry_ms / 1000)
+    while True:
+        try:
+            await flush()
+            break
+        except Exception:
+            # Counted in stats; the batch is back in the buffer. Retry without waiting for
+            # another event to arrive, backing off while the database stays unavailable.
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_SECONDS)
+    if _pending:
+        _schedule()  # events that arrived during the write start the next window
+
+async def flush() -> Dict[str, int]:
+    """Write everything buffered so far in one transaction."""
+    async with _write_lock:
+        _full.clear()
+        batch = dict(_pending)
+        _pending.clear()
+        if not batch:
+            return {}
+        started = time.monotonic()
+        rows = [e["row"] for e in batch.values() if not e["deleted"] and e["row"] is not None]
+        transitions = [t for e in batch.values() if not e["deleted"] for t in e["transitions"]]
+        deleted = [i for i, e in batch.items() if e["deleted"]]
+        try:
+            await _ensure_tables()
+            Session = get_sessionmaker()
+            async with Session() as session:
+                transitions_added = await jira_store.append_transitions(session, transitions)  # before the merge clears content_hash
+                stats = {
+                    "issues": await jira_store.merge_issues(session, rows),
+                    "transitions": transitions_added,
+                    "deleted": await jira_store.delete_issues(session, deleted) if deleted else 0,
+                }
+                await session.commit()
+        except Exception:
+            _counters["errors"] += 1
+            # Put the batch back unless newer events for the same issues arrived meanwhile.
+            for issue_id, entry in batch.items():
+                _pending.setdefault(issue_id, entry)
+            raise
+        _counters["batches"] += 1
+        _counters["issues_written"] += stats["issues"]
+        _counters["issues_deleted"] += stats["deleted"]
+        _counters["transitions_added"] += stats["transitions"]
+        _last_flush.clear()
+        _last_flush.update({**stats, "batch_issues": len(batch), "seconds": round(time.monotonic() - started, 4), "at": datetime.now(timezone.utc).isoformat()})
+        return stats
+
+def stats() -> Dict[str, Any]:
+    s = get_settings()
+    return {"pending": len(_pending), "window_ms": s.jira_webhook_batch_ms, "max_batch": s.jira_webhook_max_batch, **_counters, "last_flush": dict(_last_flush)}
+
+async def shutdown() -> None:
+    """Flush buffered events before the process exits."""
+    if _flusher is not None and not _flusher.done():
+        _flusher.cancel()
+        try:
+            await _flusher
+        except (asyncio.CancelledError, Exception):
+            pass
+    if _pending:
+        await flush()
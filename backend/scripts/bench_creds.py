@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Credential resolution benchmark.
+
+Times jira_creds.load_saved_jira_settings on a throwaway database with the app schema and one
+saved settings row, in three modes: a full schema scan per call (what every /jira/* call did
+before the cache), a re-read of the already-found tables (a cache miss after a settings write),
+and a cached hit. Prints one JSON document with the mean per call in microseconds.
+
+Usage (from the backend root):
+  python3 scripts/bench_creds.py
+  python3 scripts/bench_creds.py --calls 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def run(calls: int) -> dict:
+    sys.path.insert(0, BACKEND_DIR)
+    from app.db.database import get_sessionmaker, init_db
+    from app.db.models import Settings
+    from app.services import jira_creds
+
+    await init_db()
+    Session = get_sessionmaker()
+    async with Session() as session:
+        session.add(Settings(id=1, jira_base_url="https://example.atlassian.net", jira_email="bench@example.com", jira_token_encrypted="bench-token"))
+        await session.commit()
+
+    async def timed(fn) -> float:
+        started = time.perf_counter()
+        for _ in range(calls):
+            await fn()
+        return (time.perf_counter() - started) / calls * 1e6
+
+    async def scan():
+        await jira_creds.load_saved_jira_settings(refresh=True)
+
+    async def reread():
+        jira_creds.invalidate()
+        await jira_creds.load_saved_jira_settings()
+
+    async def hit():
+        await jira_creds.load_saved_jira_settings()
+
+    await jira_creds.warm()
+    return {
+        "calls": calls,
+        "schema_scan_us": round(await timed(scan), 1),
+        "reread_known_tables_us": round(await timed(reread), 1),
+        "cached_hit_us": round(await timed(hit), 2),
+        "cache": jira_creds.cache_stats(),
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--calls", type=int, default=500)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SQLITE_PATH"] = os.path.join(tmp, "bench.db")
+        result = asyncio.run(run(args.calls))
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ingest throughput benchmark.
+
+Drives the real ingest job (fetch, changelog completion, parse, bulk write) against the
+in-process fake Jira site at several sizes and writes one JSON document with issues/sec,
+transitions/sec, peak RSS and final database size per size, plus parse-only rates for
+_parse_issue_fields and _extract_transitions. Each size runs in its own child process
+so peak RSS and the database are not shared between runs.
+
+Usage (from the backend root):
+  python3 scripts/bench_ingest.py                              # 10k, 100k, 1M
+  python3 scripts/bench_ingest.py --sizes 10000 --out bench.json
+  python3 scripts/bench_ingest.py --sizes 100000 --latency-ms 20 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = "10000,100000,1000000"
+
+def peak_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # Linux reports KiB
+
+def db_size_bytes(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal", path + "-shm") if os.path.exists(p))
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip()
+    except Exception:
+        return ""
+
+async def run_one(args: argparse.Namespace, db_path: str) -> Dict[str, Any]:
+    sys.path.insert(0, BACKEND_DIR)
+    from app.services import fake_jira, jira_http, jira_ingest
+    from app.schemas import IngestRequest
+
+    cfg = fake_jira.FakeJiraConfig(
+        issues=args.issues,
+        projects=[p.strip() for p in args.projects.split(",") if p.strip()],
+        latency_ms=args.latency_ms,
+        overflow_every=args.overflow_every,
+    )
+    await jira_http.startup(transport=fake_jira.transport(cfg))
+    try:
+        # Parse-only rates on a fixed sample, isolated from fetch and write costs.
+        site = fake_jira.FakeJiraData(cfg)
+        sample = [site.issue(i, None, True) for i in range(min(2000, args.issues))]
+        sample_size = len(sample)
+        t0 = time.perf_counter()
+        for issue in sample:
+            jira_ingest._parse_issue_fields(issue)
+        parse_fields_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        sample_transitions = sum(len(jira_ingest._extract_transitions(issue)) for issue in sample)
+        extract_s = time.perf_counter() - t0
+        del sample, site
+
+        req = IngestRequest(
+            projects=cfg.projects,
+            updated_window_days=0,
+            max_issues=args.issues,
+            full=True,
+            concurrency=args.concurrency,
+            raw_storage=args.raw_storage,
+            stream=args.stream,
+        )
+        started = time.perf_counter()
+        job = await jira_ingest.create_job(req)
+        await jira_ingest.run_job(job.id, "http://fake-jira", "bench@example.invalid", "bench")
+        wall = time.perf_counter() - started
+        result = jira_ingest.job_to_dict(await jira_ingest.get_job(job.id))
+    finally:
+        await jira_http.shutdown()
+
+    fetched = result["fetched"] or 0
+    transitions = result["transitions_saved"] or 0
+    return {
+        "issues": args.issues,
+        "state": result["state"],
+        "error": result["error"],
+        "wall_seconds": round(wall, 3),
+        "issues_saved": result["issues_saved"],
+        "transitions_saved": transitions,
+        "issues_per_sec": round(fetched / wall, 1) if wall else None,
+        "transitions_per_sec": round(transitions / wall, 1) if wall else None,
+        "pages": result["pages"],
+        "write_seconds": result["write_seconds"],
+        "stages": result["stages"],
+        "rows_per_sec_write": result["rows_per_sec"],
+        "changelogs_completed": result["changelogs_completed"],
+        "changelog_requests": result["changelog_requests"],
+        "parse_fields_per_sec": round(sample_size / parse_fields_s, 1) if parse_fields_s else None,
+        "extract_transitions_per_sec": round(sample_transitions / extract_s, 1) if extract_s else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "db_size_bytes": db_size_bytes(db_path),
+    }
+
+def child_main(args: argparse.Namespace) -> int:
+    db_path = os.environ["SQLITE_PATH"]
+    print(json.dumps(asyncio.run(run_one(args, db_path))))
+    return 0
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark Jira ingest against the in-process fake Jira site.")
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated issue counts (default {DEFAULT_SIZES})")
+    ap.add_argument("--out", default="", help="write JSON here instead of stdout")
+    ap.add_argument("--projects", default="ALPHA,BETA,GAMMA")
+    ap.add_argument("--concurrency", type=int, default=None, help="parallel page fetches (default JIRA_INGEST_CONCURRENCY)")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="simulated Jira latency per request")
+    ap.add_argument("--overflow-every", type=int, default=97, help="every Nth issue has a changelog longer than search embeds")
+    ap.add_argument("--raw-storage", choices=["none", "fields-only", "full"], default=None)
+    ap.add_argument("--stream", dest="stream", action="store_true", default=None)
+    ap.add_argument("--no-stream", dest="stream", action="store_false")
+    ap.add_argument("--keep-db", action="store_true", help="leave each run's database in the temp directory")
+    ap.add_argument("--issues", type=int, default=0, help=argparse.SUPPRESS)  # set for the per-size child
+    args = ap.parse_args()
+
+    if args.issues:
+        return child_main(args)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results: List[Dict[str, Any]] = []
+    workdir = tempfile.mkdtemp(prefix="bench_ingest_")
+    for n in sizes:
+        db_path = os.path.join(workdir, f"bench_{n}.db")
+        env = dict(os.environ)
+        env.update({
+            "SQLITE_PATH": db_path,
+            "JIRA_RATE_LIMIT_RPS": "0",  # the in-process site is not the thing being measured
+            "PYTHONPATH": BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+        })
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--issues", str(n),
+            "--projects", args.projects, "--latency-ms", str(args.latency_ms), "--overflow-every", str(args.overflow_every),
+        ]
+        if args.concurrency:
+            cmd += ["--concurrency", str(args.concurrency)]
+        if args.raw_storage:
+            cmd += ["--raw-storage", args.raw_storage]
+        if args.stream is not None:
+            cmd.append("--stream" if args.stream else "--no-stream")
+        print(f"[bench] {n} issues ...", file=sys.stderr)
+        proc = subprocess.run(cmd, env=env, cwd=BACKEND_DIR, capture_output=True, text=True)
+        if proc.returncode != 0:
+            results.append({"issues": n, "state": "crashed", "error": proc.stderr[-2000:]})
+        else:
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        print(f"[bench] {n} issues: {results[-1].get('issues_per_sec')} issues/s", file=sys.stderr)
+        if not args.keep_db:
+            for p in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(p):
+                    os.remove(p)
+
+    doc = {
+        "benchmark": "ingest",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {k: v for k, v in vars(args).items() if k not in ("issues", "out")},
+        "results": results,
+    }
+    text = json.dumps(doc, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if all(r.get("state") == "succeeded" for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
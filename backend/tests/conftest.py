@@ -0,0 +1,98 @@
+"""Shared fixtures: a fresh database per test and an in-process fake Jira site.
+
+Run from the backend directory with ``python -m pytest``. Async tests use the anyio plugin
+that ships with anyio (already a FastAPI dependency).
+"""
+from pathlib import Path
+import asyncio
+import importlib.util
+import sys
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1]
+REPO = BACKEND.parent
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+from app.core.config import get_settings  # noqa: E402
+from app.db import database  # noqa: E402
+from app.services import fake_jira, jira_creds, jira_http, jira_ingest, jira_webhook  # noqa: E402
+
+BASE = "http://fake-jira.test"
+AUTH = ("fake@example.invalid", "token")
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def db(tmp_path, monkeypatch):
+    """Point the app at an empty SQLite file for one test."""
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "app.db"))
+    for name, value in (("JIRA_BASE_URL", BASE), ("JIRA_EMAIL", AUTH[0]), ("JIRA_API_TOKEN", AUTH[1])):
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("JIRA_RATE_LIMIT_RPS", "0")
+    monkeypatch.setenv("JIRA_RETRY_BASE_DELAY", "0")
+    get_settings.cache_clear()
+    jira_creds.invalidate()
+    database._engine = database._sessionmaker = None
+    await database.init_db()
+    jira_webhook._full = asyncio.Event()  # module-level, would stay bound to an earlier test's loop
+    jira_webhook._last_flush.clear()
+    jira_webhook._counters.update(dict.fromkeys(jira_webhook._counters, 0))
+    yield tmp_path / "app.db"
+    await jira_ingest.stop_workers()
+    if jira_webhook._flusher is not None:
+        jira_webhook._flusher.cancel()
+    jira_webhook._pending.clear()
+    await jira_http.shutdown()
+    await database.get_engine().dispose()
+    database._engine = database._sessionmaker = None
+    get_settings.cache_clear()
+
+@pytest.fixture
+def setenv(db, monkeypatch):
+    """Change a setting for one test: ``setenv("JIRA_PARTITION_MAX_ISSUES", "60")``."""
+    def set_(name: str, value: str) -> None:
+        monkeypatch.setenv(name, value)
+        get_settings.cache_clear()
+    return set_
+
+@pytest.fixture
+def site(db):
+    """Serve a fake Jira site through the shared client: ``cfg = await site(issues=300)``.
+
+    Calling it again swaps the site, e.g. to one where issues were deleted or moved.
+    """
+    async def serve(**kwargs) -> fake_jira.FakeJiraConfig:
+        cfg = fake_jira.FakeJiraConfig(**kwargs)
+        await jira_http.startup(transport=fake_jira.transport(cfg))
+        return cfg
+    return serve
+
+@pytest.fixture(scope="session")
+def reportapp(tmp_path_factory):
+    """The report app at the repo root, loaded as `reportapp` next to the backend's `app` (its
+    imports are all relative), on a database of its own; ./data is created under a tmp dir."""
+    home = tmp_path_factory.mktemp("reportapp")
+    env = {
+        "SQLITE_PATH": str(home / "reports.db"), "APP_SECRET": "test-secret", "PRINT_SETTINGS_ON_STARTUP": "0",
+        "BOOTSTRAP_ADMIN_EMAIL": "admin@example.invalid", "BOOTSTRAP_ADMIN_PASSWORD": "admin",
+        "JIRA_BASE_URL": BASE, "JIRA_EMAIL": AUTH[0], "JIRA_API_TOKEN": AUTH[1],
+        "JIRA_RATE_LIMIT_RPS": "0", "REPORT_CACHE_SIZE": "0",
+    }
+    with pytest.MonkeyPatch.context() as mp:
+        for name, value in env.items():
+            mp.setenv(name, value)
+        mp.chdir(home)
+        spec = importlib.util.spec_from_file_location("reportapp", REPO / "app" / "__init__.py", submodule_search_locations=[str(REPO / "app")])
+        package = importlib.util.module_from_spec(spec)
+        sys.modules["reportapp"] = package
+        spec.loader.exec_module(package)
+        from reportapp import db, effective
+        from reportapp.routers import reports  # noqa: F401  (creates ./data on import)
+    db.init_db()
+    effective.ensure_settings_row()
+    yield package
+    for name in [m for m in sys.modules if m == "reportapp" or m.startswith("reportapp.")]:
+        del sys.modules[name]
@@ -0,0 +1,19 @@
+"""The benchmark scripts at their smallest size, so they keep working as the ingest changes."""
+import json
+import subprocess
+import sys
+from conftest import BACKEND
+
+def test_ingest_benchmark_runs_end_to_end(tmp_path):
+    out = tmp_path / "bench.json"
+    proc = subprocess.run(
+        [sys.executable, str(BACKEND / "scripts" / "bench_ingest.py"), "--sizes", "150,300", "--overflow-every", "20", "--out", str(out)],
+        cwd=BACKEND, capture_output=True, text=True, timeout=300,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    doc = json.loads(out.read_text())
+    assert doc["benchmark"] == "ingest" and [r["issues"] for r in doc["results"]] == [150, 300]
+    for result in doc["results"]:
+        assert result["state"] == "succeeded" and result["issues_saved"] == result["issues"]
+        assert result["changelogs_completed"] > 0 and result["transitions_saved"] > 0
+        assert result["issues_per_sec"] > 0 and result["peak_rss_bytes"] > 0 and result["db_size_bytes"] > 0
@@ -0,0 +1,40 @@
+"""The report app's time-in-status column plan."""
+import pytest
+
+CATALOG = {"To Do": "To Do", "In Progress": "In Progress", "In Review": "In Progress", "Blocked": "In Progress", "Done": "Done"}
+
+@pytest.fixture
+def buckets(reportapp):
+    from reportapp.services import buckets
+    return buckets
+
+def totals(plan, intervals):
+    acc = []
+    for status, seconds in intervals:
+        plan.add(acc, status, seconds)
+    slots = plan.output_columns()
+    return dict(zip(plan.header(slots), (acc[c] if c < len(acc) else 0 for c in slots)))
+
+INTERVALS = [("To Do", 100), ("In Progress", 200), ("In Review", 40), ("In Progress", 60), ("Blocked", 7), ("Done", 1)]
+
+def test_one_pass_fills_status_and_category_columns(buckets):
+    assert totals(buckets.BucketPlan("both", CATALOG), INTERVALS) == {
+        "hours_status_Blocked": 7, "hours_status_Done": 1, "hours_status_In Progress": 260, "hours_status_In Review": 40, "hours_status_To Do": 100,
+        "hours_category_Done": 1, "hours_category_In Progress": 307, "hours_category_To Do": 100,
+    }
+    assert set(totals(buckets.BucketPlan("category", CATALOG), INTERVALS)) == {"hours_category_Done", "hours_category_In Progress", "hours_category_To Do"}
+
+def test_custom_buckets_match_status_then_category(buckets):
+    plan = buckets.BucketPlan("custom", CATALOG, {" blocked ": "Waiting", "in review": "Waiting", "In Progress": "Active", "empty": "Never", "To Do": " "})
+    # Status names win over categories (Blocked and In Review are In Progress too), case and
+    # padding are ignored, a blank bucket is dropped and declared buckets keep their order.
+    assert totals(plan, INTERVALS + [("Unknown", 5)]) == {"hours_bucket_Waiting": 47, "hours_bucket_Active": 260, "hours_bucket_Never": 0, "hours_bucket_Unmapped": 106}
+
+def test_status_columns_limited_to_the_reported_statuses(buckets):
+    plan = buckets.BucketPlan("both", CATALOG)
+    slots = plan.output_columns(["Done", "To Do"])
+    assert plan.header(slots) == ["hours_status_Done", "hours_status_To Do", "hours_category_Done", "hours_category_In Progress", "hours_category_To Do"]
+
+def test_statuses_outside_the_catalog_are_uncategorized(buckets):
+    plan = buckets.BucketPlan("category", {})
+    assert totals(plan, [("Triage", 9)]) == {"hours_category_Uncategorized": 9}
@@ -0,0 +1,55 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import httpx
+import pytest
+from app.services import fake_jira
+from conftest import AUTH
+
+pytestmark = pytest.mark.anyio
+
+def _client(**kwargs) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=fake_jira.transport(fake_jira.FakeJiraConfig(**kwargs)), base_url="http://fake")
+
+async def test_search_clamps_max_results_and_pages_the_whole_set():
+    async with _client(issues=90, max_results=40) as c:
+        keys, start_at = [], 0
+        while True:
+            page = (await c.get("/rest/api/3/search", params={"jql": "project = ALPHA order by key", "startAt": start_at, "maxResults": 100}, auth=AUTH)).json()
+            assert page["maxResults"] == 40 and page["total"] == 30
+            keys += [i["key"] for i in page["issues"]]
+            start_at += len(page["issues"])
+            if not page["issues"] or start_at >= page["total"]:
+                break
+    assert len(keys) == len(set(keys)) == 30
+    assert all(k.startswith("ALPHA-") for k in keys)
+
+async def test_embedded_changelog_is_truncated_and_pages_separately():
+    async with _client(issues=10, overflow_every=5, changelog_embed=20) as c:
+        issue = (await c.get("/rest/api/3/search", params={"jql": "key = BETA-2", "expand": "changelog"}, auth=AUTH)).json()["issues"][0]
+        log = issue["changelog"]
+        assert log["total"] > 20 and len(log["histories"]) == 20
+        page = (await c.get(f"/rest/api/3/issue/{issue['key']}/changelog", params={"maxResults": 100}, auth=AUTH)).json()
+        assert page["total"] == log["total"] and len(page["values"]) == log["total"]
+
+async def test_updated_filter_and_projection():
+    cfg = fake_jira.FakeJiraConfig(issues=300, anchor="2026-01-01", user_timezone="Asia/Tokyo")
+    data = fake_jira.FakeJiraData(cfg)
+    bound = datetime(2025, 12, 1, tzinfo=ZoneInfo("Asia/Tokyo")).timestamp()  # absolute dates read in the user's zone
+    expected = sorted(data.key_of(i) for i in range(cfg.issues) if data.updated_ts(i) >= bound)
+    async with httpx.AsyncClient(transport=fake_jira.transport(cfg), base_url="http://fake") as c:
+        page = (await c.get("/rest/api/3/search", params={"jql": 'updated >= "2025-12-01 00:00"', "fields": "updated", "maxResults": 100}, auth=AUTH)).json()
+    assert 0 < page["total"] < cfg.issues
+    assert sorted(i["key"] for i in page["issues"]) == expected
+    assert all(set(i["fields"]) == {"updated"} for i in page["issues"])
+
+async def test_requires_auth_and_injects_rate_limits():
+    async with _client(issues=10, rate_limit_rate=1.0, retry_after=3) as c:
+        assert (await c.get("/rest/api/3/myself")).status_code == 401
+        r = await c.get("/rest/api/3/myself", auth=AUTH)
+        assert r.status_code == 429 and r.headers["Retry-After"] == "3"
+
+def test_app_is_built_on_first_access(monkeypatch):
+    monkeypatch.setenv("FAKE_JIRA_ISSUES", "42")
+    monkeypatch.setattr(fake_jira, "_app", None)
+    assert fake_jira.app.state.data.cfg.issues == 42
+    assert fake_jira.app is fake_jira.app
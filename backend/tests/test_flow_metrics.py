@@ -0,0 +1,105 @@
+"""The report app's array-based flow metrics, checked against a plain per-issue computation."""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+import math
+import random
+import pytest
+
+@pytest.fixture
+def fm(reportapp):
+    from reportapp.services import flow_metrics
+    return flow_metrics
+
+def synthetic(fm, seed: int = 3, issues: int = 400):
+    """A collector filled with random issues, and the same issues as plain lists."""
+    rng = random.Random(seed)
+    collector = fm.FlowCollector()
+    plain = []
+    for _ in range(issues):
+        project, kind, status = rng.choice("PQR"), rng.choice(["Story", "Bug", "Task"]), rng.choice(["In Dev", "Review", "QA", "Done"])
+        i = collector.issue(project, kind, status)
+        at = 1_750_000_000 + rng.randrange(0, 120 * 86400)
+        intervals = []
+        for _ in range(rng.randint(0, 6)):
+            secs24 = rng.randrange(60, 9 * 86400)
+            interval = (rng.choice([fm.TODO, fm.IN_PROGRESS, fm.IN_PROGRESS, fm.DONE]), float(at), secs24 // 3, secs24)
+            collector.interval(i, *interval)
+            intervals.append(interval)
+            at += secs24
+        plain.append((project, kind, status, intervals))
+    return collector, plain
+
+def flow(fm, plain, business_hours: bool):
+    """Per issue (finished, wip, elapsed seconds), one issue at a time."""
+    out = []
+    for _, _, _, intervals in plain:
+        started = next((entered for cat, entered, _, _ in intervals if cat == fm.IN_PROGRESS), None)
+        last = intervals[-1][0] if intervals else None
+        finished = intervals[-1][1] if last == fm.DONE else None
+        wip = last == fm.IN_PROGRESS and started is not None
+        elapsed = None
+        if started is not None and (finished is not None or wip):
+            end = finished if finished is not None else math.inf
+            elapsed = sum(bh if business_hours else s24 for _, entered, bh, s24 in intervals if started <= entered < end)
+        out.append((finished, wip, elapsed))
+    return out
+
+def percentile(values, p):
+    k = (len(values) - 1) * p / 100
+    lo, hi = math.floor(k), min(math.floor(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def grouped(pairs, labels):
+    """[(label, sorted values)] for "All" and then each label in first-seen order, skipping empty ones."""
+    groups = defaultdict(list)
+    for label, value in pairs:
+        groups[label].append(value)
+    return [(name, sorted(values)) for name, values in [("All", [v for _, v in pairs])] + [(l, groups[l]) for l in labels] if values]
+
+@pytest.mark.parametrize("business_hours", [True, False])
+def test_cycle_time_matches_a_per_issue_computation(fm, business_hours):
+    collector, plain = synthetic(fm)
+    basis = "business_hours" if business_hours else "24x7"
+    done = [(kind, elapsed / 3600) for (_, kind, _, _), (finished, _, elapsed) in zip(plain, flow(fm, plain, business_hours)) if finished is not None and elapsed is not None]
+    expected = [
+        [0, name, len(v), round(sum(v) / len(v), 2)] + [round(percentile(v, p), 2) for p in fm.PERCENTILES] + [round(v[-1], 2), basis]
+        for name, v in grouped(done, collector.types.labels())
+    ]
+    rows = collector.rows("cycle_time", 0, business_hours)
+    assert rows[0] == fm.CYCLE_TIME_COLS and rows[1:] == expected and len(expected) == 4
+
+def test_aging_wip_matches_a_per_issue_computation(fm):
+    collector, plain = synthetic(fm, seed=11)
+    wip = [(status, elapsed / 3600) for (_, _, status, _), (_, is_wip, elapsed) in zip(plain, flow(fm, plain, True)) if is_wip]
+    expected = []
+    for name, v in grouped(wip, collector.statuses.labels()):
+        bins = [0] * (len(fm.AGE_BINS_DAYS) + 1)
+        for hours in v:
+            bins[bisect_right(fm.AGE_BINS_DAYS, hours / 24)] += 1
+        expected.append([0, name, len(v), round(percentile(v, 50), 2), round(percentile(v, 85), 2), round(v[-1], 2)] + bins + ["business_hours"])
+    assert collector.rows("aging_wip", 0, True)[1:] == expected
+
+def test_throughput_counts_every_week_per_project(fm):
+    collector, plain = synthetic(fm, seed=5)
+    weeks = defaultdict(int)
+    for (project, _, _, _), (finished, _, _) in zip(plain, flow(fm, plain, False)):
+        if finished is not None:
+            day = datetime.fromtimestamp(finished, tz=timezone.utc)
+            monday = datetime.fromtimestamp(finished - day.weekday() * 86400, tz=timezone.utc).date()
+            weeks[(project, monday.isoformat())] += 1
+    rows = collector.rows("throughput", 0, True)[1:]
+    assert {(p, w): c for _, p, w, c in rows if c} == dict(weeks)
+    # Each project lists every week from the first completion to the last, zeros included.
+    first, last = (date.fromisoformat(w) for w in (min(w for _, w in weeks), max(w for _, w in weeks)))
+    span = [(first + timedelta(weeks=k)).isoformat() for k in range((last - first).days // 7 + 1)]
+    for project in {p for p, _ in weeks}:
+        assert [w for _, p, w, _ in rows if p == project] == span
+
+def test_issues_without_history(fm):
+    collector = fm.FlowCollector()
+    for report in fm.REPORTS:
+        assert collector.rows(report, 0, True) == [fm.COLUMNS[report]]
+    collector.issue("P", "Story", "To Do")  # never moved, so no intervals
+    for report in fm.REPORTS:
+        assert collector.rows(report, 0, True) == [fm.COLUMNS[report]]
@@ -0,0 +1,229 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+from zoneinfo import ZoneInfo
+import httpx
+from sqlalchemy import func, select, update
+import pytest
+from app.db.database import get_sessionmaker
+from app.db.jira_models import JiraIssue, JiraIssueBlob, JiraSyncCursor, JiraTransition
+from app.schemas import IngestRequest
+from app.services import fake_jira, jira_http, jira_ingest, jira_store
+from conftest import AUTH, BASE
+
+pytestmark = pytest.mark.anyio
+
+async def ingest(**kwargs) -> dict:
+    job = await jira_ingest.create_job(IngestRequest(**kwargs), BASE)
+    await jira_ingest.run_job(job.id, BASE, *AUTH)
+    return jira_ingest.job_to_dict(await jira_ingest.get_job(job.id))
+
+async def stored(project: str = None) -> tuple:
+    """(issues, transitions) in the local tables, optionally for one project."""
+    Session = get_sessionmaker()
+    async with Session() as session:
+        issues = select(func.count()).select_from(JiraIssue)
+        transitions = select(func.count()).select_from(JiraTransition).join(JiraIssue, JiraIssue.issue_id == JiraTransition.issue_id)
+        if project:
+            issues = issues.where(JiraIssue.project_key == project)
+            transitions = transitions.where(JiraIssue.project_key == project)
+        return (await session.execute(issues)).scalar(), (await session.execute(transitions)).scalar()
+
+def expected(cfg: fake_jira.FakeJiraConfig, project: str, since: float = 0.0) -> tuple:
+    """(issues, transitions) the fake site holds for `project`, updated at or after `since`."""
+    data = fake_jira.FakeJiraData(cfg)
+    idx = [i for i in range(cfg.issues) if data.project_of(i)[1] == project and data.updated_ts(i) >= since]
+    return len(idx), sum(len(data.histories(i)) for i in idx)
+
+async def test_full_ingest_stores_every_issue_and_transition(site):
+    cfg = await site(issues=600, max_results=40, overflow_every=25, changelog_embed=10)
+    job = await ingest(projects=["ALPHA"], updated_window_days=0, full=True, concurrency=4)
+    issues, transitions = expected(cfg, "ALPHA")
+    assert job["state"] == "succeeded" and job["mode"] == "full"
+    assert job["fetched"] == job["issues_saved"] == job["total_reported_by_jira"] == issues
+    assert job["transitions_saved"] == transitions
+    assert job["changelog_requests"] > 0  # truncated changelogs were paged in full
+    assert await stored("ALPHA") == (issues, transitions)
+    assert await stored() == (issues, transitions)
+
+async def test_max_issues_caps_the_ingest(site):
+    await site(issues=600, max_results=40)
+    job = await ingest(projects=["ALPHA"], updated_window_days=0, full=True, max_issues=50, concurrency=4)
+    assert job["fetched"] == 50
+    assert (await stored())[0] == 50
+
+async def test_max_issues_is_shared_by_partitions_smaller_than_a_page(site):
+    await site(issues=150)  # 50 per project, so each partition's first request over-reserves
+    job = await ingest(projects=["ALPHA", "BETA", "GAMMA"], updated_window_days=0, full=True, max_issues=120)
+    assert job["fetched"] == job["issues_saved"] == 120
+    assert all(p["fetched"] for p in job["partitions"])
+    assert any(p["state"] == "truncated" for p in job["partitions"])
+
+class SlowSearches(httpx.AsyncBaseTransport):
+    """The fake site, with searches for `projects` answered `delay` seconds late."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, projects: list, delay: float):
+        self.inner = inner
+        self.projects = projects
+        self.delay = delay
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/search") and any(p in request.url.params.get("jql", "") for p in self.projects):
+            await asyncio.sleep(self.delay)
+        return await self.inner.handle_async_request(request)
+
+@pytest.mark.parametrize("issues, slow, max_issues, concurrency, state", [
+    (600, ["NOPE"], 250, 1, "succeeded"),
+    (1500, ["NOPE"], 350, 1, "truncated"),
+    (1500, ["NOPE", "NADA"], 550, 4, "succeeded"),  # more budget comes back than the rest of the page needs
+])
+async def test_a_partly_granted_page_is_fetched_in_full(db, issues, slow, max_issues, concurrency, state):
+    # The slow, empty projects hold a page of budget each while they wait, so one of ALPHA's
+    # pages is granted only in part; the rest must still be fetched, without overlapping the
+    # next page, once their reservations come back.
+    await jira_http.startup(transport=SlowSearches(fake_jira.transport(fake_jira.FakeJiraConfig(issues=issues)), slow, 0.3))
+    job = await ingest(projects=["ALPHA", *slow], updated_window_days=0, full=True, max_issues=max_issues, concurrency=concurrency)
+    alpha = next(p for p in job["partitions"] if p["key"] == "ALPHA")
+    fetched = min(issues // 3, max_issues)
+    assert job["fetched"] == alpha["fetched"] == fetched
+    assert (alpha["state"], alpha["start_at"], alpha["total_reported_by_jira"]) == (state, fetched, issues // 3)
+    assert (await stored("ALPHA"))[0] == fetched
+
+async def test_delta_ingest_reads_only_what_changed_since_the_cursor(site, setenv):
+    setenv("JIRA_SYNC_OVERLAP_MINUTES", "0")
+    cfg = await site(issues=600, max_results=40)
+    full = await ingest(projects=["ALPHA"], updated_window_days=0, concurrency=4)
+    assert full["mode"] == "full"  # no cursor yet
+    # Pretend the last sync was ten days before the newest issue.
+    rewound = datetime.fromisoformat(full["cursor"].rstrip("Z")) - timedelta(days=10)
+    Session = get_sessionmaker()
+    async with Session() as session:
+        await session.execute(update(JiraSyncCursor).values(high_water=rewound))
+        await session.commit()
+    delta = await ingest(projects=["ALPHA"], updated_window_days=0, concurrency=4)
+    since = rewound.replace(tzinfo=timezone.utc).timestamp()
+    assert delta["mode"] == "delta" and delta["since"] == rewound.isoformat() + "Z"
+    assert expected(cfg, "ALPHA", since)[0] <= delta["fetched"] < full["fetched"]
+    # Nothing changed on the site, so every fetched issue is skipped by its content hash.
+    assert delta["issues_saved"] == delta["transitions_saved"] == 0
+    assert delta["issues_unchanged"] == delta["fetched"]
+    assert delta["cursor"] == full["cursor"]
+    assert await stored() == expected(cfg, "ALPHA")
+
+async def test_delta_window_is_fixed_when_the_job_starts(site, setenv, monkeypatch):
+    setenv("JIRA_SYNC_OVERLAP_MINUTES", "0")
+    cfg = await site(issues=3000, user_timezone="America/Los_Angeles")
+    full = await ingest(projects=["ALPHA"], updated_window_days=0)
+    rewound = datetime.fromisoformat(full["cursor"].rstrip("Z")) - timedelta(days=10)
+    Session = get_sessionmaker()
+    async with Session() as session:
+        await session.execute(update(JiraSyncCursor).values(high_water=rewound))
+        await session.commit()
+    # The job is planned two days before a worker gets to it.
+    now = jira_ingest._now()
+    monkeypatch.setattr(jira_ingest, "_now", lambda: now - timedelta(days=2))
+    job = await jira_ingest.create_job(IngestRequest(projects=["ALPHA"], updated_window_days=0), BASE)
+    monkeypatch.setattr(jira_ingest, "_now", lambda: now)
+    await jira_ingest.run_job(job.id, BASE, *AUTH)
+    delta = jira_ingest.job_to_dict(await jira_ingest.get_job(job.id))
+    since = rewound.replace(tzinfo=timezone.utc).timestamp()
+    assert expected(cfg, "ALPHA", since)[0] > expected(cfg, "ALPHA", since + 2 * 86400)[0]  # the test can tell
+    assert delta["mode"] == "delta" and delta["fetched"] >= expected(cfg, "ALPHA", since)[0]
+    # The cursor as an absolute date, written in the Jira user's time zone.
+    bound = rewound.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(cfg.user_timezone))
+    assert delta["partitions"][0]["jql"] == f'project in (ALPHA) and updated >= "{bound:%Y-%m-%d %H:%M}" order by updated desc'
+
+async def test_full_flag_ignores_the_cursor(site):
+    await site(issues=300)
+    await ingest(projects=["ALPHA"], updated_window_days=0)
+    again = await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    assert again["mode"] == "full" and again["fetched"] == 100
+
+async def test_partitioned_ingest_splits_projects_and_date_slices(site, setenv):
+    setenv("JIRA_PARTITION_MAX_ISSUES", "60")
+    cfg = await site(issues=900, max_results=40, user_timezone="America/Los_Angeles")
+    job = await ingest(projects=["ALPHA", "BETA", "GAMMA"], updated_window_days=400, full=True, concurrency=6)
+    parts = job["partitions"]
+    assert job["state"] == "succeeded"
+    assert {p["key"].split("#")[0] for p in parts} == {"ALPHA", "BETA", "GAMMA"}
+    assert len(parts) == 3 * 5 and all(p["state"] == "succeeded" for p in parts)  # 300 issues per project / 60
+    assert job["jql"] is None and set(job["partition_jql"]) == {p["key"] for p in parts}
+    totals = [expected(cfg, project) for project in cfg.projects]
+    issues, transitions = sum(t[0] for t in totals), sum(t[1] for t in totals)
+    # Slices meet without gaps or overlaps: each issue is fetched by exactly one partition.
+    assert sum(p["fetched"] for p in parts) == job["fetched"] == issues
+    assert job["transitions_saved"] == transitions
+    assert await stored() == (issues, transitions)
+    for project, counts in zip(cfg.projects, totals):
+        assert await stored(project) == counts
+
+async def test_slice_bounds_follow_the_jira_users_time_zone(site, setenv):
+    setenv("JIRA_PARTITION_MAX_ISSUES", "20")
+    cfg = await site(issues=900, span_days=30, user_timezone="Asia/Kolkata")
+    started = datetime.now(timezone.utc).timestamp()
+    job = await ingest(projects=["ALPHA"], updated_window_days=10, full=True)
+    assert len(job["partitions"]) > 1
+    # The window starts ten days before the run (to the minute); a bound written in UTC but
+    # read as IST would start it 5.5 hours early and pull in the issues updated in between.
+    lo = started - 10 * 86400
+    data = fake_jira.FakeJiraData(cfg)
+    alpha = [i for i in range(cfg.issues) if data.project_of(i)[1] == "ALPHA"]
+    inside = sum(1 for i in alpha if data.updated_ts(i) >= lo)
+    edge = sum(1 for i in alpha if lo - 120 <= data.updated_ts(i) < lo)
+    assert sum(1 for i in alpha if lo - 6 * 3600 <= data.updated_ts(i) < lo - 120) > 0  # the test can tell
+    assert inside <= job["fetched"] <= inside + edge
+
+class Recording(httpx.AsyncBaseTransport):
+    """Passes requests through to `inner` and keeps their URLs."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+        self.urls = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.urls.append(request.url)
+        return await self.inner.handle_async_request(request)
+
+async def test_search_requests_only_the_parsed_fields(db):
+    recording = Recording(fake_jira.transport(fake_jira.FakeJiraConfig(issues=120, max_results=10)))
+    await jira_http.startup(transport=recording)
+    job = await ingest(projects=["ALPHA"], updated_window_days=0, full=True, fields=["customfield_10014", "summary"])
+    assert job["fetched"] == 40
+    pages = [u for u in recording.urls if u.path.endswith("/search") and u.params.get("maxResults") != "0"]
+    assert len(pages) >= 4
+    for url in pages:
+        assert url.params["fields"].split(",") == jira_ingest.INGEST_FIELDS + ["customfield_10014"]
+
+@pytest.mark.parametrize("mode", jira_ingest.RAW_STORAGE_MODES)
+async def test_raw_storage_modes(site, mode):
+    await site(issues=30)
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True, raw_storage=mode)
+    Session = get_sessionmaker()
+    async with Session() as session:
+        payload = await jira_store.read_raw_payload(session, "100000")
+        blobs = (await session.execute(select(func.count()).select_from(JiraIssueBlob))).scalar()
+    if mode == "none":
+        assert payload is None and blobs == 0
+    else:
+        assert payload["key"] == "ALPHA-1" and payload["fields"]["summary"] and blobs == 10
+        assert ("changelog" in payload) == (mode == "full")
+    # Changing the mode rewrites every row once, even though the issues did not change.
+    switched = await ingest(projects=["ALPHA"], updated_window_days=0, full=True, raw_storage="none" if mode != "none" else "full")
+    assert switched["issues_saved"] == 10 and switched["issues_unchanged"] == 0
+
+async def test_truncated_changelogs_are_completed_page_by_page(site):
+    cfg = await site(issues=300, overflow_every=7, changelog_embed=5, max_results=20)
+    job = await ingest(projects=["ALPHA"], updated_window_days=0, full=True, concurrency=4)
+    data = fake_jira.FakeJiraData(cfg)
+    alpha = [i for i in range(cfg.issues) if data.project_of(i)[1] == "ALPHA"]
+    truncated = [i for i in alpha if len(data.histories(i)) > cfg.changelog_embed]
+    assert truncated and job["changelogs_completed"] == len(truncated)
+    assert job["changelog_requests"] == sum(-(-len(data.histories(i)) // cfg.max_results) for i in truncated)
+    assert await stored() == expected(cfg, "ALPHA")
+    longest = max(truncated, key=lambda i: len(data.histories(i)))
+    Session = get_sessionmaker()
+    async with Session() as session:
+        rows = (await session.execute(
+            select(JiraTransition.to_status).where(JiraTransition.issue_id == str(100000 + longest)).order_by(JiraTransition.when)
+        )).scalars().all()
+    assert len(rows) == len(data.histories(longest)) > cfg.max_results
+    assert rows == [h["items"][0]["toString"] for h in data.histories(longest)]
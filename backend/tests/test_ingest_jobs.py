@@ -0,0 +1,61 @@
+from fastapi import HTTPException
+import pytest
+from app.api import jira as jira_api
+from app.schemas import IngestRequest
+from app.services import jira_ingest
+from conftest import AUTH, BASE
+from test_ingest import expected, stored
+
+pytestmark = pytest.mark.anyio
+
+async def failed_job(site) -> int:
+    """A job that stopped part-way through on an injected Jira error."""
+    await site(issues=600, max_results=20, error_rate=0.08)
+    job = await jira_ingest.create_job(IngestRequest(projects=["ALPHA"], updated_window_days=0, full=True, concurrency=1), BASE)
+    await jira_ingest.run_job(job.id, BASE, *AUTH)
+    return job.id
+
+async def test_resume_continues_from_the_last_committed_page(site):
+    job_id = await failed_job(site)
+    first = jira_ingest.job_to_dict(await jira_ingest.get_job(job_id))
+    assert first["state"] == "failed" and 0 < first["fetched"] < 200
+    cfg = await site(issues=600, max_results=20)  # same data, no faults
+    resumed = await jira_api.ingest_resume(job_id, None, None, None, None)
+    assert resumed["state"] == "queued"
+    await jira_ingest._queue.join()
+    job = jira_ingest.job_to_dict(await jira_ingest.get_job(job_id))
+    assert job["state"] == "succeeded" and job["attempts"] == 2
+    # Committed pages are not fetched again: totals add up exactly across both attempts.
+    assert job["fetched"] == 200 and job["pages"] == 10
+    assert await stored() == expected(cfg, "ALPHA")
+
+async def test_a_job_is_queued_once_however_often_it_is_resumed(site):
+    job_id = await failed_job(site)
+    await site(issues=600, max_results=20)
+    await jira_api.ingest_resume(job_id, None, None, None, None)
+    with pytest.raises(HTTPException) as err:
+        await jira_api.ingest_resume(job_id, None, None, None, None)
+    assert err.value.status_code == 409
+    assert not await jira_ingest.claim(job_id, ("failed", "interrupted"))
+    jira_ingest.enqueue(job_id, BASE, *AUTH)  # a stray duplicate queue entry
+    await jira_ingest._queue.join()
+    job = await jira_ingest.get_job(job_id)
+    assert job.state == "succeeded" and job.attempts == 2
+
+async def test_resume_refuses_another_site(site):
+    job_id = await failed_job(site)
+    with pytest.raises(HTTPException) as err:
+        await jira_api.ingest_resume(job_id, "http://elsewhere.test", *AUTH, None)
+    assert err.value.status_code == 409
+    assert (await jira_ingest.get_job(job_id)).state == "failed"
+
+async def test_startup_resumes_interrupted_jobs_of_the_saved_site_only(site):
+    await site(issues=300)
+    ours = await jira_ingest.create_job(IngestRequest(projects=["ALPHA"], updated_window_days=0), BASE)
+    theirs = await jira_ingest.create_job(IngestRequest(projects=["BETA"], updated_window_days=0), "http://elsewhere.test")
+    for job in (ours, theirs):
+        await jira_ingest._set_state(job.id, "running")  # left running by a process that died
+    await jira_api.resume_ingest_jobs()
+    await jira_ingest._queue.join()
+    assert (await jira_ingest.get_job(ours.id)).state == "succeeded"
+    assert (await jira_ingest.get_job(theirs.id)).state == "interrupted"
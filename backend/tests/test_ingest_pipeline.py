@@ -0,0 +1,63 @@
+import asyncio
+import httpx
+import pytest
+from app.services import fake_jira, jira_http, jira_ingest
+from test_ingest import expected, ingest, stored
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Slows the writer down and records, per write transaction, its items and the queue behind it."""
+    seen = []
+    write_batch = jira_ingest._write_batch
+
+    async def slow(ctx, items):
+        seen.append((len(items), ctx.queue.qsize()))
+        await asyncio.sleep(0.02)
+        await write_batch(ctx, items)
+    monkeypatch.setattr(jira_ingest, "_write_batch", slow)
+    return seen
+
+async def test_slow_writer_holds_back_the_fetchers(site, setenv, writes):
+    setenv("JIRA_INGEST_QUEUE_PAGES", "2")
+    setenv("JIRA_INGEST_WRITE_BATCH", "1")
+    cfg = await site(issues=600, max_results=10)
+    job = await ingest(projects=["ALPHA", "BETA"], updated_window_days=0, full=True, concurrency=6)
+    assert job["state"] == "succeeded" and job["pages"] == 40
+    assert max(queued for _, queued in writes) <= 2  # parsed pages never pile up past the bound
+    assert job["stages"]["queue_wait_seconds"] > 0
+    assert await stored() == tuple(map(sum, zip(expected(cfg, "ALPHA"), expected(cfg, "BETA"))))
+
+async def test_queued_pages_share_a_transaction(site, setenv, writes):
+    setenv("JIRA_INGEST_WRITE_BATCH", "4")
+    await site(issues=300, max_results=10)
+    job = await ingest(projects=["ALPHA"], updated_window_days=0, full=True, concurrency=4)
+    assert job["state"] == "succeeded" and job["pages"] == 10
+    sizes = [n for n, _ in writes]
+    assert sum(sizes) == 10 + 1 and max(sizes) == 4  # ten pages and the partition's finish
+    assert len(writes) < 11
+
+class FailingPages(httpx.AsyncBaseTransport):
+    """The fake site, except that ALPHA search pages from `start_at` on answer 500."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, start_at: int):
+        self.inner = inner
+        self.start_at = start_at
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if request.url.path.endswith("/search") and "ALPHA" in params.get("jql", "") and int(params.get("startAt") or 0) >= self.start_at:
+            return httpx.Response(500, json={"errorMessages": ["Injected 500"]})
+        return await self.inner.handle_async_request(request)
+
+async def test_a_failing_partition_keeps_what_was_committed(db):
+    cfg = fake_jira.FakeJiraConfig(issues=300, max_results=20)
+    await jira_http.startup(transport=FailingPages(fake_jira.transport(cfg), 60))
+    job = await ingest(projects=["ALPHA", "BETA"], updated_window_days=0, full=True, concurrency=1)
+    parts = {p["key"]: p for p in job["partitions"]}
+    assert job["state"] == "failed" and "500" in job["error"]
+    assert parts["ALPHA"]["state"] == "failed" and parts["ALPHA"]["start_at"] == 60
+    assert (await stored("ALPHA"))[0] == 60
+    assert parts["BETA"]["state"] in ("succeeded", "interrupted")
+    assert (await stored("BETA"))[0] == parts["BETA"]["start_at"]
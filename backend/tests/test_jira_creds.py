@@ -0,0 +1,58 @@
+from sqlalchemy import text
+import pytest
+from app.db.database import get_sessionmaker
+from app.db.models import Settings
+from app.services import jira_creds
+from test_jira_store import Statements
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def saved(db, monkeypatch):
+    """One saved settings row; returns a helper that edits it."""
+    monkeypatch.setattr(jira_creds, "_tables", None)
+    monkeypatch.setattr(jira_creds, "_counters", dict.fromkeys(jira_creds._counters, 0))
+
+    async def edit(sql: str, **params) -> None:
+        Session = get_sessionmaker()
+        async with Session() as session:
+            await session.execute(text(sql), params)
+            await session.commit()
+    Session = get_sessionmaker()
+    async with Session() as session:
+        session.add(Settings(id=1, jira_base_url="https://one.example", jira_email="a@example.invalid", jira_token_encrypted="tok-1"))
+        await session.commit()
+    return edit
+
+async def test_repeated_lookups_touch_no_tables(saved):
+    await jira_creds.warm()
+    with Statements() as sql:
+        for _ in range(20):
+            base, email, token, _ = await jira_creds.load_saved_jira_settings()
+    assert (base, email, token) == ("https://one.example", "a@example.invalid", "tok-1")
+    assert sql.count == 0
+    assert {k: jira_creds.cache_stats()[k] for k in ("hits", "misses", "scans")} == {"hits": 20, "misses": 1, "scans": 1}
+
+async def test_a_settings_write_is_read_back_without_a_schema_scan(saved):
+    await jira_creds.warm()
+    await saved("UPDATE settings SET jira_base_url = 'https://two.example' WHERE id = 1")
+    assert (await jira_creds.load_saved_jira_settings())[0] == "https://one.example"  # written outside the app
+    jira_creds.invalidate()
+    with Statements() as sql:
+        assert (await jira_creds.load_saved_jira_settings())[0] == "https://two.example"
+    assert 0 < sql.count <= len(jira_creds.cache_stats()["tables"])  # one SELECT per known table, no PRAGMAs
+    assert jira_creds.cache_stats()["scans"] == 1
+
+async def test_ttl_picks_up_edits_made_outside_the_app(saved, setenv):
+    setenv("JIRA_CREDS_CACHE_TTL", "0")
+    await jira_creds.warm()
+    await saved("UPDATE settings SET jira_email = 'b@example.invalid' WHERE id = 1")
+    assert (await jira_creds.load_saved_jira_settings())[1] == "b@example.invalid"
+
+@pytest.mark.skipif(not jira_creds.HAVE_CRYPTO, reason="cryptography not installed")
+async def test_encrypted_tokens_are_decrypted(saved, setenv):
+    setenv("APP_SECRET", "s3cret")
+    token = jira_creds.fernet_from_secret("s3cret").encrypt(b"plain-token").decode()
+    await saved("UPDATE settings SET jira_token_encrypted = :t WHERE id = 1", t=token)
+    jira_creds.invalidate()
+    assert (await jira_creds.load_saved_jira_settings())[2] == "plain-token"
@@ -0,0 +1,49 @@
+import socket
+import threading
+import pytest
+import uvicorn
+from app.schemas import IngestRequest
+from app.services import fake_jira, jira_http, jira_ingest
+from conftest import AUTH
+from test_ingest import expected
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def server():
+    """The fake site on a real localhost port, so connections are actually opened and pooled."""
+    cfg = fake_jira.FakeJiraConfig(issues=900, max_results=25, latency_ms=5)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    srv = uvicorn.Server(uvicorn.Config(fake_jira.create_app(cfg), log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=srv.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    yield cfg, "http://127.0.0.1:%d" % sock.getsockname()[1]
+    srv.should_exit = True
+    thread.join(5)
+    sock.close()
+
+async def test_ingest_reuses_a_bounded_pool(server, setenv):
+    cfg, url = server
+    setenv("JIRA_HTTP_MAX_CONNECTIONS", "3")
+    setenv("JIRA_HTTP_MAX_KEEPALIVE", "3")
+    await jira_http.startup()
+    client = jira_http.get_client()
+    job = await jira_ingest.create_job(IngestRequest(projects=["ALPHA"], updated_window_days=0, full=True, concurrency=8), url)
+    await jira_ingest.run_job(job.id, url, *AUTH)
+    job = jira_ingest.job_to_dict(await jira_ingest.get_job(job.id))
+    assert job["state"] == "succeeded" and job["issues_saved"] == expected(cfg, "ALPHA")[0]
+    assert jira_http.get_client() is client
+    pool = jira_http.pool_stats()
+    assert pool["started"] and pool["limits"]["max_connections"] == 3
+    assert pool["connections_opened_total"] <= 3 < pool["peak_in_flight"] < pool["requests_total"]
+    assert pool["requests_reused_connection"] == pool["requests_total"] - pool["connections_opened_total"]
+    assert pool["requests_in_flight"] == pool["requests_waiting"] == 0
+
+async def test_startup_replaces_the_client(db):
+    await jira_http.startup(transport=fake_jira.transport())
+    first = jira_http.get_client()
+    await jira_http.startup(transport=fake_jira.transport())
+    assert jira_http.get_client() is not first and first.is_closed
+    await jira_http.shutdown()
+    assert jira_http.pool_stats()["started"] is False
@@ -0,0 +1,102 @@
+from sqlalchemy import event, func, select
+import pytest
+from app.db.database import get_engine, get_sessionmaker
+from app.db.jira_models import JiraIssue, JiraIssueBlob, JiraTransition
+from app.services import fake_jira, jira_ingest, jira_store
+from test_ingest import ingest, stored
+
+pytestmark = pytest.mark.anyio
+
+def page(issues: int, start: int = 0, raw_storage: str = "full", **cfg) -> jira_ingest._Page:
+    """Parsed rows for `issues` of the fake site's issues, as one search page would give."""
+    data = fake_jira.FakeJiraData(fake_jira.FakeJiraConfig(issues=start + issues, **cfg))
+    return jira_ingest._parse_batch([data.issue(i, None, True) for i in range(start, start + issues)], raw_storage)
+
+async def write(p: jira_ingest._Page) -> dict:
+    Session = get_sessionmaker()
+    async with Session() as session:
+        stats = await jira_store.write_issue_page(session, p.issue_rows, p.transition_rows, p.blob_rows)
+        await session.commit()
+    return stats
+
+class Statements:
+    """Counts the statements sent to SQLite; an executemany counts once."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(get_engine().sync_engine, "before_cursor_execute", self._seen)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(get_engine().sync_engine, "before_cursor_execute", self._seen)
+
+    def _seen(self, *args):
+        self.count += 1
+
+async def test_page_write_cost_does_not_grow_with_the_page(db):
+    await jira_ingest._ensure_tables()
+    with Statements() as small:
+        await write(page(20))
+    with Statements() as large:
+        stats = await write(page(400, start=20))
+    assert stats["issues"] == 400 and stats["transitions"] == len(page(400, start=20).transition_rows)
+    assert large.count == small.count <= 8
+
+async def test_unchanged_issues_are_skipped_and_changed_ones_replaced(db):
+    await jira_ingest._ensure_tables()
+    first = page(60)
+    assert (await write(first))["issues"] == 60
+    again = await write(page(60))
+    assert (again["issues"], again["issues_unchanged"], again["transitions"]) == (0, 60, 0)
+    # Same issues, different histories: every row and its transitions are rewritten.
+    changed = page(60, seed=99)
+    stats = await write(changed)
+    assert (stats["issues"], stats["issues_unchanged"]) == (60, 0)
+    Session = get_sessionmaker()
+    async with Session() as session:
+        transitions = (await session.execute(select(func.count()).select_from(JiraTransition))).scalar()
+    assert transitions == len(changed.transition_rows) != len(first.transition_rows)
+
+async def test_reingest_of_an_unchanged_site_writes_nothing(site):
+    await site(issues=300)
+    first = await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    before = await stored()
+    second = await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    assert second["fetched"] == second["issues_unchanged"] == first["issues_saved"] == 100
+    assert (second["issues_saved"], second["transitions_saved"]) == (0, 0)
+    assert await stored() == before
+
+@pytest.mark.parametrize("codec", ["zlib", pytest.param("zstd", marks=pytest.mark.skipif(not jira_store.HAVE_ZSTD, reason="zstandard not installed"))])
+async def test_blobs_round_trip_compressed(setenv, codec):
+    setenv("JIRA_RAW_CODEC", codec)
+    payload = {"id": "100000", "fields": {"summary": "x" * 2000}}
+    text = jira_store.canonical_json(payload)
+    blob = jira_store.encode_blob(text)
+    assert blob["codec"] == codec and blob["size"] == len(text) > 4 * len(blob["data"])
+    assert blob["hash"] == jira_store.sha256_hex(text)
+    assert jira_store.decode_blob(blob["codec"], blob["data"]) == payload
+
+async def test_blobs_are_shared_by_hash_and_dropped_when_unused(db):
+    await jira_ingest._ensure_tables()
+    first = page(30)
+    await write(first)
+    Session = get_sessionmaker()
+    async with Session() as session:
+        payload = await jira_store.read_raw_payload(session, "100000")
+        blobs = select(func.count()).select_from(JiraIssueBlob)
+        assert payload["key"] == "ALPHA-1" and (await session.execute(blobs)).scalar() == 30
+    # The same payloads under new content hashes: blobs are left alone, not duplicated.
+    for row in first.issue_rows:
+        row["content_hash"] += "-v2"
+    assert (await write(first))["issues"] == 30
+    async with Session() as session:
+        assert (await session.execute(blobs)).scalar() == 30
+    # New payloads replace the blobs, and the old ones nothing points at are deleted.
+    await write(page(30, seed=5))
+    async with Session() as session:
+        hashes = set((await session.execute(select(JiraIssueBlob.hash))).scalars())
+        pointed = set((await session.execute(select(JiraIssue.raw_hash))).scalars())
+    assert hashes == pointed and len(hashes) == 30
+    assert not hashes & {row["raw_hash"] for row in first.issue_rows}
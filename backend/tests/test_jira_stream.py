@@ -0,0 +1,60 @@
+import json
+import httpx
+from sqlalchemy import select
+import pytest
+from app.db.database import get_sessionmaker
+from app.db.jira_models import JiraIssue, JiraTransition
+from app.services.jira_stream import SearchPageParser, iter_search_page
+from test_ingest import ingest
+
+pytestmark = pytest.mark.anyio
+
+PAGE = {
+    "expand": "names", "startAt": 0, "maxResults": 3, "total": 3,
+    "names": {"issues": "not the array", "summary": "Summary"},
+    "issues": [
+        {"id": "1", "key": "A-1", "fields": {"summary": 'braces {in} [strings] and \\"quotes\\"', "labels": []}},
+        {"id": "2", "key": "A-2", "fields": {"summary": "ünïcödé → ✓", "issues": [{"nested": {"issues": []}}]}},
+        {"id": "3", "key": "A-3", "fields": {"summary": "back\\\\slash\\\\", "parent": None}},
+    ],
+    "isLast": True,
+}
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 100000])
+def test_parser_yields_each_issue_whatever_the_chunking(size):
+    text = json.dumps(PAGE, ensure_ascii=False)
+    parser = SearchPageParser()
+    issues = []
+    for at in range(0, len(text), size):
+        issues.extend(parser.feed(text[at:at + size]))
+    assert issues == PAGE["issues"]
+    assert parser.close() == {**PAGE, "issues": []}
+
+async def test_multibyte_characters_split_across_network_chunks():
+    body = json.dumps(PAGE, ensure_ascii=False).encode("utf-8")
+
+    async def one_byte_at_a_time():
+        for b in range(len(body)):
+            yield body[b:b + 1]
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=one_byte_at_a_time(), headers={"Content-Type": "application/json"}))
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", "http://jira.test/rest/api/3/search") as response:
+            meta = {}
+            issues = [issue async for issue in iter_search_page(response, meta)]
+    assert issues == PAGE["issues"] and meta["total"] == 3 and meta["names"] == PAGE["names"]
+
+async def snapshot() -> tuple:
+    Session = get_sessionmaker()
+    async with Session() as session:
+        issues = (await session.execute(select(JiraIssue.issue_id, JiraIssue.key, JiraIssue.status, JiraIssue.updated, JiraIssue.content_hash).order_by(JiraIssue.issue_id))).all()
+        transitions = (await session.execute(select(JiraTransition.issue_id, JiraTransition.when, JiraTransition.to_status).order_by(JiraTransition.issue_id, JiraTransition.when))).all()
+    return issues, transitions
+
+async def test_streamed_and_buffered_ingest_store_the_same(site):
+    await site(issues=300, max_results=25, overflow_every=9, changelog_embed=4)
+    streamed = await ingest(projects=["ALPHA"], updated_window_days=0, full=True, stream=True)
+    first = await snapshot()
+    buffered = await ingest(projects=["ALPHA"], updated_window_days=0, full=True, stream=False)
+    assert streamed["fetched"] == buffered["fetched"] == 100
+    assert buffered["issues_unchanged"] == 100  # same content hashes either way
+    assert await snapshot() == first
@@ -0,0 +1,69 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import time
+import anyio
+import httpx
+import pytest
+from app.services import jira_http
+from app.services.jira_transport import RateLimitedTransport, _parse_retry_after
+from test_ingest import expected, ingest
+
+pytestmark = pytest.mark.anyio
+
+def limited(responses: list) -> tuple:
+    """A RateLimitedTransport over canned responses (status, headers), then 200s; returns it and the request log."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((time.monotonic(), request.method))
+        status, headers = responses.pop(0) if responses else (200, {})
+        return httpx.Response(status, headers=headers, json={})
+    return RateLimitedTransport(httpx.MockTransport(handler)), seen
+
+async def test_retry_after_holds_every_request_to_the_site(setenv):
+    setenv("JIRA_RATE_LIMIT_RPS", "0")
+    transport, seen = limited([(429, {"Retry-After": "0.3"})])
+    async with httpx.AsyncClient(transport=transport) as client:
+        started = time.monotonic()
+        first = await client.get("http://jira.test/rest/api/3/search")
+        second = await client.get("http://jira.test/rest/api/3/myself")
+    assert first.status_code == second.status_code == 200
+    assert seen[1][0] - started >= 0.3 and seen[2][0] - started >= 0.3
+    stats = transport.stats()
+    assert (stats["throttled_429"], stats["retries"], stats["gave_up"]) == (1, 1, 0)
+
+async def test_backoff_gives_up_after_max_retries(setenv):
+    setenv("JIRA_RATE_LIMIT_RPS", "0")
+    setenv("JIRA_RETRY_MAX", "2")
+    setenv("JIRA_RETRY_BASE_DELAY", "0.01")
+    transport, seen = limited([(503, {})] * 5)
+    async with httpx.AsyncClient(transport=transport) as client:
+        assert (await client.get("http://jira.test/rest/api/3/search")).status_code == 503
+        assert (await client.post("http://jira.test/rest/api/3/search")).status_code == 503  # not idempotent: no retry
+    stats = transport.stats()
+    assert len(seen) == 4 and (stats["unavailable_503"], stats["retries"], stats["gave_up"]) == (4, 2, 2)
+
+async def test_request_budget_spaces_requests(setenv):
+    setenv("JIRA_RATE_LIMIT_RPS", "20")
+    setenv("JIRA_RATE_LIMIT_BURST", "2")
+    transport, seen = limited([])
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with anyio.create_task_group() as tg:
+            for _ in range(8):
+                tg.start_soon(client.get, "http://jira.test/rest/api/3/search")
+    # Two from the burst, the other six at 20/s.
+    assert seen[-1][0] - seen[0][0] >= 6 / 20 * 0.9
+    assert transport.stats()["budget_wait_seconds"] > 0
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert _parse_retry_after("2.5") == 2.5
+    assert _parse_retry_after(None) is None and _parse_retry_after("soon") is None
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < _parse_retry_after(later) <= 30
+
+async def test_ingest_rides_out_throttling(site):
+    cfg = await site(issues=300, max_results=20, rate_limit_rate=0.3, retry_after=0)
+    job = await ingest(projects=["ALPHA"], updated_window_days=0, full=True, concurrency=4)
+    assert job["state"] == "succeeded" and job["issues_saved"] == expected(cfg, "ALPHA")[0]
+    stats = jira_http.transport_stats()
+    assert stats["throttled_429"] > 0 and stats["retries"] == stats["throttled_429"] and stats["gave_up"] == 0
@@ -0,0 +1,49 @@
+from fastapi import HTTPException
+from sqlalchemy import func, select
+import pytest
+from app.db.database import get_sessionmaker
+from app.db.jira_models import JiraIssue, JiraTransition
+from app.schemas import ReconcileRequest
+from app.services import jira_reconcile
+from conftest import AUTH, BASE
+from test_ingest import ingest, stored
+
+pytestmark = pytest.mark.anyio
+
+async def sweep(**kwargs) -> dict:
+    return await jira_reconcile.reconcile(ReconcileRequest(projects=["ALPHA", "BETA", "GAMMA"], **kwargs), BASE, *AUTH)
+
+async def test_reconcile_deletes_and_rekeys(site):
+    await site(issues=600, projects=["ALPHA", "BETA", "GAMMA"])
+    await ingest(projects=["ALPHA", "BETA", "GAMMA"], updated_window_days=0, full=True)
+    before = await stored()
+    # Since then the newest 20 issues of each project were deleted and GAMMA was renamed DELTA.
+    await site(issues=540, projects=["ALPHA", "BETA", "DELTA"])
+
+    dry = await sweep(dry_run=True, concurrency=4)
+    assert (dry["moved"], dry["deleted"], dry["out_of_scope"]) == (180, 60, 180)
+    assert await stored() == before
+
+    result = await sweep(concurrency=4)
+    assert (result["remote"], result["moved"], result["deleted"]) == (360, 180, 60)
+    assert {m["from"].split("/")[0] for m in result["moved_keys"]} == {"GAMMA"}
+    assert (await stored())[0] == 540
+    assert await stored("GAMMA") == (0, 0)
+    assert (await stored("DELTA"))[0] == 180
+    Session = get_sessionmaker()
+    async with Session() as session:
+        orphans = select(func.count()).select_from(JiraTransition).where(~JiraTransition.issue_id.in_(select(JiraIssue.issue_id)))
+        assert (await session.execute(orphans)).scalar() == 0
+        stale = select(func.count()).select_from(JiraTransition).where(JiraTransition.issue_key.like("GAMMA-%"))
+        assert (await session.execute(stale)).scalar() == 0
+        links = select(func.count()).select_from(JiraIssue).where(JiraIssue.epic_key.like("GAMMA-%") | JiraIssue.parent_key.like("GAMMA-%"))
+        assert (await session.execute(links)).scalar() == 0
+
+    again = await sweep()
+    assert (again["moved"], again["deleted"]) == (0, 0)
+
+async def test_reconcile_needs_a_scope(site):
+    await site(issues=30)
+    with pytest.raises(HTTPException) as err:
+        await jira_reconcile.reconcile(ReconcileRequest(), BASE, *AUTH)
+    assert err.value.status_code == 400
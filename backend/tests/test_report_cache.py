@@ -0,0 +1,62 @@
+"""The report app's run cache: request keys, versions, TTL and eviction."""
+import pytest
+
+@pytest.fixture
+def rc(reportapp, monkeypatch):
+    from reportapp.config import settings
+    from reportapp.services import report_cache
+    monkeypatch.setattr(settings, "report_cache_size", 3)
+    monkeypatch.setattr(settings, "report_cache_ttl_seconds", 60)
+    return report_cache
+
+EFF = {"default_window_days": 30, "jira_base_url": "http://fake-jira.test", "timezone": "UTC",
+       "business_hours_start": "09:00", "business_hours_end": "17:00", "business_days": "0,1,2,3,4"}
+
+def key(rc, eff=EFF, **req):
+    from reportapp.schemas import RunRequest
+    return rc.request_key(RunRequest(**{"project_keys": ["ALPHA"], **req}), eff)
+
+def test_request_key_is_canonical(rc):
+    assert key(rc, project_keys=["BETA", " ALPHA", "ALPHA"], labels=["b", "a"]) == key(rc, project_keys=["ALPHA", "BETA"], labels=["a", "b", "a"])
+    assert key(rc, window_days=30, max_issues=None) == key(rc, max_issues=25)  # the defaults a run falls back to
+    assert key(rc, custom_buckets={"Done": "Shipped"}) == key(rc)  # ignored unless aggregation=custom
+    assert key(rc, aggregation="custom", custom_buckets={"Done": "Shipped"}) != key(rc, aggregation="custom", custom_buckets={"Done": "Out"})
+    assert key(rc, business_hours=False) != key(rc)
+    assert key(rc, eff={**EFF, "timezone": "Europe/Berlin"}) != key(rc)
+    assert key(rc, eff={**EFF, "jira_api_token": "rotated"}) == key(rc)
+
+def test_entries_are_dropped_when_stale_expired_or_invalid(rc, monkeypatch):
+    cache = rc.ReportCache()
+    now = [1000.0]
+    monkeypatch.setattr(rc.time, "monotonic", lambda: now[0])
+    cache.put("k", "v1", 1)
+    assert cache.get("k", "v1", lambda run_id: True) == 1
+    assert cache.get("k", "v2", lambda run_id: True) is None  # data changed
+    assert cache.get("k", "v2", lambda run_id: True) is None  # and the entry is gone
+    cache.put("k", "v2", 2)
+    now[0] += 61
+    assert cache.get("k", "v2", lambda run_id: True) is None
+    cache.put("k", "v2", 3)
+    assert cache.get("k", "v2", lambda run_id: run_id != 3) is None  # e.g. its CSVs were deleted
+    stats = cache.stats()
+    assert {n: stats[n] for n in ("hits", "misses", "stale", "expired", "invalidated", "entries")} == \
+        {"hits": 1, "misses": 4, "stale": 1, "expired": 1, "invalidated": 1, "entries": 0}
+    assert stats["hit_ratio"] == 0.2
+
+def test_least_recently_used_entry_is_evicted(rc):
+    cache = rc.ReportCache()
+    for n in range(3):
+        cache.put(f"k{n}", "v", n)
+    assert cache.get("k0", "v", lambda run_id: True) == 0
+    cache.put("k3", "v", 3)
+    assert cache.get("k1", "v", lambda run_id: True) is None
+    assert [cache.get(f"k{n}", "v", lambda run_id: True) for n in (0, 2, 3)] == [0, 2, 3]
+    assert cache.stats()["evicted"] == 1
+    cache.discard_run(2)
+    assert cache.get("k2", "v", lambda run_id: True) is None
+
+def test_size_zero_disables_the_cache(rc, monkeypatch):
+    monkeypatch.setattr(rc.settings, "report_cache_size", 0)
+    cache = rc.ReportCache()
+    cache.put("k", "v", 1)
+    assert cache.get("k", "v", lambda run_id: True) is None and cache.stats()["entries"] == 0
@@ -0,0 +1,290 @@
+"""Report endpoints of the app at the repo root (loaded as `reportapp`, see conftest), over data
+the backend ingested from the fake site."""
+import anyio
+import csv
+import io
+import sqlite3
+import threading
+from fastapi import FastAPI
+import httpx
+from httpx import ASGITransport, AsyncClient
+import pytest
+from app.services import fake_jira
+from conftest import AUTH, BASE
+from test_ingest import ingest
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def client(reportapp, db, monkeypatch):
+    """HTTP client on the report router; local runs read the backend's ingest store for this test."""
+    from reportapp.config import settings
+    from reportapp.routers import reports
+    from reportapp.services import jira_http, local_store
+    monkeypatch.setattr(settings, "jira_store_path", str(db))
+    monkeypatch.setattr(local_store, "_store_session", None)
+    monkeypatch.setattr(reports, "DATA_DIR", db.parent)
+    app = FastAPI()
+    app.include_router(reports.router)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://reports.test") as http:
+        yield http
+    await reports.stop_workers()
+    await jira_http.shutdown()
+
+async def live_site(reportapp, **kwargs) -> fake_jira.FakeJiraConfig:
+    """Serve the fake site to the report app's own shared client too."""
+    from reportapp.services import jira_http
+    cfg = fake_jira.FakeJiraConfig(**kwargs)
+    await jira_http.startup(transport=fake_jira.transport(cfg))
+    return cfg
+
+def rows(body: str) -> list:
+    return list(csv.DictReader(io.StringIO(body)))
+
+RUN = {"project_keys": ["ALPHA"], "window_days": 3650, "max_issues": 10000}
+
+async def wait_for(client, run_id: int, done=lambda run: run["status"] not in ("queued", "running")) -> dict:
+    """Poll GET /api/reports/{run_id} until `done` holds (by default, until the run finished)."""
+    for _ in range(500):
+        run = (await client.get(f"/api/reports/{run_id}")).json()
+        if done(run):
+            return run
+        await anyio.sleep(0.02)
+    raise AssertionError(f"run {run_id} is still {run['status']}")
+
+async def export(client, kind: str, **req) -> list:
+    r = await client.post(f"/api/reports/export/{kind}", json={**RUN, **req})
+    assert r.status_code == 200, r.text
+    return rows(r.text)
+
+# Columns that do not depend on the time of the run (open intervals are measured up to now).
+ISSUE_COLS = ("issue_key", "status_current", "created", "updated", "epic_key", "parent_key", "labels", "total_status_entries")
+INTERVAL_COLS = ("issue_key", "status_name", "entered_at", "interval_index")
+
+async def test_local_run_matches_live(reportapp, client, site):
+    await site(issues=300, seed=7)
+    await live_site(reportapp, issues=300, seed=7)
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    live = {kind: await export(client, kind, source="live") for kind in ("issues", "transitions")}
+    local = {kind: await export(client, kind, source="local") for kind in ("issues", "transitions")}
+    assert len(local["issues"]) == 100 and any(r["labels"] for r in local["issues"])
+    pick = lambda table, cols: sorted(tuple(r[c] for c in cols) for r in table)
+    assert pick(local["issues"], ISSUE_COLS) == pick(live["issues"], ISSUE_COLS)
+    assert pick(local["transitions"], INTERVAL_COLS) == pick(live["transitions"], INTERVAL_COLS)
+
+async def test_local_run_without_ingest_fails_before_the_body(client):
+    r = await client.post("/api/reports/export/issues", json={**RUN, "source": "local"})
+    assert r.status_code == 409 and "ingest" in r.json()["detail"]
+    r = await client.post("/api/reports/export/issues", json={**RUN, "source": "local", "jql": "labels = backend"})
+    assert r.status_code == 400
+
+async def test_store_from_before_labels_asks_for_an_ingest(reportapp, client, site, db):
+    await site(issues=30)
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    with sqlite3.connect(db) as conn:
+        conn.execute("ALTER TABLE jira_issues DROP COLUMN labels")
+    r = await client.post("/api/reports/export/issues", json={**RUN, "source": "local"})
+    assert r.status_code == 409 and "predates" in r.json()["detail"]
+    # The backend adds the column back and re-ingests in full.
+    await ingest(projects=["ALPHA"], updated_window_days=0)
+    assert any(r["labels"] for r in await export(client, "issues", source="local"))
+
+async def test_export_streams_every_kind_over_several_batches(client, site):
+    await site(issues=1200)  # 400 ALPHA issues: two report batches, spooled summaries
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    issues = await export(client, "issues", source="local")
+    transitions = await export(client, "transitions", source="local")
+    assert len(issues) == len({r["issue_key"] for r in issues}) == 400
+    assert {r["issue_key"] for r in transitions} <= {r["issue_key"] for r in issues}
+    assert [int(r["interval_index"]) for r in transitions] == list(range(len(transitions)))
+    statuses = {r["status_name"] for r in transitions}
+    assert {f"entries_{s}" for s in statuses} <= set(issues[0])  # header built from every batch
+    assert await export(client, "rollups", source="local")
+    assert await export(client, "metrics", source="local", report="cycle_time")
+    r = await client.post("/api/reports/export/metrics", json={**RUN, "source": "local"})
+    assert r.status_code == 400
+
+async def test_background_run_writes_what_export_streams(client, site):
+    await site(issues=90)
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    started = await client.post("/api/reports/run", json={**RUN, "source": "local"})
+    assert started.status_code == 200
+    run_id = started.json()["run_id"]
+    run = await wait_for(client, run_id)
+    assert run["status"] == "ok", run["error"]
+    for kind, cols in (("issues", ISSUE_COLS), ("transitions", INTERVAL_COLS)):
+        download = await client.get(f"/api/reports/{run_id}/download/{kind}")
+        assert download.status_code == 200
+        pick = lambda table: sorted(tuple(r[c] for c in cols) for r in table)
+        assert pick(rows(download.text)) == pick(await export(client, kind, source="local"))
+
+async def test_repeated_runs_share_a_run_until_the_store_changes(client, site, db, monkeypatch):
+    from reportapp.config import settings
+    from reportapp.services import report_cache
+    monkeypatch.setattr(settings, "report_cache_size", 8)
+    monkeypatch.setattr(report_cache, "cache", report_cache.ReportCache())
+    await site(issues=90)
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    req = {**RUN, "source": "local"}
+    first = (await client.post("/api/reports/run", json=req)).json()
+    assert (await wait_for(client, first["run_id"]))["status"] == "ok"
+    again = (await client.post("/api/reports/run", json={**req, "project_keys": ["ALPHA", "ALPHA"]})).json()
+    assert again["run_id"] == first["run_id"] and again["meta"]["cache"] == "hit"
+    # New issues in the store are a new data version.
+    await site(issues=120)
+    await ingest(projects=["ALPHA"], updated_window_days=0)
+    fresh = (await client.post("/api/reports/run", json=req)).json()
+    assert fresh["run_id"] != first["run_id"] and "cache" not in fresh["meta"]
+    assert (await wait_for(client, fresh["run_id"]))["status"] == "ok"
+    # A run whose CSVs are gone is not reused either.
+    for path in db.parent.glob(f"run_{fresh['run_id']}_*"):
+        path.unlink()
+    rerun = (await client.post("/api/reports/run", json=req)).json()
+    assert rerun["run_id"] != fresh["run_id"] and (await wait_for(client, rerun["run_id"]))["status"] == "ok"
+    stats = (await client.get("/api/reports/cache/stats")).json()
+    assert (stats["hits"], stats["stale"], stats["invalidated"]) == (1, 1, 1)
+
+@pytest.mark.parametrize("size, lookups", [(0, 0), (8, 1)])
+async def test_live_runs_look_up_a_data_version_only_with_the_cache_on(reportapp, client, monkeypatch, size, lookups):
+    from reportapp.config import settings
+    from reportapp.services import report_cache
+    from reportapp.services.jira import JiraClient
+    monkeypatch.setattr(settings, "report_cache_size", size)
+    monkeypatch.setattr(report_cache, "cache", report_cache.ReportCache())
+    calls = []
+    scope_version = JiraClient.scope_version
+    monkeypatch.setattr(JiraClient, "scope_version", lambda self, jql: calls.append(jql) or scope_version(self, jql))
+    await live_site(reportapp, issues=30)
+    started = (await client.post("/api/reports/run", json={**RUN, "source": "live"})).json()
+    assert len(calls) == lookups and (started["meta"]["data_version"] is None) == (size == 0)
+    assert (await wait_for(client, started["run_id"]))["status"] == "ok"
+    assert report_cache.cache.stats()["entries"] == (1 if size else 0)
+
+async def test_custom_buckets_total_each_issues_intervals(client, site):
+    await site(issues=90)
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    req = {"source": "local", "business_hours": False, "aggregation": "custom",
+           "custom_buckets": {"Blocked": "Waiting", "In Review": "Waiting", "In Progress": "Active", "To Do": "Queue"}}
+    issues = await export(client, "issues", **req)
+    transitions = await export(client, "transitions", **req)
+    bucket_of = {**req["custom_buckets"], "Done": "Unmapped"}
+    expected = {}
+    for t in transitions:
+        per_issue = expected.setdefault(t["issue_key"], dict.fromkeys(["Waiting", "Active", "Queue", "Unmapped"], 0))
+        per_issue[bucket_of[t["status_name"]]] += int(t["duration_seconds_24x7"])
+    assert [c for c in issues[0] if c.startswith("hours_")] == ["hours_bucket_Waiting", "hours_bucket_Active", "hours_bucket_Queue", "hours_bucket_Unmapped"]
+    by_key = {r["issue_key"]: r for r in issues}
+    assert expected and set(expected) <= set(by_key)
+    for key, per_bucket in expected.items():
+        for bucket, seconds in per_bucket.items():
+            # open intervals run to the time of each export
+            assert float(by_key[key][f"hours_bucket_{bucket}"]) == pytest.approx(seconds / 3600, abs=0.02)
+    r = await client.post("/api/reports/export/issues", json={**RUN, **req, "custom_buckets": {"Done": " "}})
+    assert r.status_code == 400
+
+async def test_row_spool_spills_to_disk_and_keeps_order(reportapp):
+    from reportapp.services.csv_sink import RowSpool
+    spool = RowSpool(max_bytes=1024)
+    loop_thread = threading.get_ident()
+    threads = set()
+    for name in ("write", "readline"):
+        method = getattr(spool._f, name)
+        setattr(spool._f, name, lambda *a, method=method: threads.add(threading.get_ident()) or method(*a))
+    try:
+        for start in range(0, 1000, 100):
+            await spool.add([[n, f"ALPHA-{n}", {"Done": n * 1.5}] for n in range(start, start + 100)])
+        assert spool._f._rolled and spool.count == 1000
+        batches = [b async for b in spool.batches(300)]
+        assert [len(b) for b in batches] == [300, 300, 300, 100]
+        assert [r[0] for b in batches for r in b] == list(range(1000))
+        assert threads and loop_thread not in threads  # file I/O stays off the event loop
+    finally:
+        await spool.close()
+
+def test_iter_csv_streams_with_fieldnames():
+    from app.services.csv_export import CHUNK_ROWS, iter_csv
+    rows_ = ({"key": f"A-{n}", "n": n} for n in range(CHUNK_ROWS * 2 + 1))
+    chunks = list(iter_csv(rows_, ["key", "n"]))
+    assert len(chunks) == 3 and chunks[0].startswith("key,n\r\n")
+    assert sum(c.count("\n") for c in chunks) == CHUNK_ROWS * 2 + 2
+    assert "".join(iter_csv([{"b": 1}, {"a": 2}])).splitlines()[0] == "a,b"  # union of keys
+    with pytest.raises(ValueError):
+        list(iter_csv([{"key": "A-1", "extra": 1}], ["key"]))
+
+async def test_stream_csv_serves_a_download():
+    from app.services.csv_export import stream_csv
+    app = FastAPI()
+    app.get("/issues.csv")(lambda: stream_csv(({"key": f"A-{n}", "n": n} for n in range(1200)), "issues.csv", ["key", "n"]))
+    app.get("/empty.csv")(lambda: stream_csv([], "empty.csv"))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://csv.test") as http:
+        r = await http.get("/issues.csv")
+        assert r.headers["content-type"].startswith("text/csv")
+        assert r.headers["content-disposition"] == 'attachment; filename="issues.csv"'
+        assert [row["key"] for row in rows(r.text)] == [f"A-{n}" for n in range(1200)]
+        assert (await http.get("/empty.csv")).text == "empty\n"
+
+class Concurrency(httpx.AsyncBaseTransport):
+    """Passes requests to the fake site, tracking how many /changelog requests overlap."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+        self.in_flight = self.peak = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/changelog"):
+            return await self.inner.handle_async_request(request)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await self.inner.handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+async def test_live_runs_page_only_truncated_changelogs_with_bounded_fan_out(reportapp):
+    from reportapp.services import jira_http
+    from reportapp.services.jira import JiraClient
+    cfg = fake_jira.FakeJiraConfig(issues=240, overflow_every=4, changelog_embed=3, max_results=40, latency_ms=3)
+    transport = Concurrency(fake_jira.transport(cfg))
+    await jira_http.startup(transport=transport)
+    try:
+        client = JiraClient(BASE, *AUTH)
+        issues = await client.search_issues("project = ALPHA", ["status", "updated"], expand_changelog=True)
+        histories = await client.get_changelogs(issues, concurrency=3)
+    finally:
+        await jira_http.shutdown()
+    data = fake_jira.FakeJiraData(cfg)
+    full = [data.histories(data.index_of(issue["key"])) for issue in issues]
+    assert len(issues) == 80 and histories == full
+    truncated = [h for h in full if len(h) > cfg.changelog_embed]
+    assert client.changelogs_fetched == len(truncated) > 0
+    assert client.changelog_requests == sum(-(-len(h) // cfg.max_results) for h in truncated)
+    assert 1 < transport.peak <= 3
+
+async def test_a_running_run_can_be_cancelled(reportapp, client, db):
+    await live_site(reportapp, issues=3000, max_results=10, latency_ms=40)
+    started = await client.post("/api/reports/run", json={**RUN, "source": "live"})
+    run_id = started.json()["run_id"]
+    run = await wait_for(client, run_id, lambda run: run["meta"]["progress"]["issues"] > 0 or run["status"] != "queued")
+    assert run["status"] == "running"
+    cancelled = await client.post(f"/api/reports/{run_id}/cancel")
+    assert cancelled.json() == {"id": run_id, "status": "cancelled"}
+    assert not list(db.parent.glob(f"run_{run_id}_*"))  # partial outputs removed
+    assert (await client.post(f"/api/reports/{run_id}/cancel")).status_code == 409
+
+async def test_restart_requeues_interrupted_runs_within_their_attempts(reportapp, client, site):
+    from reportapp.routers import reports
+    await site(issues=60)
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    ids = []
+    for _ in range(2):
+        ids.append((await client.post("/api/reports/run", json={**RUN, "source": "local"})).json()["run_id"])
+        assert (await wait_for(client, ids[-1]))["status"] == "ok"
+    # A process died with both runs in flight; the second had already used up its attempts.
+    for run_id, attempts in zip(ids, (1, 2)):
+        meta = (await client.get(f"/api/reports/{run_id}")).json()["meta"]
+        reports._update_run(run_id, status="running", meta={**meta, "attempts": attempts})
+    await reports.stop_workers()
+    assert reports.recover_runs() == {"requeued": 1, "failed": 1}
+    first, second = [await wait_for(client, run_id) for run_id in ids]
+    assert first["status"] == "ok" and first["meta"]["attempts"] == 2
+    assert second["status"] == "failed" and "restart" in second["error"]
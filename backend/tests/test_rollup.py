@@ -0,0 +1,109 @@
+"""The report app's hierarchy rollups, checked against walking each issue's ancestors."""
+from collections import defaultdict
+import random
+import pytest
+
+RUN = 7
+COLUMNS = ["run_id","level","entity_key","epic_key","parent_key","children_count","total_time_bh_hours","total_time_24x7_hours","total_status_entries","descendants_count"]
+
+@pytest.fixture
+def rollup(reportapp):
+    from reportapp.services import rollup
+    return rollup
+
+def tree(seed: int = 5):
+    """Initiatives > epics > stories > sub-tasks as (key, type, parent, epic, bh, 24x7, entries)."""
+    rng = random.Random(seed)
+    issues = []
+    def add(key, kind, parent="", epic=""):
+        issues.append((key, kind, parent, epic, rng.randrange(0, 90_000), rng.randrange(0, 400_000), rng.randint(0, 9)))
+    for a in range(3):
+        add(f"I-{a}", "Initiative")
+        for b in range(rng.randint(1, 4)):
+            epic = f"E-{a}.{b}"
+            add(epic, "Epic", parent=f"I-{a}")
+            for c in range(rng.randint(0, 5)):
+                story = f"S-{a}.{b}.{c}"
+                # company-managed stories point at their epic by link, team-managed ones by parent
+                add(story, "Story", **({"epic": epic} if c % 2 else {"parent": epic}))
+                for d in range(rng.randint(0, 3)):
+                    add(f"T-{a}.{b}.{c}.{d}", "Sub-task", parent=story, epic=epic if c % 2 else "")
+    add("LONE", "Bug")
+    rng.shuffle(issues)  # children may arrive before their parents
+    return issues
+
+def index(rollup, issues):
+    idx = rollup.RollupIndex()
+    for issue in issues:
+        idx.add(*issue)
+    return idx
+
+def by_key(rows):
+    header, *body = rows
+    assert header == COLUMNS
+    return {r[2]: dict(zip(header, r)) for r in body}
+
+def test_full_rollup_sums_every_level(rollup):
+    issues = tree()
+    up = {key: parent or epic for key, _, parent, epic, *_ in issues}
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    for key, _, _, _, bh, h24, entries in issues:
+        above = up[key]
+        while above:
+            t = totals[above]
+            t[0] += bh; t[1] += h24; t[2] += entries; t[3] += 1
+            above = up[above]
+    children = defaultdict(int)
+    for key, u in up.items():
+        if u:
+            children[u] += 1
+
+    idx = index(rollup, issues)
+    rows = by_key(idx.rows(RUN, "full_rollup"))
+    assert set(rows) == set(children)
+    for key, (bh, h24, entries, descendants) in totals.items():
+        row = rows[key]
+        assert row["run_id"] == RUN
+        assert (row["children_count"], row["descendants_count"], row["total_status_entries"]) == (children[key], descendants, entries)
+        assert (row["total_time_bh_hours"], row["total_time_24x7_hours"]) == (round(bh / 3600, 2), round(h24 / 3600, 2))
+        assert row["level"] == {"I": "initiative", "E": "epic", "S": "parent"}[key[0]]
+    assert idx.stats == {"nodes": len(issues), "levels": 4, "cycle_nodes": 0}
+
+def test_epic_only_counts_direct_links(rollup):
+    issues = tree()
+    direct = defaultdict(list)
+    for issue in issues:
+        key, kind, parent, epic = issue[:4]
+        u = epic or parent
+        if u.startswith("E-"):
+            direct[u].append(issue)
+
+    rows = by_key(index(rollup, issues).rows(RUN, "epic_only"))
+    assert set(rows) == set(direct)
+    for epic, linked in direct.items():
+        row = rows[epic]
+        assert (row["level"], row["epic_key"], row["parent_key"]) == ("epic", epic, epic.replace("E-", "I-").split(".")[0])
+        assert row["children_count"] == row["descendants_count"] == len(linked)
+        assert row["total_time_bh_hours"] == round(sum(i[4] for i in linked) / 3600, 2)
+        assert row["total_status_entries"] == sum(i[6] for i in linked)
+
+def test_parents_outside_the_run(rollup):
+    """A parent that is only referenced still gets a row with its children's totals."""
+    idx = index(rollup, [("A-2", "Story", "", "A-1", 3600, 7200, 2), ("A-3", "Story", "", "A-1", 1800, 1800, 1)])
+    (row,) = by_key(idx.rows(RUN, "full_rollup")).values()
+    assert (row["entity_key"], row["level"], row["children_count"]) == ("A-1", "epic", 2)
+    assert (row["total_time_bh_hours"], row["total_time_24x7_hours"], row["total_status_entries"]) == (1.5, 2.5, 3)
+
+def test_parent_loops_are_skipped(rollup):
+    issues = [
+        ("L-1", "Story", "L-2", "", 3600, 3600, 1),
+        ("L-2", "Story", "L-1", "", 3600, 3600, 1),
+        ("L-3", "Sub-task", "L-1", "", 3600, 3600, 1),  # hangs off the loop, so never reaches a root
+        ("L-4", "Story", "L-4", "", 3600, 3600, 1),  # its own parent: ignored
+        ("L-5", "Sub-task", "L-4", "", 3600, 3600, 1),
+    ]
+    idx = index(rollup, issues)
+    rows = by_key(idx.rows(RUN, "full_rollup"))
+    assert set(rows) == {"L-4"}
+    assert (rows["L-4"]["children_count"], rows["L-4"]["total_time_bh_hours"]) == (1, 1.0)
+    assert idx.stats["cycle_nodes"] == 2
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+import pytest
+from app.db.database import get_sessionmaker
+from app.db.jira_models import JiraIssue, JiraTransition
+from app.services import jira_store, jira_webhook
+from test_ingest import ingest
+
+pytestmark = pytest.mark.anyio
+
+T0 = datetime(2026, 3, 2, 9, 0, tzinfo=timezone.utc)
+
+def event(issue_id: str, key: str, updated: datetime, status: str = "In Progress", previous: str = "To Do", kind: str = "jira:issue_updated") -> dict:
+    """A webhook body as Jira sends it, with one status change."""
+    fields = {
+        "project": {"key": key.split("-")[0]}, "summary": f"{key} at {updated:%H:%M}", "status": {"name": status},
+        "issuetype": {"name": "Task"}, "created": "2026-01-05T10:00:00.000+0000", "updated": updated.strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+    }
+    return {
+        "webhookEvent": kind, "timestamp": int(updated.timestamp() * 1000),
+        "issue": {"id": issue_id, "key": key, "fields": fields},
+        "changelog": {"items": [{"field": "status", "fromString": previous, "toString": status}]},
+    }
+
+async def flushed() -> None:
+    """Wait for the background flusher that the last submit scheduled."""
+    await asyncio.wait_for(asyncio.shield(jira_webhook._flusher), timeout=5)
+
+async def row(issue_id: str):
+    Session = get_sessionmaker()
+    async with Session() as session:
+        issue = (await session.execute(select(JiraIssue).where(JiraIssue.issue_id == issue_id))).scalar_one_or_none()
+        transitions = (await session.execute(select(func.count()).select_from(JiraTransition).where(JiraTransition.issue_id == issue_id))).scalar()
+        return issue, transitions
+
+async def test_burst_of_edits_is_one_write(setenv):
+    setenv("JIRA_WEBHOOK_BATCH_MS", "50")
+    statuses = ["To Do", "In Progress", "In Review", "In Progress", "In Review", "Done"]
+    for n in range(1, len(statuses)):
+        assert jira_webhook.submit(event("1", "ALPHA-1", T0 + timedelta(minutes=n), statuses[n], statuses[n - 1])) == "queued"
+    jira_webhook.submit(event("2", "ALPHA-2", T0))
+    assert jira_webhook.submit({"webhookEvent": "jira:worklog_updated", "issue": {"id": "1"}}) == "ignored"
+    await flushed()
+    stats = jira_webhook.stats()
+    assert (stats["batches"], stats["issues_written"], stats["coalesced"], stats["ignored"]) == (1, 2, 4, 1)
+    assert stats["transitions_added"] == 6 and stats["pending"] == 0
+    issue, transitions = await row("1")
+    assert issue.status == "Done" and transitions == 5
+
+async def test_out_of_order_delivery_keeps_the_newest(site, setenv):
+    await site(issues=30)
+    setenv("JIRA_WEBHOOK_BATCH_MS", "0")
+    jira_webhook.submit(event("1", "ALPHA-1", T0 + timedelta(hours=2), "Done", "In Progress"))
+    jira_webhook.submit(event("1", "ALPHA-1", T0 + timedelta(hours=1), "In Progress", "To Do"))
+    await flushed()
+    issue, transitions = await row("1")
+    assert issue.status == "Done" and transitions == 2  # both status changes happened
+
+    # A stale redelivery after an ingest must not roll the row or its history back.
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    issue, transitions = await row("100000")
+    status = issue.status
+    jira_webhook.submit(event("100000", issue.key, issue.updated.replace(tzinfo=timezone.utc) - timedelta(days=1), "Stale", status))
+    await flushed()
+    issue, after = await row("100000")
+    assert issue.status == status and after == transitions
+
+async def test_delete_event_removes_issue_and_transitions(site, setenv):
+    await site(issues=30)
+    setenv("JIRA_WEBHOOK_BATCH_MS", "0")
+    await ingest(projects=["ALPHA"], updated_window_days=0, full=True)
+    issue, transitions = await row("100000")
+    assert issue is not None and transitions > 0
+    jira_webhook.submit(event("100000", issue.key, T0, kind="jira:issue_updated"))
+    jira_webhook.submit({"webhookEvent": "jira:issue_deleted", "issue": {"id": "100000", "key": issue.key}})
+    await flushed()
+    assert await row("100000") == (None, 0)
+    assert jira_webhook.stats()["issues_deleted"] == 1
+
+async def test_failed_flush_retries_without_new_events(setenv, monkeypatch):
+    setenv("JIRA_WEBHOOK_BATCH_MS", "0")
+    setenv("JIRA_WEBHOOK_RETRY_MS", "10")
+    merge, calls = jira_store.merge_issues, []
+    async def flaky(session, rows):
+        calls.append(len(rows))
+        if len(calls) < 3:
+            raise RuntimeError("database is locked")
+        return await merge(session, rows)
+    monkeypatch.setattr(jira_store, "merge_issues", flaky)
+    jira_webhook.submit(event("1", "ALPHA-1", T0))
+    await flushed()
+    stats = jira_webhook.stats()
+    assert calls == [1, 1, 1] and (stats["errors"], stats["batches"], stats["pending"]) == (2, 1, 0)
+    issue, transitions = await row("1")
+    assert issue.status == "In Progress" and transitions == 1
+
+async def test_full_batch_flushes_before_the_window(setenv):
+    setenv("JIRA_WEBHOOK_BATCH_MS", "60000")
+    setenv("JIRA_WEBHOOK_MAX_BATCH", "3")
+    for n in range(3):
+        jira_webhook.submit(event(str(n), f"ALPHA-{n}", T0))
+    await flushed()
+    assert jira_webhook.stats()["issues_written"] == 3
+
+async def test_endpoint_checks_the_secret(setenv):
+    from app.main import app
+    setenv("JIRA_WEBHOOK_SECRET", "s3cret")
+    setenv("JIRA_WEBHOOK_BATCH_MS", "0")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://app.test") as client:
+        bad = await client.post("/api/jira/webhook", params={"token": "nope"}, json=event("1", "ALPHA-1", T0))
+        good = await client.post("/api/jira/webhook", params={"token": "s3cret"}, json=event("1", "ALPHA-1", T0))
+    assert bad.status_code == 401
+    assert good.status_code == 202 and good.json()["result"] == "queued"
+    await flushed()
+    assert (await row("1"))[0].status == "In Progress"